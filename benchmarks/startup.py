@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""sd.cpp-webui - Cold start benchmark
+
+Builds the interface in fresh interpreters, without launching it, and
+reports how long it took. Run it from the repository root:
+
+    python benchmarks/startup.py [--server] [--runs N] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import sdcpp_webui
+imported = time.perf_counter()
+sdcpp_webui.build_ui('--server' in sys.argv)
+built = time.perf_counter()
+print(json.dumps({'import': imported - start, 'build': built - imported}))
+"""
+
+
+def run_once(server: bool) -> dict:
+    """Times one cold start in a new interpreter."""
+    cmd = [sys.executable, "-c", CHILD_CODE]
+    if server:
+        cmd.append("--server")
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        cmd, cwd=ROOT, capture_output=True, text=True, check=False
+    )
+    total = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Startup failed with code {result.returncode}:\n{result.stderr}"
+        )
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total'] = total
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--server', action='store_true', help='Benchmark the server mode'
+    )
+    parser.add_argument(
+        '--runs', type=int, default=3, help='Number of cold starts'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Print the results as JSON'
+    )
+    args = parser.parse_args()
+
+    runs = [run_once(args.server) for _ in range(max(args.runs, 1))]
+    summary = {
+        phase: {
+            'median': statistics.median(r[phase] for r in runs),
+            'min': min(r[phase] for r in runs)
+        }
+        for phase in ('import', 'build', 'total')
+    }
+
+    if args.json:
+        print(json.dumps({
+            'mode': "server" if args.server else "cli",
+            'runs': runs,
+            'summary': summary
+        }, indent=2))
+        return
+
+    print(f"Cold start, {'server' if args.server else 'cli'} mode, "
+          f"{len(runs)} runs:")
+    for phase, values in summary.items():
+        print(f"  {phase:<7} median {values['median']:.2f}s  "
+              f"min {values['min']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
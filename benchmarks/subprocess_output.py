@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""sd.cpp-webui - Subprocess output benchmark
+
+Feeds a recorded sd.cpp log through a pipe and compares how fast the
+chunked output reader splits it into frames against reading it one
+byte at a time. Run it from the repository root:
+
+    python benchmarks/subprocess_output.py [--repeat N] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.utils.subprocess_manager import SubprocessManager  # noqa: E402
+
+SD_LOG = os.path.join(ROOT, "test", "utils", "sdcpp_txt2img_log.txt")
+
+
+def bytewise_frames(stdout) -> list:
+    """Splits the output reading one byte per call."""
+    frames = []
+    buffer = bytearray()
+    for byte in iter(lambda: stdout.read(1), b''):
+        buffer.extend(byte)
+        is_progress_end = (
+            len(buffer) > 4 and byte in (b's', b't') and
+            (buffer.endswith(b'it/s') or buffer.endswith(b's/it'))
+        )
+        if byte in (b'\r', b'\n') or is_progress_end:
+            frames.append(buffer.decode('utf-8', errors='replace'))
+            buffer.clear()
+    if buffer:
+        frames.append(buffer.decode('utf-8', errors='replace'))
+    return frames
+
+
+def chunked_frames(stdout) -> list:
+    manager = SubprocessManager()
+    manager.process = SimpleNamespace(stdout=stdout)
+    return list(manager._stream_output())
+
+
+def time_reader(reader, data: bytes) -> tuple:
+    """Times a reader over a pipe, returns its frames and the seconds."""
+    read_fd, write_fd = os.pipe()
+
+    def writer():
+        with os.fdopen(write_fd, 'wb', buffering=0) as pipe:
+            pipe.write(data)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+
+    start = time.perf_counter()
+    with os.fdopen(read_fd, 'rb', buffering=0) as stdout:
+        frames = reader(stdout)
+    seconds = time.perf_counter() - start
+
+    thread.join()
+    return frames, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--repeat', type=int, default=200,
+        help='Times the recorded log is repeated'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Print the results as JSON'
+    )
+    args = parser.parse_args()
+
+    with open(SD_LOG, 'rb') as file:
+        data = file.read() * max(args.repeat, 1)
+    size_mb = len(data) / (1024 * 1024)
+
+    chunked, chunked_time = time_reader(chunked_frames, data)
+    bytewise, bytewise_time = time_reader(bytewise_frames, data)
+    if chunked != bytewise:
+        raise RuntimeError("The readers split the output differently")
+
+    results = {
+        'size_mb': size_mb,
+        'chunked_mb_s': size_mb / chunked_time,
+        'bytewise_mb_s': size_mb / bytewise_time
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{size_mb:.1f} MB of sd.cpp output:")
+    print(f"  chunked  {results['chunked_mb_s']:8.1f} MB/s")
+    print(f"  bytewise {results['bytewise_mb_s']:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -89,10 +89,18 @@ DEFAULT_SETTINGS = {
     'def_env_CUDA_VISIBLE_DEVICES': 0,
     'def_env_GGML_VK_DISABLE_COOPMAT': False,
     'def_env_GGML_VK_DISABLE_INTEGER_DOT_PRODUCT': False,
+    'def_device_profiles': [],
+    'def_queue_journal': False,
     'def_output_scheme': "Sequential",
     'def_output_steps': False,
     'def_output_quant': False,
-    'def_gallery_sorting': "Date (Oldest First)"
+    'def_png_compress_level': 6,
+    'def_gallery_sorting': "Date (Oldest First)",
+    'def_gallery_thumbnails': True,
+    'def_thumbnail_cache_mb': 512,
+    'def_server_pool_size': 1,
+    'def_server_request_timeout': 0,
+    'def_server_status_timeout': 1.0
 }
 
 
@@ -4,7 +4,7 @@ import os
 import re
 import sys
 import subprocess
-from typing import Dict, Any, Generator
+from typing import Dict, Any, AsyncGenerator, Generator
 
 import gradio as gr
 
@@ -12,8 +12,9 @@ from modules.core.common.sd_common import (
     DiffusionMode, CommonRunner, process_editor_mask
 )
 from modules.utils.sdcpp_utils import generate_output_filename
+import modules.utils.queue as queue_manager
 from modules.shared_instance import (
-    config, subprocess_manager, SD_CLI
+    config, subprocess_manager, output_index, SD_CLI
 )
 
 
@@ -41,16 +42,30 @@ class CommandRunner(CommonRunner):
             return path
 
     def _get_next_synced_index(self) -> int:
-        """Finds the next available sequential index by scanning prompt and command folders."""
+        """Reserves the next sequential index shared by the prompt and command files."""
         dirs = [
             os.path.join('outputs', 'pprompts'),
             os.path.join('outputs', 'nprompts'),
             os.path.join('outputs', 'commands')
         ]
+        for d in dirs:
+            os.makedirs(d, exist_ok=True)
+
+        def is_taken(idx: int) -> bool:
+            return any(
+                os.path.exists(os.path.join(d, f"{prefix}_{idx}.txt"))
+                for d, prefix in zip(dirs, ('pprompt', 'nprompt', 'command'))
+            )
 
+        return output_index.reserve(
+            'synced', dirs, lambda: self._scan_next_synced_index(dirs), is_taken
+        )
+
+    @staticmethod
+    def _scan_next_synced_index(dirs: list) -> int:
+        """Finds the next available sequential index by scanning prompt and command folders."""
         max_idx = -1
         for d in dirs:
-            os.makedirs(d, exist_ok=True)
             for f in os.listdir(d):
                 if (f.startswith('pprompt_') or f.startswith('nprompt_') or f.startswith('command_')) and f.endswith('.txt'):
                     try:
@@ -252,20 +267,13 @@ class CommandRunner(CommonRunner):
         """
         raise NotImplementedError
 
-    def run(self) -> Generator:
-        """Runs the command and yields Gradio updates."""
+    def _start_run(self) -> tuple:
+        """Saves the command and returns the initial UI update."""
         self._prepare_for_run()
         self._save_command()
         print(f"\n\n{self.fcommand}\n\n")
 
-        process_env = self._build_process_env()
-
-        if self.preview_path:
-            gallery_update = [self.preview_path]
-        else:
-            gallery_update = None
-
-        yield (
+        return (
             self.fcommand,
             gr.update(visible=True, value=0),
             gr.update(visible=True, value="Initializing..."),
@@ -273,33 +281,33 @@ class CommandRunner(CommonRunner):
             None
         )
 
-        final_stats_str = "Process completed with unknown stats."
-        for update in subprocess_manager.run_subprocess(
-            self.command, env=process_env
-        ):
-            if "final_stats" in update:
-                stats = update["final_stats"]
-                final_stats_str = (
-                    f"Tensor Load: {stats.get('tensor_load_time', 'N/A')} | "
-                    f"Sampling: {stats.get('sampling_time', 'N/A')} | "
-                    f"Decode: {stats.get('decoding_time', 'N/A')} | "
-                    f"Total: {stats.get('total_time', 'N/A')} | "
-                    f"Last Speed: {stats.get('last_speed', 'N/A')}"
-                )
-            else:
-                if self.preview_path and os.path.isfile(self.preview_path):
-                    gallery_update = [self.preview_path]
-                else:
-                    gallery_update = gr.skip()
-
-                yield (
-                    self.fcommand,
-                    gr.update(value=update["percent"]),
-                    update["status"],
-                    gr.update(value=""),
-                    gallery_update
-                )
+    def _format_final_stats(self, stats: dict) -> str:
+        """Formats the final stats reported by the subprocess."""
+        return (
+            f"Tensor Load: {stats.get('tensor_load_time', 'N/A')} | "
+            f"Sampling: {stats.get('sampling_time', 'N/A')} | "
+            f"Decode: {stats.get('decoding_time', 'N/A')} | "
+            f"Total: {stats.get('total_time', 'N/A')} | "
+            f"Last Speed: {stats.get('last_speed', 'N/A')}"
+        )
+
+    def _progress_update(self, update: dict) -> tuple:
+        """Builds the UI update for a progress report."""
+        if self.preview_path and os.path.isfile(self.preview_path):
+            gallery_update = [self.preview_path]
+        else:
+            gallery_update = gr.skip()
+
+        return (
+            self.fcommand,
+            gr.update(value=update["percent"]),
+            update["status"],
+            gr.update(value=""),
+            gallery_update
+        )
 
+    def _finish_run(self, final_stats_str: str) -> tuple:
+        """Cleans up the preview and returns the final UI update."""
         if self.preview_path and os.path.isfile(self.preview_path):
             os.remove(self.preview_path)
 
@@ -310,7 +318,7 @@ class CommandRunner(CommonRunner):
         else:
             final_gallery_update = gr.skip()
 
-        yield (
+        return (
             self.fcommand,
             gr.update(visible=False, value=100),
             gr.update(visible=False, value=""),
@@ -318,6 +326,57 @@ class CommandRunner(CommonRunner):
             final_gallery_update
         )
 
+    def run(self) -> Generator:
+        """Runs the command and yields Gradio updates."""
+        initial_update = self._start_run()
+        process_env = self._build_process_env()
+        yield initial_update
+
+        manager = queue_manager.current_subprocess_manager() or subprocess_manager
+
+        final_stats_str = "Process completed with unknown stats."
+        for update in manager.run_subprocess(
+            self.command, env=process_env
+        ):
+            if "final_stats" in update:
+                final_stats_str = self._format_final_stats(
+                    update["final_stats"]
+                )
+            else:
+                yield self._progress_update(update)
+
+        yield self._finish_run(final_stats_str)
+
+    async def run_async(self, manager=None) -> AsyncGenerator:
+        """
+        Runs the command on the asyncio event loop and yields the
+        same Gradio updates as run().
+
+        Pass a dedicated SubprocessManager to run several commands
+        concurrently; the shared one is used by default.
+        """
+        manager = (
+            manager or queue_manager.current_subprocess_manager()
+            or subprocess_manager
+        )
+
+        initial_update = self._start_run()
+        process_env = self._build_process_env()
+        yield initial_update
+
+        final_stats_str = "Process completed with unknown stats."
+        async for update in manager.run_subprocess_async(
+            self.command, env=process_env
+        ):
+            if "final_stats" in update:
+                final_stats_str = self._format_final_stats(
+                    update["final_stats"]
+                )
+            else:
+                yield self._progress_update(update)
+
+        yield self._finish_run(final_stats_str)
+
 
 class ImageGenerationRunner(CommandRunner):
     """A common base for txt2img, img2img, and imgedit runners."""
@@ -758,32 +817,36 @@ class UpscaleRunner(CommandRunner):
         self._add_flags(self._get_common_flags())
 
 
-def txt2img(params: dict) -> Generator:
+async def txt2img(params: dict) -> AsyncGenerator:
     """Creates and runs a Txt2ImgRunner."""
     runner = Txt2ImgRunner(mode="img_gen", params=params)
     runner.build_command()
-    yield from runner.run()
+    async for update in runner.run_async():
+        yield update
 
 
-def img2img(params: dict) -> Generator:
+async def img2img(params: dict) -> AsyncGenerator:
     """Creates and runs an Img2ImgRunner."""
     runner = Img2ImgRunner(mode="img_gen", params=params)
     runner.build_command()
-    yield from runner.run()
+    async for update in runner.run_async():
+        yield update
 
 
-def imgedit(params: dict) -> Generator:
+async def imgedit(params: dict) -> AsyncGenerator:
     """Creates and runs an ImgEditRunner."""
     runner = ImgEditRunner(mode="img_gen", params=params)
     runner.build_command()
-    yield from runner.run()
+    async for update in runner.run_async():
+        yield update
 
 
-def any2video(params: dict) -> Generator:
+async def any2video(params: dict) -> AsyncGenerator:
     """Creates and runs an Any2VideoRunner."""
     runner = Any2VideoRunner(mode="vid_gen", params=params)
     runner.build_command()
-    yield from runner.run()
+    async for update in runner.run_async():
+        yield update
 
 
 def upscale(params: dict) -> Generator:
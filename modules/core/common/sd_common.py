@@ -175,6 +175,9 @@ class CommonRunner():
                 elif isinstance(value, int):
                     process_env[key] = str(value)
                     settings_to_print.append(f"{key}={str(value)}")
+                elif isinstance(value, str) and value:
+                    process_env[key] = value
+                    settings_to_print.append(f"{key}={value}")
             if settings_to_print:
                 full_line = " ".join(settings_to_print)
                 print(f"  SET: {full_line}\n\n")
@@ -1,24 +1,35 @@
 """sd.cpp-webui - core - stable-diffusion.cpp server manager"""
 
 import threading
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 import gradio as gr
 
 from modules.core.common.sd_common import (
     CommonRunner
 )
+from modules.core.server.pool import ServerPool, ServerSlot
+from modules.utils.sdcpp_utils import extract_env_vars
 from modules.shared_instance import (
-    config, subprocess_manager, SD_SERVER, server_state
+    config, SD_SERVER, server_state
 )
 
 
+server_pool = ServerPool(config.get('def_server_pool_size'))
+
+
 class ServerRunner(CommonRunner):
     """
     Builds and manages the sd-server command execution.
     """
 
     def __init__(self, params: Dict[str, Any]):
+        # A queue worker's device profile picks where the server runs,
+        # not what it loads, so it's kept out of launch_key()
+        self.device_env = dict(params.get('device_env') or {})
+        self.launch_env = extract_env_vars({
+            k: v for k, v in params.items() if k != 'device_env'
+        })
         super().__init__(params)
         self.command = [SD_SERVER]
 
@@ -26,10 +37,10 @@ class ServerRunner(CommonRunner):
         """Constructs the server arguments."""
         self._resolve_paths()
 
-        # Network settings
+        # Network settings, launch_key() relies on them coming first
         self.command.extend([
-            "--listen-ip", str(self._get_param('ip', '127.0.0.1')),
-            "--listen-port", str(self._get_param('port', 1234)),
+            "--listen-ip", self.listen_ip(),
+            "--listen-port", str(self.listen_port()),
         ])
 
         options = self._get_common_model_options()
@@ -50,11 +61,32 @@ class ServerRunner(CommonRunner):
 
         self._add_flags(self._get_common_flags())
 
+    def listen_ip(self) -> str:
+        return str(self._get_param('in_ip') or '127.0.0.1')
+
+    def listen_port(self) -> int:
+        return int(self._get_param('in_port') or 1234)
+
+    def set_listen_port(self, port: int):
+        """Moves the server to another port."""
+        self.command[self.command.index("--listen-port") + 1] = str(port)
+
+    def launch_key(self) -> tuple:
+        """
+        Identifies what the server loads: the command without the
+        executable and network settings, plus the env vars set in the UI.
+        The device profile's env vars are matched apart, by the pool.
+        """
+        return (
+            tuple(map(str, self.command[5:])),
+            tuple(sorted((k, str(v)) for k, v in self.launch_env.items()))
+        )
+
     def _prepare_for_run(self):
         """Prepares the final command string for printing."""
         self.fcommand = ' '.join(map(str, self.command))
 
-    def run(self):
+    def run(self, slot: ServerSlot):
         """Starts the server thread and handles initial setup/logging."""
         self._prepare_for_run()
         print(f"\n\n{self.fcommand}\n\n")
@@ -66,7 +98,7 @@ class ServerRunner(CommonRunner):
 
             try:
                 final_stats_str = "Process completed with unknown stats."
-                for update in subprocess_manager.run_subprocess(
+                for update in slot.subprocess_manager.run_subprocess(
                     self.command, env=process_env
                 ):
                     if "final_stats" in update:
@@ -82,10 +114,12 @@ class ServerRunner(CommonRunner):
                         server_state.latest_update = {"status": final_stats_str}
                     else:
                         server_state.latest_update = update
+                        slot.latest_update = update
             except Exception as e:
                 print(f"[SD-Server] Crashed: {e}")
             finally:
-                server_state.running = False
+                server_pool.release(slot)
+                server_state.running = server_pool.running
 
         thread = threading.Thread(target=run_server_wrapper, daemon=True)
         thread.start()
@@ -95,28 +129,55 @@ class ServerRunner(CommonRunner):
 
 
 def start_server(params):
-    """Start the sd-server subprocess with validated paths."""
-
-    if server_state.running:
-        return "Running", gr.skip()
-
+    """
+    Start an sd-server with the given models, or reuse the one of the
+    pool that already has them loaded.
+    """
     try:
         runner = ServerRunner(params)
         runner.build_command()
-        return runner.run()
+        slot, is_new = server_pool.acquire(
+            runner.launch_key(), runner.listen_ip(), runner.listen_port(),
+            runner.device_env
+        )
+        if not is_new:
+            return "Running", gr.update(active=True), gr.update(interactive=True)
+
+        if slot.port != runner.listen_port():
+            print(
+                f"Port {runner.listen_port()} is taken, "
+                f"starting on port {slot.port}."
+            )
+            runner.set_listen_port(slot.port)
+        return runner.run(slot)
 
     except Exception as e:
-        return f"Error: {e}", gr.update(interactive=False)
+        return (
+            f"Error: {e}", gr.update(active=False),
+            gr.update(interactive=False)
+        )
+
+
+def route_request(params: Dict[str, Any]) -> Optional[ServerSlot]:
+    """
+    Returns the pool's server that has the models of a generation
+    request loaded, on the device of the worker running it if there's
+    one, None if no server is running.
+    """
+    runner = ServerRunner(dict(params))
+    runner.build_command()
+    return server_pool.route(
+        runner.launch_key(), runner.device_env or None
+    )
 
 
 def stop_server():
-    """Stop the sd-server subprocess."""
-    if not server_state.running:
-        return "Stopped", gr.update(interactive=False)
+    """Stop every sd-server of the pool."""
+    if not server_pool.running:
+        return "Stopped", gr.update(active=False), gr.update(interactive=False)
 
     try:
-        # Use the manager to kill the process
-        subprocess_manager.kill_subprocess()
+        server_pool.stop_all()
         server_state.running = False
 
         return (
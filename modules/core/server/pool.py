@@ -0,0 +1,189 @@
+"""sd.cpp-webui - core - sd-server process pool"""
+
+import time
+import socket
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from modules.utils.subprocess_manager import SubprocessManager
+
+# How long a stopped server gets to free its port
+STOP_TIMEOUT = 15
+
+
+class ServerSlot:
+    """
+    One sd-server process, the launch configuration it runs and the
+    device env vars it was started with.
+
+    The progress the process prints is kept as latest_update, and
+    belongs to the request last announced with begin_request().
+    """
+
+    def __init__(
+        self, key: Hashable, ip: str, port: int,
+        device_env: Optional[Dict[str, str]] = None
+    ):
+        self.key = key
+        self.ip = ip
+        self.port = port
+        self.device_env = dict(device_env or {})
+        self.subprocess_manager = SubprocessManager()
+        self.last_used = time.monotonic()
+        self.latest_update = {}
+        self.request_id = None
+
+    @property
+    def address(self) -> Tuple[str, str]:
+        return self.ip, str(self.port)
+
+    def begin_request(self, request_id: str):
+        """Attributes the progress printed from now on to a request."""
+        self.request_id = request_id
+        self.latest_update = {}
+
+    def progress(self, request_id: str) -> dict:
+        """Returns the latest progress of a request, empty if unknown."""
+        if self.request_id != request_id:
+            return {}
+        return dict(self.latest_update)
+
+    def stop(self):
+        """Terminates the process and waits for it to exit."""
+        process = self.subprocess_manager.process
+        if process is None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=STOP_TIMEOUT)
+        except Exception:
+            process.kill()
+
+
+class ServerPool:
+    """
+    The sd-server processes kept alive, each with its own models, flags
+    and device.
+
+    A launch configuration that already has a process is reused, so
+    switching between the loaded model sets costs no reload. Starting a
+    new configuration when the pool is full stops the least recently
+    used process first. Each process gets the requested port, or the
+    next free one above it.
+    """
+
+    def __init__(self, max_slots: int = 1):
+        self.max_slots = max(int(max_slots or 1), 1)
+        self._slots: List[ServerSlot] = []
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return bool(self._slots)
+
+    def slots(self) -> List[ServerSlot]:
+        """Returns the live slots, most recently used first."""
+        with self._lock:
+            return sorted(
+                self._slots, key=lambda s: s.last_used, reverse=True
+            )
+
+    def _find(
+        self, key: Hashable, device_env: Optional[Dict[str, str]] = None
+    ) -> Optional[ServerSlot]:
+        """
+        Returns a slot with the configuration loaded, on the given
+        device if one is, or on any device when device_env is None.
+        """
+        matches = [slot for slot in self._slots if slot.key == key]
+        if device_env is not None:
+            for slot in matches:
+                if slot.device_env == device_env:
+                    return slot
+        return matches[0] if matches else None
+
+    def _port_for(self, ip: str, port: int) -> int:
+        """The requested port, or the next one no slot or program uses."""
+        taken = {slot.port for slot in self._slots}
+        candidate = port
+        while candidate <= 65535:
+            if candidate not in taken and _port_is_free(ip, candidate):
+                return candidate
+            candidate += 1
+        raise RuntimeError(f"No free port from {port} up")
+
+    def acquire(
+        self, key: Hashable, ip: str, port: int,
+        device_env: Optional[Dict[str, str]] = None
+    ) -> Tuple[ServerSlot, bool]:
+        """
+        Returns the slot running a launch configuration on a device, and
+        whether it's new and still has to be started by the caller.
+        """
+        device_env = dict(device_env or {})
+        evicted = []
+        with self._lock:
+            slot = self._find(key, device_env)
+            if slot is not None and slot.device_env == device_env:
+                slot.last_used = time.monotonic()
+                return slot, False
+
+            while len(self._slots) >= self.max_slots:
+                oldest = min(self._slots, key=lambda s: s.last_used)
+                self._slots.remove(oldest)
+                evicted.append(oldest)
+
+        for old in evicted:
+            print(
+                f"Stopping the sd-server on port {old.port} "
+                "to make room for a new model set."
+            )
+            old.stop()
+
+        with self._lock:
+            slot = ServerSlot(
+                key, ip, self._port_for(ip, port), device_env
+            )
+            self._slots.append(slot)
+        return slot, True
+
+    def route(
+        self, key: Hashable, device_env: Optional[Dict[str, str]] = None
+    ) -> Optional[ServerSlot]:
+        """
+        Returns the slot with the given configuration loaded, preferably
+        on the given device, or else the most recently used one, None if
+        nothing is running.
+        """
+        with self._lock:
+            slot = self._find(key, device_env)
+            if slot is None and self._slots:
+                slot = max(self._slots, key=lambda s: s.last_used)
+            if slot is not None:
+                slot.last_used = time.monotonic()
+            return slot
+
+    def release(self, slot: ServerSlot):
+        """Forgets a slot whose process exited."""
+        with self._lock:
+            if slot in self._slots:
+                self._slots.remove(slot)
+
+    def stop_all(self):
+        """Stops every process of the pool."""
+        with self._lock:
+            slots = list(self._slots)
+            self._slots.clear()
+        for slot in slots:
+            slot.stop()
+
+
+def _port_is_free(ip: str, port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((ip, port))
+        except OSError:
+            return False
+    return True
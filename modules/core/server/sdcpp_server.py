@@ -4,21 +4,65 @@ import os
 import io
 import re
 import json
+import uuid
 import base64
-import httpx
+import asyncio
+import functools
 from PIL import Image
-from typing import Dict, Any, Generator
+from typing import Dict, Any, AsyncGenerator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 import gradio as gr
 
 from modules.core.common.sd_common import process_editor_mask
+from modules.core.server.manager import route_request
 from modules.utils.file_utils import get_path
 from modules.loader import get_loras
 from modules.utils.sdcpp_utils import generate_output_filename
 from modules.utils.metadata_utils import (
-    build_a1111_metadata, save_image_with_metadata
+    PNG_SIGNATURE, build_a1111_metadata, save_image_with_metadata,
+    save_png_bytes_with_metadata
 )
-from modules.shared_instance import config, server_state
+from modules.shared_instance import config, server_state, http_clients
+
+# How often a request waiting on the server reports its progress
+PROGRESS_INTERVAL = 0.5
+
+JPEG_SIGNATURE = b'\xff\xd8\xff'
+
+# Saves the returned images, PNG compression releases the GIL
+_save_pool = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="api-save"
+)
+
+
+def png_compress_level() -> int:
+    """The zlib level of the PNGs encoded here, from the settings."""
+    return int(config.get('def_png_compress_level'))
+
+
+def encode_input_image(
+    image, compress_level: int = 6
+) -> Tuple[bytes, str]:
+    """
+    Returns an input image as encoded bytes and their MIME type.
+    PNG and JPEG files are sent as they are on disk, since sd-server
+    decodes both, anything else is encoded to PNG.
+    """
+    if isinstance(image, str):
+        with open(image, 'rb') as file:
+            data = file.read()
+        if data.startswith(PNG_SIGNATURE):
+            return data, "image/png"
+        if data.startswith(JPEG_SIGNATURE):
+            return data, "image/jpeg"
+        image = Image.open(io.BytesIO(data))
+    elif not isinstance(image, Image.Image):
+        image = Image.fromarray(image)
+
+    buf = io.BytesIO()
+    image.save(buf, format="PNG", compress_level=compress_level)
+    return buf.getvalue(), "image/png"
 
 
 class ApiTaskRunner:
@@ -32,10 +76,16 @@ class ApiTaskRunner:
         self.params = params
         self.ip = str(self._get_param('in_ip'))
         self.port = str(self._get_param('in_port'))
+        # Send it to the server that has the requested models loaded
+        self.slot = route_request(params)
+        if self.slot:
+            self.ip, self.port = self.slot.address
+        self.request_id = uuid.uuid4().hex
         self.url = ""
 
         self.output_path = ""
         self.outputs = []
+        self._saved = {}
         self.fcommand = ""
 
     def _set_output_path(self, dir_key: str, subctrl_id: int, extension: str):
@@ -220,41 +270,184 @@ class ApiTaskRunner:
 
         return payload
 
-    def _process_response(self, data: dict):
+    def _split_batch(self, payload) -> List:
+        """
+        Splits a batch into one request per image, so every image can
+        be shown as soon as it's done. sd.cpp gives the images of a
+        batch consecutive seeds, the split requests get the same ones.
+        Multipart payloads are sent whole.
+        """
+        if isinstance(payload, tuple) or payload.get("batch_size", 1) <= 1:
+            return [payload]
+
+        seed = payload.get("seed", -1)
+        requests = []
+        for i in range(payload["batch_size"]):
+            request = dict(payload, batch_size=1)
+            if seed >= 0:
+                request["seed"] = seed + i
+            requests.append(request)
+        return requests
+
+    def _display_command(self, payload_or_files) -> str:
+        """The request as shown in the UI, without the image data."""
+        if isinstance(payload_or_files, tuple):
+            return json.dumps(payload_or_files[0], indent=4)
+
+        display_payload = payload_or_files.copy()
+        for key in ["init_images", "mask"]:
+            if key in display_payload:
+                if isinstance(display_payload[key], list):
+                    display_payload[key] = [img[:60] + "..." for img in display_payload[key]]
+                elif isinstance(display_payload[key], str):
+                    display_payload[key] = display_payload[key][:60] + "..."
+        return json.dumps(display_payload, indent=4)
+
+    def _save_image(self, index: int, b64_data: str, seed: Any) -> str:
+        """Decodes and saves one returned image, returns its path."""
         base, ext = os.path.splitext(self.output_path)
+        if "," in b64_data:
+            b64_data = b64_data.split(",")[1]
+
+        image_bytes = base64.b64decode(b64_data)
+        target_path = self.output_path if index == 0 else f"{base}_{index + 1}{ext}"
+        if ext.lower() != '.png':
+            Image.open(io.BytesIO(image_bytes)).save(target_path)
+        elif image_bytes.startswith(PNG_SIGNATURE):
+            # Already a PNG, only the metadata chunk gets added
+            meta_string = build_a1111_metadata(self.params, seed)
+            save_png_bytes_with_metadata(image_bytes, target_path, meta_string)
+        else:
+            meta_string = build_a1111_metadata(self.params, seed)
+            image = Image.open(io.BytesIO(image_bytes))
+            save_image_with_metadata(
+                image, target_path, meta_string,
+                compress_level=png_compress_level()
+            )
+        return target_path
+
+    @staticmethod
+    def _request_seed(request) -> Optional[int]:
+        """The seed a request asked for, None if it's random."""
+        fields = request[0] if isinstance(request, tuple) else request
+        try:
+            seed = int(fields.get("seed", -1))
+        except (TypeError, ValueError):
+            return None
+        return seed if seed >= 0 else None
+
+    def _start_saves(
+        self, data: dict, start: int = 0, seed: Optional[int] = None
+    ) -> set:
+        """
+        Starts saving the images of a response, numbered from start, on
+        the thread pool, and returns their futures.
+        The images get consecutive seeds from the requested one, or the
+        random seed the server last logged, read as the response comes
+        in rather than when the save runs.
+        """
         images_list = data.get("images", []) or [item.get("b64_json") for item in data.get("data", []) if "b64_json" in item]
+        logged_seed = server_state.seed
 
-        for i, b64_data in enumerate(images_list):
+        loop = asyncio.get_running_loop()
+        saving = set()
+        for offset, b64_data in enumerate(images_list):
             if not b64_data:
                 continue
-            if "," in b64_data:
-                b64_data = b64_data.split(",")[1]
+            image_seed = logged_seed if seed is None else seed + offset
+            future = loop.run_in_executor(
+                _save_pool, self._save_image, start + offset, b64_data,
+                image_seed
+            )
+            future.add_done_callback(
+                functools.partial(self._store_output, start + offset)
+            )
+            saving.add(future)
+        return saving
 
-            image_bytes = base64.b64decode(b64_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            target_path = self.output_path if i == 0 else f"{base}_{i + 1}{ext}"
-            if ext.lower() == '.png':
-                meta_string = build_a1111_metadata(self.params, server_state.seed)
-                save_image_with_metadata(image, target_path, meta_string)
-            else:
-                image.save(target_path)
-            self.outputs.append(target_path)
+    def _store_output(self, index: int, future: asyncio.Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._saved[index] = future.result()
 
-    def run(self) -> Generator:
-        self._resolve_paths()
-        payload_or_files = self._build_payload()
+    def _publish_saved(self, responses: list, done: set) -> bool:
+        """
+        Drops the finished saves from the responses still being saved.
+        Once every image of a response is written, self.outputs gets all
+        the saved images in order and True is returned, so the growing
+        list goes out once per response rather than once per image.
+        """
+        for future in done:
+            future.result()
+
+        finished = False
+        for saving in responses:
+            if saving & done:
+                saving -= done
+                finished = finished or not saving
+        responses[:] = [saving for saving in responses if saving]
+
+        if finished:
+            self.outputs = [self._saved[i] for i in sorted(self._saved)]
+        return finished
+
+    def _outputs_update(self) -> tuple:
+        return (
+            self.fcommand,
+            gr.skip(),
+            gr.skip(),
+            gr.skip(),
+            list(self.outputs) or None
+        )
 
+    async def _finish_saves(self, responses: list) -> AsyncGenerator:
+        """
+        Waits for the images still being saved, yielding the outputs
+        each time a response is done.
+        """
+        while responses:
+            done, _ = await asyncio.wait(
+                set().union(*responses), return_when=asyncio.FIRST_COMPLETED
+            )
+            if self._publish_saved(responses, done):
+                yield self._outputs_update()
+
+    async def _post(self, client, payload_or_files):
         if isinstance(payload_or_files, tuple):
-            self.fcommand = json.dumps(payload_or_files[0], indent=4)
-        else:
-            display_payload = payload_or_files.copy()
-            for key in ["init_images", "mask"]:
-                if key in display_payload:
-                    if isinstance(display_payload[key], list):
-                        display_payload[key] = [img[:60] + "..." for img in display_payload[key]]
-                    elif isinstance(display_payload[key], str):
-                        display_payload[key] = display_payload[key][:60] + "..."
-            self.fcommand = json.dumps(display_payload, indent=4)
+            data, files = payload_or_files
+            return await client.post(self.url, data=data, files=files)
+        return await client.post(self.url, json=payload_or_files)
+
+    def _progress_update(self, index: int, total: int) -> tuple:
+        """Builds the UI update for the request being generated."""
+        update = self.slot.progress(self.request_id) if self.slot else {}
+        percent = update.get("percent", 0)
+        status = update.get("status", "Starting...")
+        if total > 1:
+            percent = int((index * 100 + percent) / total)
+            status = f"Image {index + 1}/{total} | {status}"
+
+        return (
+            self.fcommand,
+            gr.update(value=percent),
+            status,
+            gr.skip(),
+            list(self.outputs) or gr.skip()
+        )
+
+    def _reset_lora_cache(self):
+        ApiTaskRunner._lora_lookup_cache.clear()
+        ApiTaskRunner._lora_cache_timestamp = 0
+
+    async def run_async(self) -> AsyncGenerator:
+        """
+        Sends the request and yields Gradio updates: the progress of
+        the image being generated, then the images of each response
+        once they're saved.
+        """
+        self._resolve_paths()
+        payload_or_files = self._build_payload()
+        self.fcommand = self._display_command(payload_or_files)
 
         yield (
             self.fcommand,
@@ -264,53 +457,65 @@ class ApiTaskRunner:
             None
         )
 
+        requests = self._split_batch(payload_or_files)
+        # Saves of the earlier responses still running, one set per
+        # response, while the next request is already generating
+        responses = []
         try:
-            if isinstance(payload_or_files, tuple):
-                data, files = payload_or_files
-                response = httpx.post(
-                    self.url, data=data, files=files, timeout=None
-                )
-            else:
-                response = httpx.post(
-                    self.url, json=payload_or_files, timeout=None
+            client = http_clients.get_async(self.ip, self.port)
+            for index, request in enumerate(requests):
+                if self.slot:
+                    self.slot.begin_request(self.request_id)
+                task = asyncio.ensure_future(self._post(client, request))
+                try:
+                    while not task.done():
+                        done, _ = await asyncio.wait(
+                            set().union({task}, *responses),
+                            timeout=PROGRESS_INTERVAL,
+                            return_when=asyncio.FIRST_COMPLETED
+                        )
+                        self._publish_saved(responses, done - {task})
+                        if not task.done():
+                            yield self._progress_update(index, len(requests))
+                finally:
+                    # The job was cancelled, drop its request as well
+                    if not task.done():
+                        task.cancel()
+
+                response = task.result()
+                if response.status_code != 200:
+                    # SAFEGUARD: The API rejected the request (missing lora?).
+                    #            Wipe lora cache.
+                    self._reset_lora_cache()
+                    async for update in self._finish_saves(responses):
+                        yield update
+                    yield self._outputs_update()
+                    return
+
+                saving = self._start_saves(
+                    response.json(), start=index,
+                    seed=self._request_seed(request)
                 )
+                if saving:
+                    responses.append(saving)
 
-            if response.status_code == 200:
-                self._process_response(response.json())
-                gen_stats = getattr(
-                    server_state, "last_generation_stats", "No stats recorded."
-                )
+            async for update in self._finish_saves(responses):
+                yield update
 
-                yield (
-                    self.fcommand,
-                    gr.skip(),
-                    gr.skip(),
-                    gr.update(value=gen_stats),
-                    self.outputs
-                )
-            else:
-                # SAFEGUARD: The API rejected the request (missing lora?).
-                #            Wipe lora cache.
-                ApiTaskRunner._lora_lookup_cache.clear()
-                ApiTaskRunner._lora_cache_timestamp = 0
-                yield (
-                    self.fcommand,
-                    gr.skip(),
-                    gr.skip(),
-                    gr.skip(),
-                    None
-                )
-        except Exception:
-            # SAFEGUARD: Hard crash. Wipe lora cache.
-            ApiTaskRunner._lora_lookup_cache.clear()
-            ApiTaskRunner._lora_cache_timestamp = 0
+            gen_stats = getattr(
+                server_state, "last_generation_stats", "No stats recorded."
+            )
             yield (
                 self.fcommand,
                 gr.skip(),
                 gr.skip(),
-                gr.skip(),
-                None
+                gr.update(value=gen_stats),
+                self.outputs
             )
+        except Exception:
+            # SAFEGUARD: Hard crash. Wipe lora cache.
+            self._reset_lora_cache()
+            yield self._outputs_update()
 
 
 class Txt2ImgApiRunner(ApiTaskRunner):
@@ -318,7 +523,7 @@ class Txt2ImgApiRunner(ApiTaskRunner):
         self._set_output_path(
             dir_key='txt2img_dir', subctrl_id=0, extension='png'
         )
-        self.url = f"http://{self.ip}:{self.port}/sdapi/v1/txt2img"
+        self.url = "/sdapi/v1/txt2img"
 
 
 class Img2ImgApiRunner(ApiTaskRunner):
@@ -326,28 +531,25 @@ class Img2ImgApiRunner(ApiTaskRunner):
         self._set_output_path(
             dir_key='img2img_dir', subctrl_id=0, extension='png'
         )
-        self.url = f"http://{self.ip}:{self.port}/sdapi/v1/img2img"
+        self.url = "/sdapi/v1/img2img"
 
     def _build_payload(self) -> dict:
         payload = super()._build_payload()
         init_img = self._get_param('in_img_inp') or self._get_param('in_first_frame_inp')
         if init_img is not None:
-            if isinstance(init_img, str):
-                init_img = Image.open(init_img)
-            elif not isinstance(init_img, Image.Image):
-                init_img = Image.fromarray(init_img)
-
-            buf = io.BytesIO()
-            init_img.save(buf, format="PNG")
-            payload["init_images"] = [base64.b64encode(buf.getvalue()).decode('utf-8')]
+            data, _ = encode_input_image(
+                init_img, png_compress_level()
+            )
+            payload["init_images"] = [base64.b64encode(data).decode('utf-8')]
 
         mask_input = self._get_param('in_img_mask') or self._get_param('in_mask_img')
         mask_img = process_editor_mask(mask_input)
 
         if mask_img is not None:
-            m_buf = io.BytesIO()
-            mask_img.save(m_buf, format="PNG")
-            payload["mask"] = base64.b64encode(m_buf.getvalue()).decode('utf-8')
+            data, _ = encode_input_image(
+                mask_img, png_compress_level()
+            )
+            payload["mask"] = base64.b64encode(data).decode('utf-8')
             payload["inpainting_mask_invert"] = self._get_param('in_invert_mask', False)
         return payload
 
@@ -355,7 +557,7 @@ class Img2ImgApiRunner(ApiTaskRunner):
 class ImgEditApiRunner(ApiTaskRunner):
     def prepare(self):
         self._set_output_path(dir_key='imgedit_dir', subctrl_id=2, extension='png')
-        self.url = f"http://{self.ip}:{self.port}/v1/images/edits"
+        self.url = "/v1/images/edits"
 
     def _build_payload(self) -> tuple:
         """Constructs multipart form data and files."""
@@ -386,44 +588,42 @@ class ImgEditApiRunner(ApiTaskRunner):
                 else:
                     img_val = img_item
 
-                if isinstance(img_val, str):
-                    img_obj = Image.open(img_val)
-                elif isinstance(img_val, Image.Image):
-                    img_obj = img_val
-                else:
-                    img_obj = Image.fromarray(img_val)
-
-                buf = io.BytesIO()
-                img_obj.save(buf, format="PNG")
-                buf.seek(0)
-
-                files.append(("image[]", (f"image_{idx}.png", buf, "image/png")))
+                data, mime_type = encode_input_image(
+                    img_val, png_compress_level()
+                )
+                extension = "jpg" if mime_type == "image/jpeg" else "png"
+                files.append(
+                    ("image[]", (f"image_{idx}.{extension}", data, mime_type))
+                )
 
         mask_input = self._get_param('in_img_mask') or self._get_param('in_mask_img')
         mask_img = process_editor_mask(mask_input)
 
         if mask_img is not None:
-            m_buf = io.BytesIO()
-            mask_img.save(m_buf, format="PNG")
-            m_buf.seek(0)
-            files.append(("mask", ("mask.png", m_buf, "image/png")))
+            data, _ = encode_input_image(
+                mask_img, png_compress_level()
+            )
+            files.append(("mask", ("mask.png", data, "image/png")))
 
         return form_data, files
 
 
-def txt2img_api(params: dict):
+async def txt2img_api(params: dict):
     runner = Txt2ImgApiRunner(params)
     runner.prepare()
-    yield from runner.run()
+    async for update in runner.run_async():
+        yield update
 
 
-def img2img_api(params: dict):
+async def img2img_api(params: dict):
     runner = Img2ImgApiRunner(params)
     runner.prepare()
-    yield from runner.run()
+    async for update in runner.run_async():
+        yield update
 
 
-def imgedit_api(params: dict):
+async def imgedit_api(params: dict):
     runner = ImgEditApiRunner(params)
     runner.prepare()
-    yield from runner.run()
+    async for update in runner.run_async():
+        yield update
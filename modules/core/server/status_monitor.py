@@ -1,13 +1,21 @@
 """sd.cpp-webui - core - Server status monitor module"""
 
-import httpx
-
 import gradio as gr
 
-from modules.shared_instance import server_state
+from modules.shared_instance import server_state, http_clients
+from modules.core.server.manager import server_pool
+from modules.core.server.status_prober import (
+    StatusProber, LOADING, CHECKING, NO_MODEL
+)
 import modules.utils.queue as queue_manager
 
 
+status_prober = StatusProber(
+    http_clients.get, lambda: [slot.address for slot in server_pool.slots()],
+    timeout=http_clients.status_timeout
+)
+
+
 def get_server_status():
     """
     Check if the server is actually running.
@@ -17,40 +25,14 @@ def get_server_status():
     return "Stopped", gr.update(interactive=False)
 
 
-def get_active_model_name(ip, port):
+def get_active_model_name():
     """
-    Gets the currently active model's name.
+    Gets the model name of the most recently used server, as last seen
+    by the status prober, which keeps polling every server of the pool
+    at its own address in the background.
     """
-    base_url = f"http://{ip}:{port}"
-
-    try:
-        resp = httpx.get(f"{base_url}/sdapi/v1/sd-models", timeout=1.0)
-        if resp.status_code == 200:
-            data = resp.json()
-            if isinstance(data, list) and len(data) > 0:
-                name = data[0].get("model_name") or data[0].get("title")
-                if name and name.strip():
-                    return name
-
-        resp_opt = httpx.get(f"{base_url}/sdapi/v1/options", timeout=1.0)
-        if resp_opt.status_code == 200:
-            opt_data = resp_opt.json()
-            checkpoint = opt_data.get("sd_model_checkpoint")
-            if checkpoint and checkpoint.strip():
-                return checkpoint
-
-        resp_v1 = httpx.get(f"{base_url}/v1/models", timeout=1.0)
-        if resp_v1.status_code == 200:
-            v1_data = resp_v1.json()
-            if "data" in v1_data and len(v1_data["data"]) > 0:
-                return v1_data["data"][0].get("id", "Unknown")
-
-    except httpx.RequestError:
-        return "Loading weights..."
-    except Exception:
-        return "Checking status..."
-
-    return "None"
+    status_prober.start()
+    return status_prober.model_name()
 
 
 def server_status_monitor_wrapper(ip, port):
@@ -68,8 +50,8 @@ def server_status_monitor_wrapper(ip, port):
             gr.update(visible=False),
             gr.update(visible=False)
         )
-    model_name = get_active_model_name(ip, port)
-    is_loading_model = model_name in ["Loading weights...", "Checking status..."]
+    model_name = get_active_model_name()
+    is_loading_model = model_name in [LOADING, CHECKING]
 
     job = queue_manager.get_status()
     latest = server_state.latest_update
@@ -100,12 +82,14 @@ def server_status_monitor_wrapper(ip, port):
         text_update = gr.update(visible=False)
         server_state.latest_update = {}
 
-    model_name = get_active_model_name(ip, port)
-    if is_loading_model or model_name == "None":
+    if is_loading_model or model_name == NO_MODEL:
         combined_status = "Loading (Model initializing...)"
         btn_interactive = False
     else:
         combined_status = f"Running (Model: {model_name})"
+        server_count = len(server_pool.slots())
+        if server_count > 1:
+            combined_status += f" + {server_count - 1} more servers"
         btn_interactive = True
 
     return (
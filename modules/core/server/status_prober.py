@@ -0,0 +1,121 @@
+"""sd.cpp-webui - core - sd-server status prober"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+LOADING = "Loading weights..."
+CHECKING = "Checking status..."
+NO_MODEL = "None"
+
+
+def _from_sd_models(data: Any) -> Optional[str]:
+    if isinstance(data, list) and len(data) > 0:
+        return data[0].get("model_name") or data[0].get("title")
+    return None
+
+
+def _from_options(data: Any) -> Optional[str]:
+    return data.get("sd_model_checkpoint")
+
+
+def _from_v1_models(data: Any) -> Optional[str]:
+    if "data" in data and len(data["data"]) > 0:
+        return data["data"][0].get("id", "Unknown")
+    return None
+
+
+# The endpoints that can name the loaded model, in the order tried
+MODEL_ENDPOINTS = (
+    ("/sdapi/v1/sd-models", _from_sd_models),
+    ("/sdapi/v1/options", _from_options),
+    ("/v1/models", _from_v1_models),
+)
+
+
+class StatusProber:
+    """
+    Polls every sd-server for the name of its loaded model on a
+    background thread, at a fixed cadence, so the UI reads the last
+    answers without waiting on the servers.
+
+    Each server is polled at its own address, and the endpoint that
+    answered it last time is asked first, so a steady server costs one
+    request per poll.
+    """
+
+    def __init__(
+        self, client_factory: Callable[[str, Any], httpx.Client],
+        addresses: Callable[[], List[Tuple[str, Any]]],
+        interval: float = 1.0, timeout: float = 1.0
+    ):
+        self.client_factory = client_factory
+        self.addresses = addresses
+        self.interval = interval
+        self.timeout = timeout
+        self._model_names: Dict[Tuple[str, Any], str] = {}
+        self._preferred: Dict[Tuple[str, Any], int] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Starts polling, if it hasn't started yet."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="server-status", daemon=True
+                )
+                self._thread.start()
+
+    def model_name(self, address: Optional[Tuple[str, Any]] = None) -> str:
+        """
+        Returns the last known model name of a server, by default the
+        first one listed, or a status placeholder.
+        """
+        if address is None:
+            addresses = self.addresses()
+            if not addresses:
+                return CHECKING
+            address = addresses[0]
+        with self._lock:
+            return self._model_names.get(tuple(address)) or CHECKING
+
+    def probe(self, ip: str, port) -> str:
+        """Asks a server once for the name of its loaded model."""
+        client = self.client_factory(ip, port)
+        preferred = self._preferred.get((ip, port), 0)
+        order = [preferred] + [
+            i for i in range(len(MODEL_ENDPOINTS)) if i != preferred
+        ]
+
+        try:
+            for index in order:
+                path, parse = MODEL_ENDPOINTS[index]
+                resp = client.get(path, timeout=self.timeout)
+                if resp.status_code != 200:
+                    continue
+                name = parse(resp.json())
+                if name and name.strip():
+                    self._preferred[(ip, port)] = index
+                    return name
+        except httpx.RequestError:
+            return LOADING
+        except Exception:
+            return CHECKING
+
+        return NO_MODEL
+
+    def _run(self):
+        while True:
+            addresses = [tuple(address) for address in self.addresses()]
+            names = {address: self.probe(*address) for address in addresses}
+
+            with self._lock:
+                self._model_names = names
+            for address in list(self._preferred):
+                if address not in names:
+                    del self._preferred[address]
+
+            time.sleep(self.interval)
@@ -7,12 +7,12 @@ from typing import List, Tuple, Any, Optional
 
 import gradio as gr
 
-from modules.shared_instance import config
-from modules.utils.image_utils import size_extractor
-from modules.utils.video_utils import get_avi_resolution
+from modules.shared_instance import config, output_index
+from modules.utils.gallery_index import GalleryIndex
+from modules.utils.thumbnail_cache import ThumbnailCache
+from modules.utils.search_index import SearchIndex
 from modules.utils.metadata_utils import (
-    parse_png_metadata, parse_jpg_metadata,
-    extract_params_from_text
+    extract_media_metadata, extract_metadata_batch
 )
 
 
@@ -40,6 +40,19 @@ class GalleryManager:
         self.selected_media_global_index: Optional[int] = None
         self.current_media_path: Optional[str] = None
 
+        self.index = GalleryIndex()
+        self.page_files: List[str] = []
+
+        self._search_index: Optional[SearchIndex] = None
+        self.search_query: Optional[str] = None
+        self.search_results: Optional[List[str]] = None
+
+        self.thumbnails: Optional[ThumbnailCache] = None
+        if config.get('def_gallery_thumbnails', True):
+            self.thumbnails = ThumbnailCache(
+                max_mb=config.get('def_thumbnail_cache_mb', 512)
+            )
+
     def _get_current_dir(self) -> str:
         """Determines the directory based on the control value."""
         if 0 <= self.ctrl < len(self.dirs):
@@ -49,27 +62,28 @@ class GalleryManager:
     def _get_sorted_files(self) -> List[str]:
         """
         Gets all image files from the current directory,
-        sorted by creation time.
+        sorted by the current sort order, or the search results.
         """
-        media_dir = self._get_current_dir()
-        try:
-            files = (
-                os.path.join(media_dir, f)
-                for f in os.listdir(media_dir)
-                if f.lower().endswith(('.png', '.jpg', '.jpeg', '.avi', '.webm', '.webp', '.mp4'))
-            )
-            if self.sort_order == "Date (Newest First)":
-                return sorted(files, key=os.path.getctime, reverse=True)
-            elif self.sort_order == "Name (A-Z)":
-                return sorted(files, key=lambda x: os.path.basename(x).lower())
-            elif self.sort_order == "Name (Z-A)":
-                return sorted(files, key=lambda x: os.path.basename(x).lower(), reverse=True)
-            else:
-                # Default: Date (Oldest First)
-                return sorted(files, key=os.path.getctime)
-
-        except (FileNotFoundError, OSError):
-            return []
+        if self.search_results is not None:
+            return self.search_results
+        return self.index.sorted_files(
+            self._get_current_dir(), self.sort_order
+        )
+
+    def _page_items(
+        self, page_files: List[str], selected_index: Optional[int] = None
+    ) -> List[str]:
+        """
+        Returns the thumbnails of a page, with the selected media
+        left at full size.
+        """
+        if self.thumbnails is None:
+            return page_files
+
+        items = self.thumbnails.get_many(page_files)
+        if selected_index is not None and 0 <= selected_index < len(items):
+            items[selected_index] = page_files[selected_index]
+        return items
 
     def reload_gallery(
         self, page_num: int = 1, ctrl_inp: Optional[int] = None,
@@ -77,11 +91,17 @@ class GalleryManager:
     ) -> Tuple[gr.update, int]:
         """Reloads the gallery block to a specific page."""
 
-        if sort_inp is not None:
+        if sort_inp is not None and sort_inp != self.sort_order:
             self.sort_order = sort_inp
+            if self.search_query:
+                self.search_results = self._get_search_index().search(
+                    self.search_query, self.sort_order
+                )
 
         if ctrl_inp is not None:
             self.ctrl = int(ctrl_inp)
+            self.search_query = None
+            self.search_results = None
 
         files = self._get_sorted_files()
         total_items = len(files)
@@ -103,6 +123,11 @@ class GalleryManager:
         end_index = start_index + PAGE_SIZE
 
         page_files = files[start_index:end_index]
+        self.page_files = page_files
+
+        if self.thumbnails is not None:
+            # Have the next page ready before it's asked for
+            self.thumbnails.prefetch(files[end_index:end_index + PAGE_SIZE])
 
         dir_map = {
             0: 'txt2img',
@@ -111,7 +136,13 @@ class GalleryManager:
             3: 'any2video',
             4: 'upscale'
         }
-        current_label = f"{dir_map.get(self.ctrl, 'Gallery')} - {self.sort_order}"
+        if self.search_query:
+            current_label = (
+                f"Search: {self.search_query} - {total_items} results"
+                f" - {self.sort_order}"
+            )
+        else:
+            current_label = f"{dir_map.get(self.ctrl, 'Gallery')} - {self.sort_order}"
 
         # Reset selections when reloading
         if selected_index is None:
@@ -120,13 +151,53 @@ class GalleryManager:
 
         return (
             gr.Gallery(
-                value=page_files,
+                value=self._page_items(page_files, selected_index),
                 label=current_label,
                 selected_index=selected_index
             ),
             self.page_num
         )
 
+    def show_selected(self) -> gr.update:
+        """Swaps the thumbnail of the selected media for the full file."""
+        index = self.selected_media_index_on_page
+        if (
+            self.thumbnails is None or index is None or
+            not 0 <= index < len(self.page_files)
+        ):
+            return gr.skip()
+
+        return gr.Gallery(
+            value=self._page_items(self.page_files, index),
+            selected_index=index
+        )
+
+    def _get_search_index(self) -> SearchIndex:
+        """Opens the search index on first use."""
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+        return self._search_index
+
+    def search_gallery(self, query: str) -> Tuple[gr.update, int]:
+        """
+        Shows the media of all the output folders matching the query,
+        or goes back to browsing the current folder if it's empty.
+        """
+        query = (query or "").strip()
+        if not query:
+            self.search_query = None
+            self.search_results = None
+            return self.reload_gallery(page_num=1)
+
+        search_index = self._get_search_index()
+        changes = search_index.sync(self.dirs, extract_metadata_batch)
+        if changes:
+            print(f"Search index: {changes} file(s) updated.")
+
+        self.search_query = query
+        self.search_results = search_index.search(query, self.sort_order)
+        return self.reload_gallery(page_num=1)
+
     def _navigate_page(
         self, direction: int
     ) -> Tuple[gr.update, int]:
@@ -189,25 +260,11 @@ class GalleryManager:
 
         self.current_media_path = files[self.selected_media_global_index]
 
-        raw_text = None
-        width = None
-        height = None
-        file_path_lower = self.current_media_path.lower()
+        info = self.index.get_info(self.current_media_path, extract_media_metadata)
+        raw_text = info['raw_text']
+        params = info['params']
+        width, height = info['width'], info['height']
 
-        try:
-            if file_path_lower.endswith('.png'):
-                raw_text = parse_png_metadata(self.current_media_path)
-                width, height = size_extractor(self.current_media_path)
-            elif file_path_lower.endswith(('.jpg', '.jpeg')):
-                raw_text = parse_jpg_metadata(self.current_media_path)
-                width, height = size_extractor(self.current_media_path)
-            elif file_path_lower.endswith(('.avi', '.mp4')):
-                raw_text = ""
-                width, height = get_avi_resolution(self.current_media_path)
-        except Exception as e:
-            print(f"Failed to read metadata for {self.current_media_path}: {e}")
-
-        params = extract_params_from_text(raw_text) if raw_text else {}
         is_avi = self.current_media_path and self.current_media_path.lower().endswith('.avi')
         ffmpeg_available = shutil.which("ffmpeg") is not None
 
@@ -268,6 +325,11 @@ class GalleryManager:
 
         try:
             os.remove(path_to_delete)
+            self.index.remove(path_to_delete)
+            if self.search_results is not None:
+                self.search_results = [
+                    p for p in self.search_results if p != path_to_delete
+                ]
             print(f"\nDeleted {path_to_delete}")
         except OSError as e:
             print(f"\nError deleting file: {e}")
@@ -303,15 +365,10 @@ class GalleryManager:
         self.selected_media_index_on_page = new_page_index
         self.current_media_path = files_after_delete[new_global_index]
 
-        raw_text = None
-        if self.current_media_path.lower().endswith('.png'):
-            raw_text = parse_png_metadata(self.current_media_path)
-        elif self.current_media_path.lower().endswith(('.jpg', '.jpeg')):
-            raw_text = parse_jpg_metadata(self.current_media_path)
-
-        params = extract_params_from_text(raw_text) if raw_text else {}
-
-        width, height = size_extractor(self.current_media_path)
+        info = self.index.get_info(self.current_media_path, extract_media_metadata)
+        raw_text = info['raw_text']
+        params = info['params']
+        width, height = info['width'], info['height']
 
         is_avi = self.current_media_path and self.current_media_path.lower().endswith('.avi')
         ffmpeg_available = shutil.which("ffmpeg") is not None
@@ -327,8 +384,55 @@ class GalleryManager:
         )
 
 
-def get_next_media(subctrl: int) -> str:
-    """Creates a new, sequential media name (e.g., '123.png')."""
+MEDIA_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.avi')
+
+
+def _media_number(filename: str) -> Optional[int]:
+    """
+    Returns the sequence number a media file name starts with, like 12
+    for '12.png' or '12_20_steps.png', None if it has none.
+    """
+    if not filename.endswith(MEDIA_EXTENSIONS):
+        return None
+    base_num_str = os.path.splitext(filename)[0].split('_')[0]
+    return int(base_num_str) if base_num_str.isdigit() else None
+
+
+def _scan_next_media(media_out_dir: str) -> int:
+    """Finds the next free media number by listing the output folder."""
+    try:
+        numbers = [
+            number for number in map(_media_number, os.listdir(media_out_dir))
+            if number is not None
+        ]
+        return max(numbers) + 1 if numbers else 1
+    except (ValueError, FileNotFoundError):
+        return 1
+
+
+def _media_number_taken(
+    media_out_dir: str, number: int, name_suffix: str = ""
+) -> bool:
+    """
+    Checks if the number is used by the names it would be saved under,
+    '{n}.ext' or '{n}_{name_suffix}.ext', with a few exists() probes
+    rather than listing the folder.
+    """
+    candidates = [str(number)]
+    if name_suffix:
+        candidates.append(f"{number}_{name_suffix}")
+    return any(
+        os.path.exists(os.path.join(media_out_dir, f"{name}{ext}"))
+        for name in candidates for ext in MEDIA_EXTENSIONS
+    )
+
+
+def get_next_media(subctrl: int, name_suffix: str = "") -> str:
+    """
+    Creates a new, sequential media name (e.g., '123.png').
+    :param name_suffix: What follows the number in the saved file name,
+        e.g. '20_steps' for '123_20_steps.png'
+    """
     dir_map = {
         0: 'txt2img_dir',
         1: 'img2img_dir',
@@ -342,20 +446,13 @@ def get_next_media(subctrl: int) -> str:
     if not os.path.isdir(media_out_dir):
         os.makedirs(media_out_dir, exist_ok=True)
 
-    try:
-        numbers = []
-        for f in os.listdir(media_out_dir):
-            if f.endswith(('.png', '.jpg', '.jpeg', '.avi')):
-                name_without_ext = os.path.splitext(f)[0]
-
-                base_num_str = name_without_ext.split('_')[0]
-
-                if base_num_str.isdigit():
-                    numbers.append(int(base_num_str))
-
-        next_number = max(numbers) + 1 if numbers else 1
-    except (ValueError, FileNotFoundError):
-        next_number = 1
+    next_number = output_index.reserve(
+        dir_key, [media_out_dir],
+        lambda: _scan_next_media(media_out_dir),
+        lambda number: _media_number_taken(
+            media_out_dir, number, name_suffix
+        )
+    )
 
     extension = ".avi" if subctrl == 3 else ".png"
 
@@ -10,7 +10,7 @@ from modules.utils.ui_events import (
     update_interactivity, refresh_all_options
 )
 from modules.shared_instance import (
-    config, subprocess_manager
+    config
 )
 from modules.ui.models import create_video_model_sel_ui
 from modules.ui.loras import (
@@ -318,11 +318,9 @@ with gr.Blocks() as any2video_block:
         preset_flag=is_loading_preset
     )
 
-    timer = gr.Timer(value=0.1, active=False)
-
     ui_outputs = {
         'gen_btn': gen_btn,
-        'timer': timer,
+        'kill_btn': kill_btn,
         'command': command,
         'progress_slider': progress_slider,
         'progress_textbox': progress_textbox,
@@ -335,12 +333,6 @@ with gr.Blocks() as any2video_block:
         any2video, ordered_keys, ordered_components, ui_outputs
     )
 
-    kill_btn.click(
-        subprocess_manager.kill_subprocess,
-        inputs=[],
-        outputs=[]
-    )
-
     # Interactive Bindings
     refresh_opt.click(
         refresh_all_options,
@@ -5,11 +5,13 @@ import gradio as gr
 from modules.core.cli.sdcpp_cli import convert
 from modules.utils.ui_events import get_ordered_inputs
 from modules.shared_instance import (
-    config, subprocess_manager
+    config, subprocess_manager, model_catalog
 )
 from modules.loader import (
     get_models, reload_models, model_choice
 )
+from modules.utils.file_utils import get_path
+from modules.utils.model_catalog import describe_model
 from modules.ui.constants import (
     MODELS, QUANTS, RELOAD_SYMBOL
 )
@@ -65,6 +67,7 @@ with gr.Blocks() as convert_block:
                     outputs=[orig_model]
                 )
                 inputs_map['in_orig_model'] = orig_model
+            model_info = gr.Markdown("")
 
             with gr.Row():
                 gguf_name = gr.Textbox(
@@ -145,6 +148,19 @@ with gr.Blocks() as convert_block:
 
     ordered_keys, ordered_components = get_ordered_inputs(inputs_map)
 
+    def show_model_info(model_dir, model):
+        """Shows what the selected model already is."""
+        path = get_path(model_dir, model)
+        if not path:
+            return ""
+        info = model_catalog.get(path)
+        if info is None:
+            return ""
+        text = describe_model(info)
+        if info.get('format') == "gguf" and info.get('quant'):
+            text += f"  \nAlready converted, stored as {info['quant']}."
+        return text
+
     def convert_wrapper(*args):
         """
         Accepts all UI inputs, zips them with keys, and calls the
@@ -171,3 +187,9 @@ with gr.Blocks() as convert_block:
         inputs=[model_dir_txt],
         outputs=[orig_model]
     )
+
+    orig_model.change(
+        show_model_info,
+        inputs=[model_dir_txt, orig_model],
+        outputs=[model_info]
+    )
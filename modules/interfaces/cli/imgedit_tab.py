@@ -9,7 +9,7 @@ from modules.utils.ui_events import (
     refresh_all_options
 )
 from modules.shared_instance import (
-    config, subprocess_manager
+    config
 )
 from modules.ui.models import create_imgedit_model_sel_ui
 from modules.ui.loras import (
@@ -234,11 +234,9 @@ with gr.Blocks() as imgedit_block:
         preset_flag=is_loading_preset
     )
 
-    timer = gr.Timer(value=0.1, active=False)
-
     ui_outputs = {
         'gen_btn': gen_btn,
-        'timer': timer,
+        'kill_btn': kill_btn,
         'command': command,
         'progress_slider': progress_slider,
         'progress_textbox': progress_textbox,
@@ -251,12 +249,6 @@ with gr.Blocks() as imgedit_block:
         imgedit, ordered_keys, ordered_components, ui_outputs
     )
 
-    kill_btn.click(
-        subprocess_manager.kill_subprocess,
-        inputs=[],
-        outputs=[]
-    )
-
     refresh_opt.click(
         refresh_all_options,
         inputs=[],
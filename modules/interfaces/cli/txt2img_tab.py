@@ -8,7 +8,6 @@ from modules.utils.ui_events import (
     unet_tab_switch, ckpt_tab_switch,
     refresh_all_options
 )
-from modules.shared_instance import subprocess_manager
 from modules.ui.models import create_img_model_sel_ui
 from modules.ui.loras import (
     create_lora_sel_ui, bind_lora_events
@@ -226,11 +225,9 @@ with gr.Blocks() as txt2img_block:
         preset_flag=is_loading_preset
     )
 
-    timer = gr.Timer(value=0.1, active=False)
-
     ui_outputs = {
         'gen_btn': gen_btn,
-        'timer': timer,
+        'kill_btn': kill_btn,
         'command': command,
         'progress_slider': progress_slider,
         'progress_textbox': progress_textbox,
@@ -243,12 +240,6 @@ with gr.Blocks() as txt2img_block:
         txt2img, ordered_keys, ordered_components, ui_outputs
     )
 
-    kill_btn.click(
-        subprocess_manager.kill_subprocess,
-        inputs=[],
-        outputs=[]
-    )
-
     # Interactive Bindings
     def safe_ckpt_tab_switch(is_loading):
         if is_loading:
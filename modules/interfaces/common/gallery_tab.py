@@ -62,6 +62,19 @@ with gr.Blocks() as gallery_block:
             value="upscale", variant="primary"
         )
 
+    with gr.Row():
+        search_box = gr.Textbox(
+            label="Search",
+            placeholder=(
+                'Prompt words or "phrases", neg:word, seed:42, '
+                'steps:20-30, cfg:5-7, sampler:euler, model:flux'
+            ),
+            scale=7
+        )
+        search_btn = gr.Button(
+            value="Search", scale=1
+        )
+
     with gr.Row():
         first_btn = gr.Button(value="First page")
         with gr.Group():
@@ -231,6 +244,10 @@ with gr.Blocks() as gallery_block:
         gallery_manager.get_media_info,
         inputs=[],
         outputs=param_ctrls + [path_info, img_info_txt, convert_to_mp4_btn]
+    ).then(
+        gallery_manager.show_selected,
+        inputs=[],
+        outputs=[gallery]
     )
 
     txt2img_btn.click(
@@ -263,6 +280,18 @@ with gr.Blocks() as gallery_block:
         outputs=nav_outputs
     )
 
+    search_btn.click(
+        gallery_manager.search_gallery,
+        inputs=[search_box],
+        outputs=nav_outputs
+    )
+
+    search_box.submit(
+        gallery_manager.search_gallery,
+        inputs=[search_box],
+        outputs=nav_outputs
+    )
+
     pvw_btn.click(
         gallery_manager.prev_page,
         inputs=[],
@@ -298,6 +298,61 @@ with gr.Blocks() as options_block:
                 )
             )
 
+            registry.register(
+                'def_png_compress_level', gr.Slider(
+                    label="PNG compression level (0 is fastest, 9 is smallest)",
+                    info=(
+                        "Only for the PNGs the webui encodes itself: "
+                        "inputs and masks sent to sd-server, and results "
+                        "that don't come back as PNG. PNGs returned by "
+                        "sd-server are saved as they are."
+                    ),
+                    minimum=0,
+                    maximum=9,
+                    step=1,
+                    value=config.get('def_png_compress_level'),
+                    interactive=True
+                )
+            )
+
+        with gr.Row():
+            # Queue options
+            registry.register(
+                'def_queue_journal', gr.Checkbox(
+                    label="Keep queued jobs across restarts (requires restart)",
+                    value=config.get('def_queue_journal'),
+                    interactive=True
+                )
+            )
+
+            registry.register(
+                'def_server_pool_size', gr.Number(
+                    label="sd-server processes kept alive, one per model set (requires restart)",
+                    value=config.get('def_server_pool_size'),
+                    minimum=1,
+                    precision=0,
+                    interactive=True
+                )
+            )
+
+            registry.register(
+                'def_server_request_timeout', gr.Number(
+                    label="sd-server generation timeout in seconds, 0 waits forever (requires restart)",
+                    value=config.get('def_server_request_timeout'),
+                    minimum=0,
+                    interactive=True
+                )
+            )
+
+            registry.register(
+                'def_server_status_timeout', gr.Number(
+                    label="sd-server status timeout in seconds (requires restart)",
+                    value=config.get('def_server_status_timeout'),
+                    minimum=0.1,
+                    interactive=True
+                )
+            )
+
         with gr.Row():
             # Gallery options
             registry.register(
@@ -309,6 +364,24 @@ with gr.Blocks() as options_block:
                 )
             )
 
+            registry.register(
+                'def_gallery_thumbnails', gr.Checkbox(
+                    label="Show thumbnails in the gallery (requires restart)",
+                    value=config.get('def_gallery_thumbnails'),
+                    interactive=True
+                )
+            )
+
+            registry.register(
+                'def_thumbnail_cache_mb', gr.Number(
+                    label="Thumbnail cache size (MB)",
+                    value=config.get('def_thumbnail_cache_mb'),
+                    minimum=1,
+                    precision=0,
+                    interactive=True
+                )
+            )
+
         with gr.Row():
             # Theme options
             registry.register(
@@ -283,11 +283,8 @@ with gr.Blocks() as imgedit_server_block:
 
     bind_presets_events(presets_ui, generation_settings_ui)
 
-    timer = gr.Timer(value=0.1, active=False)
-
     ui_outputs = {
         'gen_btn': gen_btn,
-        'timer': timer,
         'command': command,
         'progress_slider': progress_slider,
         'progress_textbox': progress_textbox,
@@ -7,8 +7,9 @@ from typing import List
 import gradio as gr
 
 from modules.shared_instance import (
-    config, current_mode, server_state
+    config, current_mode, server_state, http_clients
 )
+from modules.utils.model_listing import ModelListCache
 
 
 SUPPORTED_EXTENSIONS = (".gguf", ".safetensors", ".sft", ".pth", ".ckpt")
@@ -27,10 +28,13 @@ MODEL_DIR_MAP = {
     "ControlNet": config.get('cnnet_dir')
 }
 
+model_lists = ModelListCache(SUPPORTED_EXTENSIONS)
+
 
 def get_models(models_folder: str) -> List[str]:
     """
-    Lists all supported models in a folder.
+    Lists all supported models in a folder. The listing is cached and
+    only read again when the folder changes.
 
     Args:
         models_folder (str): The path to the directory to scan.
@@ -42,23 +46,11 @@ def get_models(models_folder: str) -> List[str]:
         print(f"The {models_folder} folder does not exist.")
         return []
 
-    models = []
-    try:
-        for root, _, files in os.walk(models_folder):
-            for file in files:
-                if file.endswith(SUPPORTED_EXTENSIONS):
-                    full_path = os.path.join(root, file)
-
-                    rel_path = os.path.relpath(full_path, models_folder)
-
-                    rel_path = rel_path.replace("\\", "/")
-
-                    models.append(rel_path)
-
-        return sorted(models)
-    except OSError as e:
-        print(f"Could not read files from '{models_folder}': {e}")
+    models = model_lists.get(models_folder)
+    if models is None:
+        print(f"Could not read files from '{models_folder}'.")
         return []
+    return models
 
 
 def reload_models(models_folder: str) -> gr.Dropdown:
@@ -89,11 +81,10 @@ def get_loras() -> List[str]:
         if not ip or not port:
             return []
 
-        lora_api_url = f"http://{ip}:{port}/sdapi/v1/loras"
-
         try:
-
-            resp_lora = httpx.get(lora_api_url, timeout=1.0)
+            resp_lora = http_clients.get(ip, port).get(
+                "/sdapi/v1/loras", timeout=http_clients.status_timeout
+            )
 
             if resp_lora.status_code == 200:
                 lora_data = resp_lora.json()
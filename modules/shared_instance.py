@@ -9,9 +9,14 @@ from modules.utils.sd_interface import (
 )
 from modules.utils.subprocess_manager import SubprocessManager
 import modules.utils.queue as queue_manager
+from modules.utils.queue_journal import QueueJournal
 from modules.utils.ui_state import ModelState
 from modules.utils.prompt_manager import PromptManager
 from modules.utils.preset_manager import PresetManager
+from modules.utils.output_index import OutputIndex
+from modules.utils.model_catalog import ModelCatalog
+from modules.utils.startup_profiler import profiler
+from modules.utils.http_client import HttpClients
 
 
 SD_CLI = exe_name("cli")
@@ -31,20 +36,37 @@ class ServerState:
 
 migrate_legacy_configs()
 
-config = ConfigManager()
+with profiler.phase("ConfigManager"):
+    config = ConfigManager()
 
 current_mode = "server" if "--server" in sys.argv else "cli"
 
-sd_options = SDOptionsCache(mode=current_mode)
+with profiler.phase("SDOptionsCache"):
+    sd_options = SDOptionsCache(mode=current_mode)
 
 subprocess_manager = SubprocessManager()
 
-queue_manager.start_worker()
+if config.get('def_queue_journal'):
+    queue_manager.enable_journal(QueueJournal())
+
+with profiler.phase("queue workers"):
+    queue_manager.start_workers(
+        config.get('def_device_profiles'), subprocess_manager
+    )
 
 server_state = ServerState()
 
+http_clients = HttpClients(
+    request_timeout=config.get('def_server_request_timeout'),
+    status_timeout=config.get('def_server_status_timeout')
+)
+
 model_state = ModelState()
 
 prompt_manager = PromptManager()
 
 preset_manager = PresetManager()
+
+output_index = OutputIndex()
+
+model_catalog = ModelCatalog()
@@ -0,0 +1,154 @@
+"""sd.cpp-webui - utils - gallery index module"""
+
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+MEDIA_EXTENSIONS = (
+    '.png', '.jpg', '.jpeg', '.avi', '.webm', '.webp', '.mp4'
+)
+
+# A folder can still change within the timestamp tick of its last
+# change, so an mtime this recent isn't trusted to mean "unchanged".
+MTIME_GRACE_SECONDS = 2.0
+
+
+class _FolderIndex:
+    """The indexed files of one folder and their cached orderings."""
+
+    def __init__(self):
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.mtime: Optional[int] = None
+        self.sorted: Dict[str, List[str]] = {}
+
+
+class GalleryIndex:
+    """
+    In-memory index of the media files in the output folders.
+
+    Every file is stored by path with its ctime, mtime and size, plus its
+    parsed generation data once it has been read. A folder is listed again
+    only when its mtime moves, and only new files are stat'ed, so paging
+    through an unchanged folder doesn't touch the files at all.
+    """
+
+    def __init__(self):
+        self._folders: Dict[str, _FolderIndex] = {}
+        self._lock = threading.RLock()
+
+    def _sync(self, media_dir: str) -> _FolderIndex:
+        """Brings a folder up to date. Must hold the lock."""
+        folder = self._folders.setdefault(media_dir, _FolderIndex())
+
+        try:
+            dir_mtime = os.stat(media_dir).st_mtime_ns
+        except OSError:
+            folder.entries = {}
+            folder.sorted.clear()
+            folder.mtime = None
+            return folder
+
+        if dir_mtime == folder.mtime:
+            return folder
+
+        entries = {}
+        try:
+            with os.scandir(media_dir) as it:
+                for entry in it:
+                    if not entry.name.lower().endswith(MEDIA_EXTENSIONS):
+                        continue
+                    known = folder.entries.get(entry.path)
+                    if known is None:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        known = {
+                            'ctime': st.st_ctime,
+                            'mtime': st.st_mtime_ns,
+                            'size': st.st_size,
+                            'info': None
+                        }
+                    entries[entry.path] = known
+        except OSError as e:
+            print(f"Error indexing {media_dir}: {e}")
+
+        folder.entries = entries
+        folder.sorted.clear()
+        if time.time() - dir_mtime / 1e9 > MTIME_GRACE_SECONDS:
+            folder.mtime = dir_mtime
+        else:
+            folder.mtime = None
+
+        return folder
+
+    def sorted_files(self, media_dir: str, sort_order: str) -> List[str]:
+        """
+        Returns the media files of a folder in the given order.
+        The returned list is shared, callers must not modify it.
+        """
+        with self._lock:
+            folder = self._sync(media_dir)
+            files = folder.sorted.get(sort_order)
+            if files is not None:
+                return files
+
+            entries = folder.entries
+            if sort_order == "Date (Newest First)":
+                files = sorted(
+                    entries, key=lambda p: entries[p]['ctime'], reverse=True
+                )
+            elif sort_order == "Name (A-Z)":
+                files = sorted(
+                    entries, key=lambda p: os.path.basename(p).lower()
+                )
+            elif sort_order == "Name (Z-A)":
+                files = sorted(
+                    entries, key=lambda p: os.path.basename(p).lower(),
+                    reverse=True
+                )
+            else:
+                # Default: Date (Oldest First)
+                files = sorted(entries, key=lambda p: entries[p]['ctime'])
+
+            folder.sorted[sort_order] = files
+            return files
+
+    def get_info(
+        self, path: str, reader: Callable[[str], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Returns the generation data of a file, reading it with the given
+        reader only if it isn't cached or the file changed since.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return reader(path)
+
+        with self._lock:
+            folder = self._folders.get(os.path.dirname(path))
+            entry = folder.entries.get(path) if folder else None
+            if (
+                entry and entry['info'] is not None and
+                entry['mtime'] == st.st_mtime_ns and
+                entry['size'] == st.st_size
+            ):
+                return entry['info']
+
+        info = reader(path)
+
+        with self._lock:
+            if entry is not None:
+                entry.update(
+                    mtime=st.st_mtime_ns, size=st.st_size, info=info
+                )
+        return info
+
+    def remove(self, path: str):
+        """Drops a deleted file from the index."""
+        with self._lock:
+            folder = self._folders.get(os.path.dirname(path))
+            if folder and folder.entries.pop(path, None) is not None:
+                folder.sorted.clear()
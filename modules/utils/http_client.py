@@ -0,0 +1,94 @@
+"""sd.cpp-webui - utils - shared HTTP clients module"""
+
+import asyncio
+import atexit
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+CONNECT_TIMEOUT = 5.0
+
+LIMITS = httpx.Limits(
+    max_connections=8, max_keepalive_connections=4, keepalive_expiry=30
+)
+
+
+class HttpClients:
+    """
+    Keep-alive HTTP clients shared by everything that talks to the
+    sd-server, one per server endpoint, so polling and generation reuse
+    their connections instead of opening a new one per request.
+
+    AsyncClients are also kept per event loop, since their connections
+    can't move between loops.
+
+    Attributes:
+        request_timeout: Read timeout of generation requests, None waits
+                         as long as the server needs.
+        status_timeout: Timeout of the quick status and listing calls.
+    """
+
+    def __init__(
+        self, request_timeout: Optional[float] = None,
+        status_timeout: float = 1.0
+    ):
+        self.request_timeout = request_timeout or None
+        self.status_timeout = status_timeout
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[
+            Tuple[str, int], Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]
+        ] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @staticmethod
+    def base_url(ip, port) -> str:
+        # Ports coming straight from a gr.Number are floats
+        try:
+            port = int(float(port))
+        except (TypeError, ValueError):
+            pass
+        return f"http://{ip}:{port}"
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.request_timeout, connect=CONNECT_TIMEOUT)
+
+    def get(self, ip, port) -> httpx.Client:
+        """Returns the client of a server endpoint."""
+        base_url = self.base_url(ip, port)
+        with self._lock:
+            client = self._clients.get(base_url)
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    base_url=base_url, timeout=self._timeout(), limits=LIMITS
+                )
+                self._clients[base_url] = client
+            return client
+
+    def get_async(self, ip, port) -> httpx.AsyncClient:
+        """
+        Returns the async client of a server endpoint for the running
+        event loop.
+        """
+        base_url = self.base_url(ip, port)
+        loop = asyncio.get_running_loop()
+        key = (base_url, id(loop))
+        with self._lock:
+            owner, client = self._async_clients.get(key, (None, None))
+            # A new loop can reuse the id of a closed one
+            if owner is not loop or client.is_closed:
+                client = httpx.AsyncClient(
+                    base_url=base_url, timeout=self._timeout(), limits=LIMITS
+                )
+                self._async_clients[key] = (loop, client)
+            return client
+
+    def close(self):
+        """Closes the sync clients, async ones close with their loop."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+        for client in clients:
+            client.close()
@@ -3,10 +3,14 @@
 import os
 import re
 import json
-from typing import Any, Dict, Optional
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 from PIL import Image, PngImagePlugin
 
-from modules.shared_instance import server_state
+from modules.utils.image_utils import size_extractor
+from modules.utils.video_utils import get_avi_resolution
 
 
 def build_a1111_metadata(
@@ -19,7 +23,6 @@ def build_a1111_metadata(
     nprompt = params.get('in_nprompt', '')
     steps = params.get('in_steps', 20)
     cfg = params.get('in_cfg', 7.0)
-    seed = server_state.seed
     width = params.get('in_width', 512)
     height = params.get('in_height', 512)
     sampler = params.get('in_sampling', 'Euler a')
@@ -51,7 +54,8 @@ def build_a1111_metadata(
 
 
 def save_image_with_metadata(
-    image: Image.Image, target_path: str, metadata_string: str
+    image: Image.Image, target_path: str, metadata_string: str,
+    compress_level: int = 6
 ):
     """
     Saves a PIL Image with A1111-style parameters
@@ -59,38 +63,207 @@ def save_image_with_metadata(
     """
     pnginfo = PngImagePlugin.PngInfo()
     pnginfo.add_text("parameters", metadata_string)
-    image.save(target_path, format="PNG", pnginfo=pnginfo)
+    image.save(
+        target_path, format="PNG", pnginfo=pnginfo,
+        compress_level=compress_level
+    )
 
 
-def parse_png_metadata(img_path: str) -> Optional[str]:
-    """Reads the tEXt chunk from a PNG file to get metadata."""
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_TEXT_CHUNKS = (b'tEXt', b'zTXt', b'iTXt')
+PNG_READ_SIZE = 64 * 1024
+# Upper bound for a decompressed zTXt/iTXt value
+PNG_MAX_TEXT_SIZE = 16 * 1024 * 1024
+
+
+def _decode_png_text(data: bytes) -> str:
+    """PNG text is Latin-1 by spec, but most tools write UTF-8."""
     try:
-        with open(img_path, 'rb') as file:
-            if file.read(8) != b'\x89PNG\r\n\x1a\n':
-                return None  # Not a valid PNG
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def _inflate_png_text(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj()
+    return decompressor.decompress(data, PNG_MAX_TEXT_SIZE)
+
 
-            while True:
-                length_chunk = file.read(4)
-                if not length_chunk:
+def _parse_png_text_chunk(
+    chunk_type: bytes, data: bytes
+) -> Optional[Tuple[str, str]]:
+    """Decodes a tEXt, zTXt or iTXt chunk into its keyword and text."""
+    keyword, sep, rest = data.partition(b'\x00')
+    if not sep:
+        return None
+    keyword = keyword.decode('latin-1')
+
+    match chunk_type:
+        case b'tEXt':
+            return keyword, _decode_png_text(rest)
+        case b'zTXt':
+            # Compression method byte, then the zlib stream
+            return keyword, _decode_png_text(_inflate_png_text(rest[1:]))
+        case b'iTXt':
+            is_compressed = rest[:1] == b'\x01'
+            # Language tag and translated keyword, both null terminated
+            _, _, rest = rest[2:].partition(b'\x00')
+            _, _, text = rest.partition(b'\x00')
+            if is_compressed:
+                text = _inflate_png_text(text)
+            return keyword, text.decode('utf-8', errors='replace')
+    return None
+
+
+def _scan_png(img_path: str) -> Tuple[
+    Tuple[Optional[int], Optional[int]], Dict[str, Tuple[str, str]]
+]:
+    """
+    Reads the size and every text chunk of a PNG file, without touching
+    the pixel data: the header is read in one go and parsing stops at the
+    first IDAT chunk.
+    """
+    size = (None, None)
+    chunks = {}
+    with open(img_path, 'rb') as file:
+        buffer = file.read(PNG_READ_SIZE)
+        if buffer[:8] != PNG_SIGNATURE:
+            return size, chunks
+
+        # IHDR always comes first, with the width and height
+        if buffer[12:16] == b'IHDR':
+            size = (
+                int.from_bytes(buffer[16:20], byteorder='big'),
+                int.from_bytes(buffer[20:24], byteorder='big')
+            )
+
+        # Offset of the buffer in the file, and of the next chunk in it
+        base = 0
+        pos = 8
+        while True:
+            if pos + 8 > len(buffer):
+                file.seek(base + pos)
+                base += pos
+                buffer = file.read(PNG_READ_SIZE)
+                pos = 0
+                if len(buffer) < 8:
                     break
-                length = int.from_bytes(length_chunk, byteorder='big')
-                chunk_type = file.read(4).decode('utf-8', errors='ignore')
-
-                if chunk_type == 'tEXt':
-                    # Found the metadata chunk
-                    png_block = file.read(length)
-                    _ = file.read(4)  # Skip CRC
-                    keyword, value = png_block.split(b'\x00', 1)
-                    return (
-                        f"PNG: tEXt\n{keyword.decode('utf-8')}: "
-                        f"{value.decode('utf-8')}"
+
+            length = int.from_bytes(buffer[pos:pos + 4], byteorder='big')
+            chunk_type = buffer[pos + 4:pos + 8]
+            if chunk_type in (b'IDAT', b'IEND'):
+                break
+
+            data_end = pos + 8 + length
+            if chunk_type in PNG_TEXT_CHUNKS:
+                if data_end > len(buffer):
+                    buffer = buffer[pos:] + file.read(data_end - len(buffer))
+                    base += pos
+                    data_end -= pos
+                    pos = 0
+                    if data_end > len(buffer):
+                        break  # Truncated file
+
+                try:
+                    text_chunk = _parse_png_text_chunk(
+                        chunk_type, buffer[pos + 8:data_end]
                     )
+                except zlib.error:
+                    text_chunk = None
+                if text_chunk and text_chunk[0] not in chunks:
+                    chunks[text_chunk[0]] = (
+                        chunk_type.decode('latin-1'), text_chunk[1]
+                    )
+
+            pos = data_end + 4  # Skip the CRC
+    return size, chunks
 
-                file.seek(length + 4, 1)  # Skip chunk data and CRC
 
+def read_png_text_chunks(img_path: str) -> Dict[str, Tuple[str, str]]:
+    """
+    Reads every text chunk of a PNG file, stopping at the pixel data.
+    Returns a {keyword: (chunk type, text)} dict in file order.
+    """
+    return _scan_png(img_path)[1]
+
+
+def _png_text_chunk(keyword: str, text: str) -> bytes:
+    """
+    Builds a tEXt chunk, or an uncompressed iTXt one if the text isn't
+    Latin-1, like PIL does.
+    """
+    try:
+        chunk_type = b'tEXt'
+        data = keyword.encode('latin-1') + b'\x00' + text.encode('latin-1')
+    except UnicodeEncodeError:
+        chunk_type = b'iTXt'
+        data = (
+            keyword.encode('latin-1') + b'\x00\x00\x00' + b'\x00\x00' +
+            text.encode('utf-8')
+        )
+    crc = zlib.crc32(data, zlib.crc32(chunk_type))
+    return (
+        len(data).to_bytes(4, byteorder='big') + chunk_type + data +
+        crc.to_bytes(4, byteorder='big')
+    )
+
+
+def save_png_bytes_with_metadata(
+    png_bytes: bytes, target_path: str, metadata_string: str
+):
+    """
+    Saves an encoded PNG with A1111-style parameters written to a text
+    chunk, without decoding the pixels: the chunk goes right after the
+    header, replacing any 'parameters' chunk the image already had.
+    """
+    view = memoryview(png_bytes)
+    if view[:8] != PNG_SIGNATURE or view[12:16] != b'IHDR':
+        raise ValueError("Not a PNG image")
+
+    # Signature, then the IHDR chunk with its length, type and CRC
+    header_end = 8 + 12 + int.from_bytes(view[8:12], byteorder='big')
+    parts = [view[:header_end], _png_text_chunk('parameters', metadata_string)]
+
+    pos = start = header_end
+    while pos + 8 <= len(view):
+        length = int.from_bytes(view[pos:pos + 4], byteorder='big')
+        chunk_type = bytes(view[pos + 4:pos + 8])
+        chunk_end = pos + 12 + length
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        # Keywords are at most 79 bytes, followed by a null separator
+        keyword = bytes(view[pos + 8:min(pos + 88, chunk_end - 4)])
+        if (chunk_type in PNG_TEXT_CHUNKS and
+                keyword.partition(b'\x00')[0] == b'parameters'):
+            parts.append(view[start:pos])
+            start = chunk_end
+        pos = chunk_end
+    parts.append(view[start:])
+
+    with open(target_path, 'wb') as file:
+        for part in parts:
+            file.write(part)
+
+
+def _format_png_metadata(
+    chunks: Dict[str, Tuple[str, str]]
+) -> Optional[str]:
+    if not chunks:
+        return None
+    keyword = 'parameters' if 'parameters' in chunks else next(iter(chunks))
+    chunk_type, value = chunks[keyword]
+    return f"PNG: {chunk_type}\n{keyword}: {value}"
+
+
+def parse_png_metadata(img_path: str) -> Optional[str]:
+    """
+    Reads the generation data of a PNG file, from its 'parameters' text
+    chunk or else its first one.
+    """
+    try:
+        return _format_png_metadata(read_png_text_chunks(img_path))
     except Exception:
         return None
-    return None
 
 
 def parse_jpg_metadata(img_path: str) -> Optional[str]:
@@ -157,6 +330,10 @@ def parse_comfyui_workflow(text_data: str) -> Optional[Dict[str, Any]]:
             if "sampler_name" in inputs:
                 params['sampler'] = inputs['sampler_name']
 
+            for key in ("ckpt_name", "unet_name"):
+                if key in inputs and 'model' not in params:
+                    params['model'] = inputs[key]
+
         return params if any(params.values()) else None
 
     except (json.JSONDecodeError, AttributeError):
@@ -183,6 +360,7 @@ def parse_a1111_text(text_data: str) -> Dict[str, Any]:
         'steps': r'Steps:\s*(\d+)',
         'cfg': r'CFG scale:\s*([\d.]+)',
         'seed': r'Seed:\s*(\d+)',
+        'model': r'Model:\s*([^,\n]+)',
     }
     converters = {'steps': int, 'cfg': float, 'seed': int}
 
@@ -220,7 +398,7 @@ def extract_params_from_text(text_data: str) -> Dict[str, Any]:
     """
     default_params = {
         'pprompt': "", 'nprompt': "", 'steps': None, 'sampler': "",
-        'scheduler': "", 'cfg': None, 'seed': None
+        'scheduler': "", 'cfg': None, 'seed': None, 'model': ""
     }
 
     if not text_data:
@@ -232,3 +410,58 @@ def extract_params_from_text(text_data: str) -> Dict[str, Any]:
 
     a1111_params = parse_a1111_text(text_data)
     return {**default_params, **a1111_params}
+
+
+def extract_media_metadata(path: str) -> Dict[str, Any]:
+    """
+    Reads the generation data and the resolution of a media file.
+    Returns a dict with 'raw_text', 'params', 'width' and 'height'.
+    """
+    raw_text = None
+    width = None
+    height = None
+    file_path_lower = path.lower()
+
+    try:
+        if file_path_lower.endswith('.png'):
+            (width, height), chunks = _scan_png(path)
+            raw_text = _format_png_metadata(chunks)
+        elif file_path_lower.endswith(('.jpg', '.jpeg')):
+            raw_text = parse_jpg_metadata(path)
+            width, height = size_extractor(path)
+        elif file_path_lower.endswith(('.avi', '.mp4')):
+            raw_text = ""
+            width, height = get_avi_resolution(path)
+    except Exception as e:
+        print(f"Failed to read metadata for {path}: {e}")
+
+    return {
+        'raw_text': raw_text,
+        'params': extract_params_from_text(raw_text) if raw_text else {},
+        'width': width,
+        'height': height
+    }
+
+
+def extract_metadata_batch(
+    paths: Iterable[str], max_workers: int = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Reads the metadata of many media files on a thread pool, yielding
+    extract_media_metadata() results in the order of the paths.
+    At most a few files per worker are in flight at once, so memory stays
+    bounded however many paths are given.
+    """
+    max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+    max_in_flight = max_workers * 4
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="metadata"
+    ) as pool:
+        in_flight = deque()
+        for path in paths:
+            in_flight.append(pool.submit(extract_media_metadata, path))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,359 @@
+"""sd.cpp-webui - utils - model catalog module"""
+
+import os
+import json
+import mmap
+import struct
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from .file_utils import load_json
+
+DEFAULT_CATALOG_PATH = os.path.join('user_data', 'model_catalog.json')
+
+# Bump to drop the cached entries when the parsing changes
+CATALOG_VERSION = 1
+
+GGUF_MAGIC = b'GGUF'
+
+GGML_TYPES = {
+    0: "f32", 1: "f16", 2: "q4_0", 3: "q4_1", 6: "q5_0", 7: "q5_1",
+    8: "q8_0", 9: "q8_1", 10: "q2_K", 11: "q3_K", 12: "q4_K", 13: "q5_K",
+    14: "q6_K", 15: "q8_K", 16: "iq2_xxs", 17: "iq2_xs", 18: "iq3_xxs",
+    19: "iq1_s", 20: "iq4_nl", 21: "iq3_s", 22: "iq2_s", 23: "iq4_xs",
+    24: "i8", 25: "i16", 26: "i32", 27: "i64", 28: "f64", 29: "iq1_m",
+    30: "bf16", 34: "tq1_0", 35: "tq2_0", 39: "mxfp4"
+}
+
+# GGUF metadata value types with a fixed size
+GGUF_SCALARS = {
+    0: '<B', 1: '<b', 2: '<H', 3: '<h', 4: '<I', 5: '<i',
+    6: '<f', 7: '<?', 10: '<Q', 11: '<q', 12: '<d'
+}
+GGUF_STRING = 8
+GGUF_ARRAY = 9
+
+# Safetensors headers are JSON, anything bigger than this isn't one
+SAFETENSORS_MAX_HEADER = 100 * 1024 * 1024
+
+# Tensor name fragments and the architecture they give away, the first
+# match wins, so full checkpoints come before their parts.
+ARCHITECTURE_HINTS = (
+    ("double_blocks.", "flux"),
+    ("joint_blocks.", "sd3"),
+    ("transformer_blocks.0.img_mod.", "qwen_image"),
+    ("patch_embedding.", "wan"),
+    ("control_model.", "controlnet"),
+    ("input_hint_block.", "controlnet"),
+    ("conditioner.embedders.1.", "sdxl"),
+    ("label_emb.", "sdxl"),
+    ("cond_stage_model.model.transformer.", "sd2"),
+    ("input_blocks.", "sd1"),
+    ("lora_down", "lora"),
+    ("lora_A", "lora"),
+    ("lora_unet", "lora"),
+    ("decoder.conv_in.", "vae"),
+    ("conv_first.", "esrgan"),
+    ("text_model.encoder.layers.", "clip"),
+    ("encoder.block.0.layer.0.", "t5"),
+    ("model.layers.0.self_attn.", "llm"),
+    ("blk.0.attn_q.", "llm"),
+)
+
+
+def guess_architecture(tensor_names: Iterable[str]) -> Optional[str]:
+    """Guesses the model architecture from its tensor names."""
+    names = list(tensor_names)
+    for hint, architecture in ARCHITECTURE_HINTS:
+        if any(hint in name for name in names):
+            return architecture
+    return None
+
+
+def _summarize(tensors: Dict[str, tuple]) -> Dict[str, Any]:
+    """
+    Sums the parameters of the tensors, given as name: (type, count),
+    and picks the type holding most of them as the quantization.
+    """
+    by_type = Counter()
+    for dtype, count in tensors.values():
+        by_type[dtype] += count
+    return {
+        'architecture': guess_architecture(tensors),
+        'quant': by_type.most_common(1)[0][0] if by_type else None,
+        'params': sum(by_type.values()),
+        'tensors': len(tensors)
+    }
+
+
+class _Reader:
+    """Sequential little-endian reads over a memory map."""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+    def unpack(self, fmt: str):
+        size = struct.calcsize(fmt)
+        if self.pos + size > len(self.buf):
+            raise ValueError("unexpected end of file")
+        value = struct.unpack_from(fmt, self.buf, self.pos)[0]
+        self.pos += size
+        return value
+
+    def string(self) -> str:
+        length = self.unpack('<Q')
+        if self.pos + length > len(self.buf):
+            raise ValueError("unexpected end of file")
+        value = self.buf[self.pos:self.pos + length]
+        self.pos += length
+        return value.decode('utf-8', errors='replace')
+
+    def value(self, value_type: int):
+        """
+        Reads a metadata value. Arrays are skipped and read as None,
+        tokenizer vocabularies can be huge and nothing here needs them.
+        """
+        if value_type in GGUF_SCALARS:
+            return self.unpack(GGUF_SCALARS[value_type])
+        if value_type == GGUF_STRING:
+            return self.string()
+        if value_type == GGUF_ARRAY:
+            item_type = self.unpack('<I')
+            length = self.unpack('<Q')
+            if item_type in GGUF_SCALARS:
+                self.pos += struct.calcsize(GGUF_SCALARS[item_type]) * length
+            else:
+                for _ in range(length):
+                    self.value(item_type)
+            return None
+        raise ValueError(f"unknown GGUF value type {value_type}")
+
+
+def read_gguf_header(path: str) -> Dict[str, Any]:
+    """
+    Reads the metadata and tensor list of a GGUF file without loading
+    the tensors.
+    """
+    with open(path, 'rb') as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buf:
+        reader = _Reader(buf)
+        if buf[:4] != GGUF_MAGIC:
+            raise ValueError("not a GGUF file")
+        reader.pos = 4
+        version = reader.unpack('<I')
+        if version < 2:
+            raise ValueError(f"unsupported GGUF version {version}")
+        tensor_count = reader.unpack('<Q')
+        kv_count = reader.unpack('<Q')
+
+        metadata = {}
+        for _ in range(kv_count):
+            key = reader.string()
+            value = reader.value(reader.unpack('<I'))
+            if value is not None:
+                metadata[key] = value
+
+        tensors = {}
+        for _ in range(tensor_count):
+            name = reader.string()
+            count = 1
+            for _ in range(reader.unpack('<I')):
+                count *= reader.unpack('<Q')
+            ggml_type = reader.unpack('<I')
+            reader.unpack('<Q')  # data offset
+            tensors[name] = (GGML_TYPES.get(ggml_type, str(ggml_type)), count)
+
+    info = _summarize(tensors)
+    info['architecture'] = (
+        metadata.get('general.architecture') or info['architecture']
+    )
+    info['format'] = "gguf"
+    return info
+
+
+def read_safetensors_header(path: str) -> Dict[str, Any]:
+    """Reads the JSON header of a safetensors file."""
+    with open(path, 'rb') as f:
+        raw_length = f.read(8)
+        if len(raw_length) != 8:
+            raise ValueError("unexpected end of file")
+        length = struct.unpack('<Q', raw_length)[0]
+        if length > SAFETENSORS_MAX_HEADER:
+            raise ValueError("header too large")
+        header = json.loads(f.read(length))
+    if not isinstance(header, dict):
+        raise ValueError("not a safetensors file")
+
+    tensors = {}
+    for name, tensor in header.items():
+        if name == '__metadata__' or not isinstance(tensor, dict):
+            continue
+        count = 1
+        for dim in tensor.get('shape', []):
+            count *= dim
+        tensors[name] = (tensor.get('dtype', "").lower(), count)
+
+    info = _summarize(tensors)
+    info['format'] = "safetensors"
+    return info
+
+
+def _unknown_model(path: str) -> Dict[str, Any]:
+    return {
+        'format': os.path.splitext(path.lower())[1].lstrip('.'),
+        'architecture': None, 'quant': None, 'params': None, 'tensors': None
+    }
+
+
+def read_model_header(path: str) -> Dict[str, Any]:
+    """
+    Reads what a model file is from its header.
+    Pickled checkpoints are never unpickled, only their format is known.
+    """
+    lower = path.lower()
+    if lower.endswith('.gguf'):
+        return read_gguf_header(path)
+    if lower.endswith(('.safetensors', '.sft')):
+        return read_safetensors_header(path)
+    return _unknown_model(path)
+
+
+def _format_count(count: float, units: List[str], step: int) -> str:
+    for unit in units[:-1]:
+        if count < step:
+            return f"{count:.1f}{unit}"
+        count /= step
+    return f"{count:.1f}{units[-1]}"
+
+
+def describe_model(info: Optional[Dict[str, Any]]) -> str:
+    """Returns a one-line summary of a catalog entry."""
+    if not info:
+        return ""
+    parts = [info.get('format', "").upper()]
+    for key in ('architecture', 'quant'):
+        if info.get(key):
+            parts.append(info[key])
+    if info.get('params'):
+        parts.append(
+            _format_count(info['params'], ["", "K", "M", "B"], 1000) +
+            " params"
+        )
+    if info.get('size'):
+        parts.append(
+            _format_count(info['size'], [" B", " KB", " MB", " GB"], 1024)
+        )
+    return " · ".join(parts)
+
+
+class ModelCatalog:
+    """
+    What every model file is: format, architecture, quantization,
+    parameter count, size and, once asked for, its SHA256.
+
+    The entries are read from the file headers and cached on disk by
+    path, size and mtime, so a file is only read again when it changes.
+    """
+
+    def __init__(self, catalog_path: str = None):
+        self.catalog_path = os.getenv(
+            'SD_WEBUI_MODEL_CATALOG_PATH', catalog_path or DEFAULT_CATALOG_PATH
+        )
+        data = load_json(self.catalog_path)
+        if data.get('version') == CATALOG_VERSION:
+            self.entries = data.get('models', {})
+        else:
+            self.entries = {}
+        self._lock = threading.Lock()
+
+    def _save(self):
+        """Atomically writes the catalog to disk. Must hold the lock."""
+        tmp_path = f"{self.catalog_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(
+                    {'version': CATALOG_VERSION, 'models': self.entries},
+                    f, indent=4
+                )
+            os.replace(tmp_path, self.catalog_path)
+        except OSError as e:
+            print(f"Error saving to {self.catalog_path}: {e}")
+
+    def _lookup(self, path: str) -> Optional[Dict[str, Any]]:
+        """Returns the entry of a file, reading it if it's not current."""
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.entries.pop(key, None)
+            return None
+
+        entry = self.entries.get(key)
+        if (
+            entry and entry['size'] == st.st_size and
+            entry['mtime'] == st.st_mtime_ns
+        ):
+            return entry
+
+        try:
+            info = read_model_header(path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Could not read the header of {path}: {e}")
+            info = _unknown_model(path)
+        info.update(size=st.st_size, mtime=st.st_mtime_ns, hash=None)
+        self.entries[key] = info
+        return info
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Returns the catalog entry of a model file, None if it's gone."""
+        return self.get_many([path])[0]
+
+    def get_many(self, paths: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Returns the catalog entries of several files, saving once."""
+        with self._lock:
+            changed = False
+            infos = []
+            for path in paths:
+                key = os.path.abspath(path)
+                old = self.entries.get(key)
+                info = self._lookup(path)
+                changed = changed or self.entries.get(key) is not old
+                infos.append(dict(info) if info else None)
+            if changed:
+                self._save()
+        return infos
+
+    def get_hash(self, path: str) -> Optional[str]:
+        """
+        Returns the SHA256 of a model file. It's only computed the
+        first time it's asked for, and again when the file changes.
+        """
+        info = self.get(path)
+        if info is None:
+            return None
+        if info.get('hash'):
+            return info['hash']
+
+        h = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(chunk)
+        except OSError as e:
+            print(f"Failed to hash file {path}: {e}")
+            return None
+        digest = h.hexdigest()
+
+        with self._lock:
+            entry = self.entries.get(os.path.abspath(path))
+            if (
+                entry and entry['size'] == info['size'] and
+                entry['mtime'] == info['mtime']
+            ):
+                entry['hash'] = digest
+                self._save()
+        return digest
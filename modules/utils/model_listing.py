@@ -0,0 +1,101 @@
+"""sd.cpp-webui - utils - model listing cache module"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from modules.utils.gallery_index import MTIME_GRACE_SECONDS
+from modules.utils.startup_profiler import profiler
+
+# Listings younger than this are returned without touching the disk,
+# so the widgets built in one go at startup share a single walk.
+FRESH_SECONDS = 1.0
+
+
+class _Listing:
+    """The models found under one folder and the mtimes of its subfolders."""
+
+    def __init__(self, models: List[str], dir_mtimes: Dict[str, int]):
+        self.models = models
+        self.dir_mtimes = dir_mtimes
+        self.checked = time.monotonic()
+        # A folder changed within its timestamp tick can't be trusted
+        self.trusted = all(
+            time.time() - mtime / 1e9 > MTIME_GRACE_SECONDS
+            for mtime in dir_mtimes.values()
+        )
+
+
+class ModelListCache:
+    """
+    In-memory listings of the model folders, shared by every dropdown.
+
+    A folder is walked again only when the mtime of one of its
+    subfolders moves, which is what happens when a model is added,
+    removed or renamed. Validating a listing only stats the folders,
+    not the model files.
+    """
+
+    def __init__(self, extensions: Tuple[str, ...]):
+        self.extensions = extensions
+        self._listings: Dict[str, _Listing] = {}
+        self._lock = threading.Lock()
+
+    def _walk(self, models_folder: str) -> Optional[_Listing]:
+        models = []
+        dir_mtimes = {}
+        for root, _, files in os.walk(models_folder):
+            try:
+                dir_mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+            for file in files:
+                if file.endswith(self.extensions):
+                    rel_path = os.path.relpath(
+                        os.path.join(root, file), models_folder
+                    )
+                    models.append(rel_path.replace("\\", "/"))
+        if not dir_mtimes:
+            return None
+        return _Listing(sorted(models), dir_mtimes)
+
+    @staticmethod
+    def _is_current(listing: _Listing) -> bool:
+        if time.monotonic() - listing.checked < FRESH_SECONDS:
+            return True
+        if not listing.trusted:
+            return False
+        for path, mtime in listing.dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        listing.checked = time.monotonic()
+        return True
+
+    def get(self, models_folder: str) -> Optional[List[str]]:
+        """
+        Returns the sorted relative paths of the models in a folder,
+        or None if the folder can't be read.
+        """
+        key = os.path.abspath(models_folder)
+        with self._lock:
+            listing = self._listings.get(key)
+            if listing is None or not self._is_current(listing):
+                with profiler.phase(f"model walk {models_folder}"):
+                    listing = self._walk(models_folder)
+                if listing is None:
+                    self._listings.pop(key, None)
+                    return None
+                self._listings[key] = listing
+            return list(listing.models)
+
+    def invalidate(self, models_folder: str = None):
+        """Forgets the listing of a folder, or of all of them."""
+        with self._lock:
+            if models_folder is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(os.path.abspath(models_folder), None)
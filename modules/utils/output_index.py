@@ -0,0 +1,68 @@
+"""sd.cpp-webui - utils - output index module"""
+
+import os
+import json
+import threading
+from typing import Callable, List
+
+from .file_utils import load_json
+
+DEFAULT_INDEX_PATH = os.path.join('user_data', 'output_index.json')
+
+
+class OutputIndex:
+    """
+    Persistent counters for the sequential output names, so a new
+    generation doesn't have to list the output folders to find its number.
+
+    Every counter remembers the folders it numbers and the next free
+    number. The folders are only scanned the first time a counter is
+    used, when its folders change, or when the number it would hand out
+    turns out to be taken on disk.
+    """
+
+    def __init__(self, index_path: str = None):
+        self.index_path = os.getenv(
+            'SD_WEBUI_OUTPUT_INDEX_PATH', index_path or DEFAULT_INDEX_PATH
+        )
+        self.counters = load_json(self.index_path)
+        self._lock = threading.Lock()
+
+    def _save(self):
+        """Atomically writes the counters to disk."""
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.counters, f, indent=4)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Error saving to {self.index_path}: {e}")
+
+    def reserve(
+        self, key: str, dirs: List[str],
+        scan: Callable[[], int], taken: Callable[[int], bool]
+    ) -> int:
+        """
+        Hands out the next number of a counter. Every call gets a
+        different number, even from concurrent jobs.
+        :param key: The counter name
+        :param dirs: The folders holding the numbered files
+        :param scan: Finds the next free number by listing the folders
+        :param taken: Checks if a number is already used on disk
+        """
+        dirs = [os.path.abspath(d) for d in dirs]
+
+        with self._lock:
+            counter = self.counters.get(key)
+            if not counter or counter.get('dirs') != dirs:
+                counter = {'dirs': dirs, 'next': scan()}
+            elif taken(counter['next']):
+                # Files were added behind our back, never go backwards
+                counter['next'] = max(scan(), counter['next'] + 1)
+
+            number = counter['next']
+            counter['next'] = number + 1
+            self.counters[key] = counter
+            self._save()
+
+        return number
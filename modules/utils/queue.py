@@ -1,11 +1,31 @@
 """sd.cpp-webui - Queue manager module"""
 
-import queue
+import asyncio
+import inspect
+import itertools
 import threading
 
+from modules.utils.subprocess_manager import SubprocessManager
 
-_job_queue = queue.Queue()
+
+PRIORITY_LANES = ("interactive", "normal", "batch")
+
+_pending_jobs = []
 _state_lock = threading.Lock()
+_workers = []
+_local = threading.local()
+_job_ids = itertools.count(1)
+_job_funcs = {}
+_journal = None
+# Journal entries of jobs that can't run in this session, kept on disk
+_unresolved_events = []
+# Final state of each owner's last job, kept apart from the worker's
+# state so the next job it picks up doesn't wipe it before it's shown
+_finished = {}
+_version = 0
+_changed = threading.Condition(_state_lock)
+# Event loops and events of the watchers awaiting the next change
+_async_waiters = set()
 
 
 def get_clean_state():
@@ -17,91 +37,598 @@ def get_clean_state():
         "images": None,
         "is_running": False,
         "is_finished": False,
-        "owner": None
+        "owner": None,
+        "job_id": None,
+        "interrupted": False
     }
 
 
-current_job_state = get_clean_state()
+def _publish():
+    """
+    Bumps the state version and wakes up the status watchers.
+    Must be called with the state lock held.
+    """
+    global _version
+    _version += 1
+    _changed.notify_all()
+    for loop, event in _async_waiters:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # The loop closed under a watcher that never got to leave
+            pass
 
 
-def _background_worker():
+def get_version():
+    """Returns the current version of the queue state."""
+    with _state_lock:
+        return _version
+
+
+def wait_for_update(version, timeout=None):
     """
-    Generic Worker: Runs any function passed to it.
-    Expected Function Signature: func(params) -> yields results
+    Blocks until the queue state moves past the given version, or the
+    timeout expires. Returns the current version.
     """
-    while True:
-        job = _job_queue.get()
+    with _state_lock:
+        _changed.wait_for(lambda: _version != version, timeout)
+        return _version
 
-        func = job['func']
-        params = job['params']
-        owner = job.get('owner')
 
+async def wait_for_update_async(version, timeout=None):
+    """
+    Awaits the queue state moving past the given version, or the
+    timeout expiring, without holding a thread. Returns the current
+    version.
+    """
+    waiter = (asyncio.get_running_loop(), asyncio.Event())
+    with _state_lock:
+        if _version != version:
+            return _version
+        _async_waiters.add(waiter)
+
+    try:
+        await asyncio.wait_for(waiter[1].wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
         with _state_lock:
-            current_job_state.update(get_clean_state())
-            current_job_state["is_running"] = True
-            current_job_state["owner"] = owner
+            _async_waiters.discard(waiter)
+    return get_version()
 
-        try:
-            for result in func(params):
-                if isinstance(result, (tuple, list)) and len(result) >= 5:
-                    (
-                        current_job_state["command"],
-                        current_job_state["progress"],
-                        current_job_state["status"],
-                        current_job_state["stats"],
-                        current_job_state["images"],
-                        *rest
-                    ) = result
-                else:
-                    print(
-                        "Worker Warning: Expected 5 items from generator, " +
-                        f"got {len(result) if result else 0}"
-                    )
-
-        except Exception as e:
+
+class Worker:
+    """
+    A queue worker bound to a device profile.
+
+    Attributes:
+        name: The profile name, used to route jobs to this worker.
+        env: Environment variables applied to every job it runs.
+        backend_table: Backend table overriding the job's own, if set.
+        jobs: Names of the job functions it accepts, empty for any.
+        subprocess_manager: The manager running this worker's processes.
+        state: The state of the current or last job.
+    """
+
+    def __init__(self, profile: dict, subprocess_manager=None):
+        self.name = str(profile.get('name', 'default'))
+        self.env = {
+            str(k): str(v) for k, v in (profile.get('env') or {}).items()
+        }
+        self.backend_table = profile.get('backend_table') or None
+        self.jobs = list(profile.get('jobs') or [])
+        self.subprocess_manager = subprocess_manager or SubprocessManager()
+        self.state = get_clean_state()
+        self.job = None
+        self.cancelled = False
+        self._task = None
+        self._loop = None
+        self._wakeup = threading.Condition(_state_lock)
+
+    def accepts(self, job: dict) -> bool:
+        """Checks if the job can run on this worker's device."""
+        if job.get('device') and job['device'] != self.name:
+            return False
+        return not self.jobs or job['func'].__name__ in self.jobs
+
+    def _apply_profile(self, params: dict) -> dict:
+        """Injects the device env vars and backends into the job params."""
+        params = dict(params)
+        if self.env:
+            params['device_env'] = dict(self.env)
+        if self.backend_table:
+            params['in_backend_table'] = self.backend_table
+        return params
+
+    def interrupt(self, job_id) -> bool:
+        """
+        Stops the given job if it's still the one running: its process
+        is terminated, and whatever an async job is awaiting, like an
+        HTTP request, is cancelled. The lock is held throughout, so the
+        next job can't be handed over and killed in its place.
+        Returns True if the job was interrupted.
+        """
+        with _state_lock:
+            if self.job is None or self.job['id'] != job_id:
+                return False
+            self.cancelled = True
+            # Processes of async jobs belong to the worker's event loop,
+            # cancelling the job terminates them there
+            process = self.subprocess_manager.process
+            if process is not None and not isinstance(
+                process, asyncio.subprocess.Process
+            ):
+                self.subprocess_manager.kill_subprocess()
+            if self._task is not None:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+        return True
+
+    def _store_result(self, result):
+        with _state_lock:
+            if isinstance(result, (tuple, list)) and len(result) >= 5:
+                (
+                    self.state["command"],
+                    self.state["progress"],
+                    self.state["status"],
+                    self.state["stats"],
+                    self.state["images"],
+                    *rest
+                ) = result
+                _publish()
+            else:
+                print(
+                    f"Worker '{self.name}' Warning: Expected 5 items from " +
+                    f"generator, got {len(result) if result else 0}"
+                )
+
+    def run(self):
+        """
+        Generic Worker: Runs any function passed to it.
+        Expected Function Signature: func(params) -> yields results
+        """
+        _local.worker = self
+
+        while True:
             with _state_lock:
-                current_job_state["status"] = f"Error: {str(e)}"
-            print(f"Worker Error: {e}")
+                while self.job is None:
+                    self._wakeup.wait()
+                job = self.job
+
+            try:
+                params = self._apply_profile(job['params'])
+                for result in _iterate_job(job['func'], params, self):
+                    self._store_result(result)
+
+            except Exception as e:
+                with _state_lock:
+                    self.state["status"] = f"Error: {str(e)}"
+                print(f"Worker '{self.name}' Error: {e}")
+
+            finally:
+                with _state_lock:
+                    self.state["is_running"] = False
+                    self.state["is_finished"] = True
+                    _finished[self.state["owner"]] = self.state.copy()
+                    self.job = None
+                    if _journal:
+                        _journal.record('done', job['id'])
+                    _dispatch()
+                    if _journal and _journal.needs_compaction():
+                        _compact_journal()
+                    _publish()
+
+
+def _job_sort_key(job: dict) -> tuple:
+    return PRIORITY_LANES.index(job['priority']), job['order']
 
-        finally:
+
+def _dispatch():
+    """
+    Hands pending jobs, by priority lane and then in order, to the first
+    free compatible worker. Must be called with the state lock held.
+    """
+    for job in sorted(_pending_jobs, key=_job_sort_key):
+        for worker in _workers:
+            if worker.job is None and worker.accepts(job):
+                _pending_jobs.remove(job)
+                worker.job = job
+                worker.cancelled = False
+                worker.state.update(get_clean_state())
+                worker.state["is_running"] = True
+                worker.state["owner"] = job.get('owner')
+                worker.state["job_id"] = job['id']
+                worker.state["interrupted"] = job['interrupted']
+                if _journal:
+                    _journal.record('start', job['id'])
+                worker._wakeup.notify()
+                _publish()
+                break
+
+
+def _event_loop():
+    """
+    Returns this thread's event loop, kept across jobs so the async
+    HTTP clients bound to it keep their connections.
+    """
+    loop = getattr(_local, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+    return loop
+
+
+def _iterate_job(func, params, worker):
+    """
+    Yields the results of a job function, which can be either a
+    generator or an async generator run on this thread's event loop,
+    until it ends or the worker is interrupted.
+    """
+    results = func(params)
+    if not inspect.isasyncgen(results):
+        for result in results:
+            if worker.cancelled:
+                results.close()
+                return
+            yield result
+        return
+
+    loop = _event_loop()
+    try:
+        while True:
             with _state_lock:
-                current_job_state["is_running"] = False
-                current_job_state["is_finished"] = True
-            _job_queue.task_done()
+                if worker.cancelled:
+                    break
+                task = loop.create_task(_next_result(results))
+                worker._task, worker._loop = task, loop
+            try:
+                yield loop.run_until_complete(task)
+            except (StopAsyncIteration, asyncio.CancelledError):
+                break
+            finally:
+                with _state_lock:
+                    worker._task = None
+    finally:
+        loop.run_until_complete(results.aclose())
+
+
+async def _next_result(results):
+    return await anext(results)
+
+
+def start_workers(profiles=None, subprocess_manager=None):
+    """
+    Starts one background worker per device profile.
+
+    A profile is a dict such as:
+        {"name": "cuda1", "env": {"CUDA_VISIBLE_DEVICES": "1"},
+         "backend_table": [["primary", "cuda0"]], "jobs": ["txt2img"]}
+    Without profiles a single default worker is started.
+    The given subprocess_manager is used by the first worker.
+    """
+    profiles = profiles or [{'name': 'default'}]
+
+    with _state_lock:
+        for i, profile in enumerate(profiles):
+            worker = Worker(profile, subprocess_manager if i == 0 else None)
+            _workers.append(worker)
+            threading.Thread(target=worker.run, daemon=True).start()
+        _dispatch()
 
 
 def start_worker():
     """Starts the background queue processor."""
-    threading.Thread(target=_background_worker, daemon=True).start()
+    start_workers()
+
+
+def _new_job(func, params, owner, device, priority, attempts=0):
+    if priority not in PRIORITY_LANES:
+        raise ValueError(
+            f"Unknown priority '{priority}'. "
+            f"Valid priorities are: {list(PRIORITY_LANES)}"
+        )
+
+    job_id = next(_job_ids)
+    return {
+        'id': job_id,
+        'func': func,
+        'params': params,
+        'owner': owner,
+        'device': device,
+        'priority': priority,
+        'order': job_id,
+        'attempts': attempts,
+        'interrupted': attempts > 0
+    }
+
+
+def _check_accepted(job: dict):
+    """
+    Raises a ValueError if no worker can run the job, which would stay
+    pending forever. Must hold the state lock.
+    """
+    if _workers and not any(worker.accepts(job) for worker in _workers):
+        raise ValueError(
+            f"No worker accepts '{job['func'].__name__}' jobs" +
+            (f" on device '{job['device']}'." if job['device'] else ".")
+        )
+
 
+def _enqueue(job: dict):
+    """Adds a job to the pending list. Must hold the state lock."""
+    _check_accepted(job)
+    _pending_jobs.append(job)
+    _publish()
 
-def add_job(func, params, owner=None):
+
+def add_job(func, params, owner=None, device=None, priority="normal"):
     """
     Adds a generic job to the queue.
     :param func: The python function to run (e.g., txt2img)
     :param params: A dictionary of arguments for that function
+    :param owner: The tab that submitted the job
+    :param device: Name of the device profile the job must run on
+    :param priority: The lane of the job, one of PRIORITY_LANES
+    :return: The ID of the queued job
     """
-    job = {
-        'func': func,
-        'params': params,
-        'owner': owner
-    }
-    _job_queue.put(job)
+    job = _new_job(func, params, owner, device, priority)
+    register_job_func(func)
+
+    with _state_lock:
+        _check_accepted(job)
+        if _journal:
+            _journal.record_add(job)
+        _enqueue(job)
+        _dispatch()
+
+    return job['id']
+
+
+def register_job_func(func):
+    """Makes a job function resolvable by name when restoring jobs."""
+    _job_funcs[func.__name__] = func
+
+
+def enable_journal(journal):
+    """Journals every queue change with the given QueueJournal."""
+    global _journal
+    _journal = journal
+
+
+def _compact_journal():
+    """
+    Rewrites the journal with only the running and pending jobs, plus
+    the entries of the jobs this session can't run. Must hold the
+    state lock.
+    """
+    running = [worker.job for worker in _workers if worker.job is not None]
+    events = []
+    for job in running + sorted(_pending_jobs, key=_job_sort_key):
+        event = _journal.make_add_event(job)
+        if event:
+            events.append(event)
+    events += [_journal.make_event('start', job['id']) for job in running]
+    _journal.compact(_unresolved_events + events)
+
+
+def restore_jobs():
+    """
+    Queues the jobs left unfinished in the journal by the previous run.
+    Job functions have to be registered first. Jobs whose function or
+    device isn't available, like the other mode's, stay in the journal
+    for a later run.
+    Returns the number of restored jobs.
+    """
+    if _journal is None:
+        return 0
+
+    jobs = []
+    with _state_lock:
+        for entry in _journal.replay():
+            func = _job_funcs.get(entry['func'])
+            if func is None:
+                print(
+                    f"Queue journal: unknown job function '{entry['func']}', "
+                    f"keeping job {entry['id']} for a later run."
+                )
+                # Renumbered, so it can't clash with this session's jobs
+                job_id = next(_job_ids)
+                _unresolved_events.append({
+                    **{k: v for k, v in entry.items() if k != 'interrupted'},
+                    'id': job_id, 'order': job_id
+                })
+                continue
+
+            try:
+                job = _new_job(
+                    func, entry['params'], entry.get('owner'),
+                    entry.get('device'), entry.get('priority', "normal"),
+                    entry.get('attempts', 0)
+                )
+            except ValueError as e:
+                print(f"Queue journal: skipping job {entry['id']}: {e}")
+                continue
+
+            try:
+                _enqueue(job)
+                jobs.append(job)
+            except ValueError as e:
+                print(
+                    f"Queue journal: keeping job {entry['id']} "
+                    f"for a later run: {e}"
+                )
+                event = _journal.make_add_event(job)
+                if event:
+                    _unresolved_events.append(event)
+
+        _compact_journal()
+        _dispatch()
+
+    interrupted = sum(job['interrupted'] for job in jobs)
+    if jobs:
+        print(
+            f"Restored {len(jobs)} queued job(s), "
+            f"{interrupted} interrupted mid-run."
+        )
+    return len(jobs)
+
+
+def list_jobs():
+    """
+    Returns the running jobs followed by the pending ones,
+    in the order they will be picked up.
+    """
+    def describe(job, status, worker=None):
+        return {
+            "id": job['id'],
+            "func": job['func'].__name__,
+            "owner": job.get('owner'),
+            "device": job.get('device'),
+            "priority": job['priority'],
+            "interrupted": job['interrupted'],
+            "status": status,
+            "worker": worker
+        }
+
+    with _state_lock:
+        running = [
+            describe(worker.job, "running", worker.name)
+            for worker in _workers if worker.job is not None
+        ]
+        pending = [
+            describe(job, "pending")
+            for job in sorted(_pending_jobs, key=_job_sort_key)
+        ]
+    return running + pending
+
+
+def cancel(job_id):
+    """
+    Cancels a job. Pending jobs are removed from the queue and
+    running ones are interrupted.
+    Returns True if the job was found.
+    """
+    with _state_lock:
+        for job in _pending_jobs:
+            if job['id'] == job_id:
+                _pending_jobs.remove(job)
+                if _journal:
+                    _journal.record('cancel', job_id)
+                _publish()
+                return True
 
+        worker = next(
+            (w for w in _workers if w.job and w.job['id'] == job_id), None
+        )
 
-def get_queue_size():
-    return _job_queue.qsize()
+    if worker is None:
+        return False
 
+    return worker.interrupt(job_id)
 
-def get_status():
+
+def bump(job_id):
+    """
+    Moves a pending job to the front of the interactive lane.
+    Returns True if the job was found.
+    """
     with _state_lock:
-        return current_job_state.copy()
+        for job in _pending_jobs:
+            if job['id'] == job_id:
+                job['priority'] = PRIORITY_LANES[0]
+                job['order'] = min(j['order'] for j in _pending_jobs) - 1
+                if _journal:
+                    _journal.record_bump(job)
+                _dispatch()
+                _publish()
+                return True
+    return False
 
 
-def consume_finished():
+def get_queue_size(owner=None):
+    """Returns the number of pending jobs, only the owner's if given."""
     with _state_lock:
-        if current_job_state["is_finished"]:
-            current_job_state["is_finished"] = False
+        if owner is None:
+            return len(_pending_jobs)
+        return sum(job.get('owner') == owner for job in _pending_jobs)
+
+
+def _find_worker(owner=None):
+    """
+    Returns the worker running the owner's job, or the one that ran it
+    last. Without an owner, the first busy worker is returned.
+    """
+    if owner is not None:
+        for worker in _workers:
+            if worker.state["owner"] == owner and worker.state["is_running"]:
+                return worker
+        for worker in _workers:
+            if worker.state["owner"] == owner:
+                return worker
+        return None
+
+    for worker in _workers:
+        if worker.state["is_running"]:
+            return worker
+    return _workers[0] if _workers else None
+
+
+def get_status(owner=None):
+    """
+    Returns the state of the owner's running job, or else of its last
+    finished one. Without an owner, the first busy worker's state.
+    """
+    with _state_lock:
+        worker = _find_worker(owner)
+        if owner is not None and not (worker and worker.state["is_running"]):
+            finished = _finished.get(owner)
+            return finished.copy() if finished else get_clean_state()
+        if worker is None:
+            return get_clean_state()
+        return worker.state.copy()
+
+
+def get_worker_status():
+    """Returns the name and job state of every worker."""
+    with _state_lock:
+        return [
+            {"worker": worker.name, **worker.state} for worker in _workers
+        ]
+
+
+def consume_finished(owner=None):
+    with _state_lock:
+        if owner is not None:
+            finished = _finished.get(owner)
+            if finished and finished["is_finished"]:
+                finished["is_finished"] = False
+                return True
+            return False
+
+        worker = _find_worker(owner)
+        if worker and worker.state["is_finished"]:
+            worker.state["is_finished"] = False
             return True
         else:
             return False
+
+
+def current_subprocess_manager():
+    """
+    Returns the subprocess manager of the worker running on the current
+    thread, or None outside of the queue workers.
+    """
+    worker = getattr(_local, 'worker', None)
+    return worker.subprocess_manager if worker else None
+
+
+def kill_job(owner=None):
+    """Interrupts the owner's running job, if any."""
+    with _state_lock:
+        worker = _find_worker(owner)
+        if not worker or not worker.state["is_running"] or not worker.job:
+            worker = None
+        else:
+            job_id = worker.job['id']
+
+    if not worker or not worker.interrupt(job_id):
+        print("No job running.")
@@ -0,0 +1,170 @@
+"""sd.cpp-webui - utils - queue journal module"""
+
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_JOURNAL_PATH = os.path.join('user_data', 'queue_journal.jsonl')
+MAX_JOB_ATTEMPTS = 2
+# Events or bytes appended after which the journal should be compacted
+COMPACT_EVENTS = 1000
+COMPACT_BYTES = 4 * 1024 * 1024
+
+
+class QueueJournal:
+    """
+    Append-only JSONL journal of the job queue, so pending jobs
+    survive restarts and crashes.
+
+    Every line is one event: 'add' (with the job's function name and
+    params), 'bump' (with its new lane and order), 'start', 'done' or
+    'cancel'. Replaying the file gives back the jobs that never finished.
+    """
+
+    def __init__(self, journal_path: str = None):
+        self.journal_path = os.getenv(
+            'SD_WEBUI_QUEUE_JOURNAL_PATH', journal_path or DEFAULT_JOURNAL_PATH
+        )
+        self._lock = threading.Lock()
+        self._appended_events = 0
+        self._appended_bytes = 0
+
+    def _append(self, event: Dict[str, Any]):
+        """Appends one event and flushes it to disk."""
+        line = json.dumps(event) + "\n"
+        with self._lock:
+            try:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._appended_events += 1
+                self._appended_bytes += len(line)
+            except OSError as e:
+                print(f"Error writing to {self.journal_path}: {e}")
+
+    def needs_compaction(self) -> bool:
+        """Checks if enough was appended since the last compaction."""
+        with self._lock:
+            return (
+                self._appended_events >= COMPACT_EVENTS or
+                self._appended_bytes >= COMPACT_BYTES
+            )
+
+    def make_add_event(
+        self, job: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Builds the 'add' event of a job, or returns None if its params
+        can't be stored, in which case the job only lives in memory.
+        """
+        event = {
+            'event': 'add',
+            'id': job['id'],
+            'func': job['func'].__name__,
+            'params': job['params'],
+            'owner': job.get('owner'),
+            'device': job.get('device'),
+            'priority': job['priority'],
+            'order': job['order'],
+            'attempts': job.get('attempts', 0),
+            'time': time.time()
+        }
+        try:
+            json.dumps(event)
+        except (TypeError, ValueError) as e:
+            print(f"Queue journal: job {job['id']} not persisted: {e}")
+            return None
+        return event
+
+    def record_add(self, job: Dict[str, Any]):
+        """Journals a new job."""
+        event = self.make_add_event(job)
+        if event:
+            self._append(event)
+
+    def record_bump(self, job: Dict[str, Any]):
+        """Journals the new lane and position of a bumped job."""
+        self._append({
+            'event': 'bump', 'id': job['id'], 'priority': job['priority'],
+            'order': job['order'], 'time': time.time()
+        })
+
+    @staticmethod
+    def make_event(event: str, job_id: int) -> Dict[str, Any]:
+        return {'event': event, 'id': job_id, 'time': time.time()}
+
+    def record(self, event: str, job_id: int):
+        """Journals a 'start', 'done' or 'cancel' event."""
+        self._append(self.make_event(event, job_id))
+
+    def _read_events(self) -> List[Dict[str, Any]]:
+        if not os.path.isfile(self.journal_path):
+            return []
+
+        events = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-write
+                        continue
+        except OSError as e:
+            print(f"Error reading {self.journal_path}: {e}")
+        return events
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """
+        Returns the unfinished jobs in queue order. Jobs that were
+        running when the app stopped are flagged as 'interrupted' and
+        dropped once they've been interrupted MAX_JOB_ATTEMPTS times.
+        """
+        jobs = {}
+        for event in self._read_events():
+            job_id = event.get('id')
+            match event.get('event'):
+                case 'add':
+                    jobs[job_id] = {**event, 'interrupted': False}
+                case 'bump':
+                    if job_id in jobs:
+                        jobs[job_id]['priority'] = event['priority']
+                        jobs[job_id]['order'] = event['order']
+                case 'start':
+                    if job_id in jobs:
+                        jobs[job_id]['attempts'] += 1
+                        jobs[job_id]['interrupted'] = True
+                case 'done' | 'cancel':
+                    jobs.pop(job_id, None)
+
+        unfinished = []
+        for job in sorted(
+            jobs.values(), key=lambda j: j.get('order', j['id'])
+        ):
+            if job['attempts'] >= MAX_JOB_ATTEMPTS:
+                print(
+                    f"Queue journal: dropping {job['func']} job {job['id']}, "
+                    f"interrupted {job['attempts']} times."
+                )
+                continue
+            unfinished.append(job)
+        return unfinished
+
+    def compact(self, events: Optional[List[Dict[str, Any]]] = None):
+        """Atomically rewrites the journal with only the given events."""
+        tmp_path = f"{self.journal_path}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for event in events or []:
+                        f.write(json.dumps(event) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.journal_path)
+                self._appended_events = 0
+                self._appended_bytes = 0
+            except OSError as e:
+                print(f"Error compacting {self.journal_path}: {e}")
@@ -5,8 +5,75 @@ import re
 import json
 import shutil
 import hashlib
+import threading
 import subprocess
 
+PROBE_CACHE_FILE = "exe_probe.json"
+
+_probe_cache = None
+_probe_lock = threading.Lock()
+
+
+def file_fingerprint(path):
+    """Returns the path, size, mtime and inode of a file, or None."""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime": st.st_mtime_ns,
+        "inode": st.st_ino
+    }
+
+
+def _load_probes():
+    """Returns the saved probe results. Must hold the probe lock."""
+    global _probe_cache
+    if _probe_cache is None:
+        _probe_cache = {}
+        if os.path.exists(PROBE_CACHE_FILE):
+            try:
+                with open(PROBE_CACHE_FILE, "r", encoding="utf-8") as f:
+                    _probe_cache = json.load(f)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"Error reading probe cache: {e}. Probing again.")
+    return _probe_cache
+
+
+def _get_probe(cand, fingerprint):
+    """Returns the saved probe of a binary if it hasn't changed since."""
+    if fingerprint is None:
+        return None
+    with _probe_lock:
+        probe = _load_probes().get(cand)
+    if probe and probe.get("fingerprint") == fingerprint:
+        return probe
+    return None
+
+
+def _save_probe(cand, fingerprint, version):
+    """Records a binary that ran fine, with its version string."""
+    if fingerprint is None:
+        return
+    with _probe_lock:
+        probes = _load_probes()
+        probes[cand] = {
+            "path": fingerprint["path"],
+            "fingerprint": fingerprint,
+            "version": version
+        }
+        tmp_path = f"{PROBE_CACHE_FILE}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(probes, f, indent=2)
+            os.replace(tmp_path, PROBE_CACHE_FILE)
+        except (IOError, TypeError, ValueError) as e:
+            print(f"Failed to write to probe cache: {e}")
+
 
 def exe_name(mode="cli"):
     """
@@ -14,6 +81,8 @@ def exe_name(mode="cli"):
     Prioritizes 'sd-cli' over 'sd', and checks both PATH and current directory.
     Verifies the binary can be executed by running <binary> --version.
     Accumulates errors for failed candidates, only exits if all fail.
+    A binary that already passed and hasn't changed since (path, size,
+    mtime and inode) isn't run again, even across restarts.
     """
     if mode == "server":
         candidates = ["sd-server"]
@@ -37,16 +106,19 @@ def exe_name(mode="cli"):
                 is_local = True
 
         if executable_path:
+            name = f"./{cand}" if is_local and os.name != "nt" else cand
+            fingerprint = file_fingerprint(executable_path)
+            if _get_probe(cand, fingerprint) is not None:
+                return name
+
             try:
-                subprocess.run(
+                result = subprocess.run(
                     [executable_path, "--version"],
                     capture_output=True, text=True, check=True
                 )
+                _save_probe(cand, fingerprint, str(result.stdout).strip())
 
-                if is_local and os.name != "nt":
-                    return f"./{cand}"
-
-                return cand
+                return name
 
             except subprocess.CalledProcessError as e:
                 failed_candidates.append(
@@ -81,8 +153,11 @@ class SDOptionsCache:
     This class provides a robust and efficient way to retrieve and cache
     command-line options from the stable-diffusion.cpp executable's helpers
     output.
-    It uses file hashes of both the sd binary and this script to ensure the
-    cache is always in sync.
+    The cache is tied to the sd binary through its path, size, mtime and
+    inode, which are cheap to check on every startup. The binary is only
+    hashed when those change with the size staying the same, to tell a
+    touched or copied binary from a new one. The hash of a new binary is
+    computed in the background. This script is always hashed, it's small.
 
     Attributes:
         SD_PATH: Full path to the SD binary.
@@ -112,9 +187,49 @@ class SDOptionsCache:
         self._OPTIONS = ["--sampling-method", "--scheduler", "--preview",
                          "--type", "--prediction", "--rng", "--sampler-rng"]
         self._help_cache = {}
+        self._cache_lock = threading.Lock()
 
         self._load_help_text_sync()
 
+    def _resolve_sd_path(self):
+        """Returns the path of the SD binary on disk, or None."""
+        if not self.SD_PATH:
+            return None
+        if os.path.isfile(self.SD_PATH):
+            return os.path.abspath(self.SD_PATH)
+        return shutil.which(self.SD_PATH)
+
+    def _write_cache(self, data):
+        """Atomically writes the cache file."""
+        tmp_path = f"{self._CACHE_FILE}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self._CACHE_FILE)
+        except (IOError, TypeError, ValueError) as e:
+            print(f"Failed to write to cache file: {e}")
+
+    def _hash_in_background(self, sd_path, fingerprint):
+        """Stores the hash of a new binary once it's computed."""
+        def run():
+            sd_hash = self._hash_file(sd_path)
+            if sd_hash is None or file_fingerprint(sd_path) != fingerprint:
+                return
+            with self._cache_lock:
+                try:
+                    with open(self._CACHE_FILE, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (IOError, json.JSONDecodeError):
+                    return
+                if data.get("sd_fingerprint") != fingerprint:
+                    return
+                data["sd_hash"] = sd_hash
+                self._write_cache(data)
+
+        threading.Thread(
+            target=run, name="sd-options-hash", daemon=True
+        ).start()
+
     def _hash_file(self, path):
         """Compute SHA256 hash of a file, or return None if not accessible."""
         if not path or not os.path.exists(path):
@@ -165,28 +280,25 @@ class SDOptionsCache:
             opt: help_cache.get(opt, []) for opt in self._OPTIONS
         }
 
-        sd_hash = self._hash_file(self.SD_PATH)
-        script_hash = self._hash_file(self.SCRIPT_PATH)
+        sd_path = self._resolve_sd_path()
+        fingerprint = file_fingerprint(sd_path)
 
-        try:
-            with open(self._CACHE_FILE, "w", encoding="utf-8") as f:
-                json.dump(
-                    {
-                        "sd_hash": sd_hash,
-                        "script_hash": script_hash,
-                        "options": self._help_cache
-                    }, f, indent=2
-                )
-        except (IOError, TypeError, ValueError) as e:
-            print(f"Failed to write to cache file: {e}")
+        with self._cache_lock:
+            self._write_cache({
+                "sd_fingerprint": fingerprint,
+                "sd_hash": None,
+                "script_hash": self._hash_file(self.SCRIPT_PATH),
+                "options": self._help_cache
+            })
+
+        if fingerprint is not None:
+            self._hash_in_background(sd_path, fingerprint)
 
     def _load_help_text_sync(self, force_refresh=False):
         """Synchronously load SD --help output and cache options to JSON."""
-        if (
-            force_refresh
-            or not self.SD_PATH
-            or not os.path.exists(self.SD_PATH)
-        ):
+        sd_path = self._resolve_sd_path()
+        fingerprint = file_fingerprint(sd_path)
+        if force_refresh or fingerprint is None:
             self._run_and_cache_help()
             return
 
@@ -196,14 +308,29 @@ class SDOptionsCache:
                 with open(self._CACHE_FILE, "r", encoding="utf-8") as f:
                     data = json.load(f)
 
-                current_sd_hash = self._hash_file(self.SD_PATH)
-                current_script_hash = self._hash_file(self.SCRIPT_PATH)
+                cached = data.get("sd_fingerprint") or {}
+                if cached == fingerprint:
+                    sd_matches = True
+                elif (
+                    data.get("sd_hash")
+                    and cached.get("size") == fingerprint["size"]
+                ):
+                    # Same size but touched or moved, compare the contents
+                    sd_matches = (
+                        self._hash_file(sd_path) == data["sd_hash"]
+                    )
+                else:
+                    sd_matches = False
 
-                if (data.get("sd_hash") == current_sd_hash and
-                        data.get("script_hash") == current_script_hash):
+                if (sd_matches and data.get("script_hash") ==
+                        self._hash_file(self.SCRIPT_PATH)):
                     self._help_cache = data.get("options", {})
                     if self._help_cache:
                         cache_valid = True
+                        if cached != fingerprint:
+                            data["sd_fingerprint"] = fingerprint
+                            with self._cache_lock:
+                                self._write_cache(data)
 
             except (IOError, json.JSONDecodeError) as e:
                 print(
@@ -8,13 +8,17 @@ from typing import Dict, Any
 from modules.gallery import get_next_media
 
 
-def extract_env_vars(params: Dict[str, Any]) -> Dict[str, str]:
+def extract_env_vars(params: Dict[str, Any]) -> Dict[str, Any]:
     """
     Parses the params dictionary to find and extract environment
     variables, applying conditional logic as needed.
+    Variables from the queue worker's device profile ('device_env')
+    take precedence over the ones set in the UI.
     """
     env_vars = {}
 
+    device_env = params.pop('device_env', None) or {}
+
     is_vk_override_true = params.pop('env_vk_visible_override', False)
     vk_device_id = params.pop('env_GGML_VK_VISIBLE_DEVICES', None)
     is_cuda_override_true = params.pop('env_cuda_visible_override', False)
@@ -25,13 +29,15 @@ def extract_env_vars(params: Dict[str, Any]) -> Dict[str, str]:
             env_key = key[4:]
             value = params.pop(key)
             if env_key not in env_vars:
-                env_vars[env_key] = str(value)
+                env_vars[env_key] = value
 
     if is_vk_override_true and vk_device_id is not None:
         env_vars['GGML_VK_VISIBLE_DEVICES'] = vk_device_id
     if is_cuda_override_true and cuda_device_id is not None:
         env_vars['CUDA_VISIBLE_DEVICES'] = cuda_device_id
 
+    env_vars.update(device_env)
+
     return env_vars
 
 
@@ -46,6 +52,11 @@ def generate_output_filename(
 
     prefix_str = ""
 
+    if name_parts:
+        suffix_str = "_".join(name_parts)
+    else:
+        suffix_str = ""
+
     match scheme:
         case "Timestamp":
             prefix_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -54,14 +65,11 @@ def generate_output_filename(
         case "EpochTime":
             prefix_str = str(int(time.time()))
         case "Sequential" | _:
-            next_img = get_next_media(subctrl=subctrl_id)
+            next_img = get_next_media(
+                subctrl=subctrl_id, name_suffix=suffix_str
+            )
             prefix_str = os.path.splitext(next_img)[0]
 
-    if name_parts:
-        suffix_str = "_".join(name_parts)
-    else:
-        suffix_str = ""
-
     if suffix_str:
         base_filename = f"{prefix_str}_{suffix_str}"
     else:
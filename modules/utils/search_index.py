@@ -0,0 +1,313 @@
+"""sd.cpp-webui - utils - gallery search index module"""
+
+import os
+import re
+import time
+import shlex
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from modules.utils.gallery_index import MEDIA_EXTENSIONS, MTIME_GRACE_SECONDS
+
+DEFAULT_DB_PATH = os.path.join('user_data', 'gallery_search.db')
+
+BatchReader = Callable[[List[str]], Iterable[Dict[str, Any]]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER,
+    ctime REAL,
+    size INTEGER,
+    pprompt TEXT,
+    nprompt TEXT,
+    seed TEXT,
+    steps INTEGER,
+    cfg REAL,
+    sampler TEXT,
+    scheduler TEXT,
+    model TEXT,
+    width INTEGER,
+    height INTEGER
+);
+CREATE INDEX IF NOT EXISTS media_dir ON media(dir);
+CREATE INDEX IF NOT EXISTS media_seed ON media(seed);
+CREATE TABLE IF NOT EXISTS folders (
+    dir TEXT PRIMARY KEY,
+    mtime_ns INTEGER
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS media_fts USING fts5(
+    pprompt, nprompt, content='media', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS media_ai AFTER INSERT ON media BEGIN
+    INSERT INTO media_fts(rowid, pprompt, nprompt)
+    VALUES (new.id, new.pprompt, new.nprompt);
+END;
+CREATE TRIGGER IF NOT EXISTS media_ad AFTER DELETE ON media BEGIN
+    INSERT INTO media_fts(media_fts, rowid, pprompt, nprompt)
+    VALUES ('delete', old.id, old.pprompt, old.nprompt);
+END;
+CREATE TRIGGER IF NOT EXISTS media_au AFTER UPDATE ON media BEGIN
+    INSERT INTO media_fts(media_fts, rowid, pprompt, nprompt)
+    VALUES ('delete', old.id, old.pprompt, old.nprompt);
+    INSERT INTO media_fts(rowid, pprompt, nprompt)
+    VALUES (new.id, new.pprompt, new.nprompt);
+END;
+"""
+
+ORDER_BY = {
+    "Date (Newest First)": "ctime DESC",
+    "Name (A-Z)": "lower(name) ASC",
+    "Name (Z-A)": "lower(name) DESC",
+}
+
+RANGE_REGEX = re.compile(r'^([\d.]*)(?:-([\d.]*))?$')
+
+
+def parse_query(query: str) -> Dict[str, Any]:
+    """
+    Splits a search query into prompt words and parameter filters.
+
+    Plain words and "quoted phrases" are looked up in the positive prompt,
+    neg:word in the negative one. seed:42, steps:20-30, cfg:5-7,
+    sampler:euler, scheduler:karras and model:flux filter the parameters,
+    steps and cfg take a single value or an open or closed range.
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError:
+        tokens = query.split()
+
+    parsed = {'pprompt': [], 'nprompt': [], 'filters': {}}
+    for token in tokens:
+        key, sep, value = token.partition(':')
+        key = key.lower()
+        if not sep or not value:
+            parsed['pprompt'].append(token)
+        elif key in ('neg', 'nprompt'):
+            parsed['nprompt'].append(value)
+        elif key in ('seed', 'sampler', 'scheduler', 'model'):
+            parsed['filters'][key] = value
+        elif key in ('steps', 'cfg'):
+            match = RANGE_REGEX.match(value)
+            if not match:
+                parsed['pprompt'].append(token)
+                continue
+            low, high = match.group(1), match.group(2)
+            if match.group(2) is None:
+                high = low
+            try:
+                parsed['filters'][key] = (
+                    float(low) if low else None,
+                    float(high) if high else None
+                )
+            except ValueError:
+                parsed['pprompt'].append(token)
+        else:
+            parsed['pprompt'].append(token)
+    return parsed
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """
+    SQLite index of the generation data of the gallery media, with a
+    full-text index over the prompts (FTS5, or LIKE if it's missing).
+
+    sync() only parses files that are new or changed since the last
+    run, and skips folders whose mtime hasn't moved.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = os.getenv(
+            'SD_WEBUI_SEARCH_DB_PATH', db_path or DEFAULT_DB_PATH
+        )
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            print("SQLite FTS5 not available, prompt search will be slower.")
+            self.fts = False
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _sync_dir(self, media_dir: str, reader: BatchReader) -> int:
+        """Indexes the new and changed files of a folder. Holds the lock."""
+        try:
+            dir_mtime = os.stat(media_dir).st_mtime_ns
+        except OSError:
+            dir_mtime = None
+
+        row = self._conn.execute(
+            "SELECT mtime_ns FROM folders WHERE dir = ?", (media_dir,)
+        ).fetchone()
+        if dir_mtime is not None and row and row[0] == dir_mtime:
+            return 0
+
+        known = {
+            path: (mtime_ns, size) for path, mtime_ns, size in
+            self._conn.execute(
+                "SELECT path, mtime_ns, size FROM media WHERE dir = ?",
+                (media_dir,)
+            )
+        }
+
+        found = {}
+        if dir_mtime is not None:
+            try:
+                with os.scandir(media_dir) as it:
+                    for entry in it:
+                        if entry.name.lower().endswith(MEDIA_EXTENSIONS):
+                            try:
+                                found[entry.path] = entry.stat()
+                            except OSError:
+                                continue
+            except OSError as e:
+                print(f"Error indexing {media_dir}: {e}")
+
+        removed = [(path,) for path in known if path not in found]
+        self._conn.executemany("DELETE FROM media WHERE path = ?", removed)
+
+        changed = [
+            (path, st) for path, st in found.items()
+            if known.get(path) != (st.st_mtime_ns, st.st_size)
+        ]
+        infos = reader([path for path, _ in changed])
+        for (path, st), info in zip(changed, infos):
+            params = info.get('params') or {}
+            seed = params.get('seed')
+            self._conn.execute(
+                """
+                INSERT INTO media (
+                    path, dir, name, mtime_ns, ctime, size, pprompt, nprompt,
+                    seed, steps, cfg, sampler, scheduler, model, width, height
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    mtime_ns = excluded.mtime_ns, ctime = excluded.ctime,
+                    size = excluded.size, pprompt = excluded.pprompt,
+                    nprompt = excluded.nprompt, seed = excluded.seed,
+                    steps = excluded.steps, cfg = excluded.cfg,
+                    sampler = excluded.sampler,
+                    scheduler = excluded.scheduler, model = excluded.model,
+                    width = excluded.width, height = excluded.height
+                """,
+                (
+                    path, media_dir, os.path.basename(path),
+                    st.st_mtime_ns, st.st_ctime, st.st_size,
+                    params.get('pprompt') or "", params.get('nprompt') or "",
+                    str(seed) if seed is not None else None,
+                    params.get('steps'), params.get('cfg'),
+                    params.get('sampler') or "",
+                    params.get('scheduler') or "",
+                    params.get('model') or "",
+                    info.get('width'), info.get('height')
+                )
+            )
+
+        # A folder that changed moments ago may change again unnoticed
+        if dir_mtime is not None and (
+            time.time() - dir_mtime / 1e9 > MTIME_GRACE_SECONDS
+        ):
+            self._conn.execute(
+                "INSERT OR REPLACE INTO folders (dir, mtime_ns) VALUES (?, ?)",
+                (media_dir, dir_mtime)
+            )
+        else:
+            self._conn.execute(
+                "DELETE FROM folders WHERE dir = ?", (media_dir,)
+            )
+
+        return len(changed) + len(removed)
+
+    def sync(self, dirs: List[str], reader: BatchReader) -> int:
+        """
+        Brings the index up to date with the given folders. The reader
+        gets the list of new and changed files and returns their metadata
+        in the same order, like extract_metadata_batch().
+        Returns the number of changed files.
+        """
+        changes = 0
+        with self._lock:
+            for media_dir in dict.fromkeys(d for d in dirs if d):
+                changes += self._sync_dir(media_dir, reader)
+            self._conn.commit()
+        return changes
+
+    def _build_where(self, parsed: Dict[str, Any]) -> Tuple[str, list]:
+        clauses = []
+        args = []
+
+        prompt_terms = [
+            ('pprompt', term) for term in parsed['pprompt']
+        ] + [
+            ('nprompt', term) for term in parsed['nprompt']
+        ]
+        if prompt_terms and self.fts:
+            clauses.append(
+                "id IN (SELECT rowid FROM media_fts WHERE media_fts MATCH ?)"
+            )
+            args.append(" AND ".join(
+                f"{column} : {_fts_phrase(term)}"
+                for column, term in prompt_terms
+            ))
+        else:
+            for column, term in prompt_terms:
+                clauses.append(f"{column} LIKE ?")
+                args.append(f"%{term}%")
+
+        filters = parsed['filters']
+        if 'seed' in filters:
+            clauses.append("seed = ?")
+            args.append(filters['seed'])
+        for column in ('sampler', 'scheduler', 'model'):
+            if column in filters:
+                clauses.append(f"{column} LIKE ?")
+                args.append(f"%{filters[column]}%")
+        for column in ('steps', 'cfg'):
+            low, high = filters.get(column, (None, None))
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                args.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                args.append(high)
+
+        return " AND ".join(clauses) or "1", args
+
+    def search(
+        self, query: str, sort_order: str = None,
+        dirs: Optional[List[str]] = None
+    ) -> List[str]:
+        """Returns the paths of the media matching the query."""
+        where, args = self._build_where(parse_query(query))
+        if dirs:
+            where += f" AND dir IN ({', '.join('?' * len(dirs))})"
+            args.extend(dirs)
+        order = ORDER_BY.get(sort_order, "ctime ASC")
+
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    f"SELECT path FROM media WHERE {where} ORDER BY {order}",
+                    args
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                print(f"Search failed: {e}")
+                return []
+        return [path for (path,) in rows]
@@ -0,0 +1,183 @@
+"""sd.cpp-webui - utils - startup profiler module"""
+
+import os
+import sys
+import json
+import time
+import builtins
+import threading
+import importlib.util
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+DEFAULT_REPORT_PATH = os.path.join('user_data', 'startup_profile.json')
+
+
+class _Frame:
+    """A phase or an import being timed, and the time of its children."""
+
+    def __init__(self, label: str, start: float, is_phase: bool = False):
+        self.label = label
+        self.start = start
+        self.is_phase = is_phase
+        self.children = 0.0
+
+
+class StartupProfiler:
+    """
+    Records where the startup time goes, until stop() is called.
+
+    Named phases are timed with phase(), every module imported for the
+    first time is timed through __import__, like python -X importtime.
+    Both nest into one stack on the main thread, so the report can be
+    turned into a flamegraph. While it isn't started phase() costs
+    nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._origin = 0.0
+        self._thread = None
+        self._stack: List[_Frame] = []
+        self._phases: List[Dict[str, Any]] = []
+        self._imports: Dict[str, Dict[str, float]] = {}
+        self._folded: Dict[str, float] = {}
+        self._real_import = None
+        self._hook = None
+        self.total = None
+
+    def start(self):
+        """Starts recording and hooks the imports."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._origin = time.perf_counter()
+        self._thread = threading.get_ident()
+        self._real_import = builtins.__import__
+        self._hook = self._timed_import
+        builtins.__import__ = self._hook
+
+    def stop(self):
+        """Stops recording and restores the import machinery."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.total = time.perf_counter() - self._origin
+        if builtins.__import__ is self._hook:
+            builtins.__import__ = self._real_import
+
+    def _push(self, label: str, is_phase: bool = False) -> _Frame:
+        frame = _Frame(label, time.perf_counter(), is_phase)
+        self._stack.append(frame)
+        return frame
+
+    def _pop(self, frame: _Frame) -> float:
+        """Closes a frame, returns its duration."""
+        duration = time.perf_counter() - frame.start
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1].children += duration
+        path = ";".join(f.label for f in self._stack + [frame])
+        self._folded[path] = (
+            self._folded.get(path, 0.0) + duration - frame.children
+        )
+        return duration
+
+    def _on_main_thread(self) -> bool:
+        return self.enabled and threading.get_ident() == self._thread
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times a named step of the startup."""
+        if not self._on_main_thread():
+            yield
+            return
+        frame = self._push(name, is_phase=True)
+        try:
+            yield
+        finally:
+            duration = self._pop(frame)
+            self._phases.append({
+                'name': name,
+                'start': frame.start - self._origin,
+                'seconds': duration,
+                'depth': sum(1 for f in self._stack if f.is_phase)
+            })
+
+    def _timed_import(self, name, globals=None, locals=None,
+                      fromlist=(), level=0):
+        if not self._on_main_thread():
+            return self._real_import(name, globals, locals, fromlist, level)
+
+        module_name = name
+        if level:
+            try:
+                package = (globals or {}).get('__package__') or ''
+                module_name = importlib.util.resolve_name(
+                    '.' * level + name, package
+                )
+            except (ImportError, ValueError):
+                pass
+        if module_name in sys.modules:
+            return self._real_import(name, globals, locals, fromlist, level)
+
+        frame = self._push(module_name)
+        try:
+            return self._real_import(name, globals, locals, fromlist, level)
+        finally:
+            duration = self._pop(frame)
+            self._imports[module_name] = {
+                'self': duration - frame.children,
+                'cumulative': duration
+            }
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the recorded timings."""
+        imports = sorted(
+            (
+                {'module': name, 'self_us': int(t['self'] * 1e6),
+                 'cumulative_us': int(t['cumulative'] * 1e6)}
+                for name, t in self._imports.items()
+            ),
+            key=lambda i: i['cumulative_us'], reverse=True
+        )
+        return {
+            'total_seconds': self.total,
+            'phases': sorted(self._phases, key=lambda p: p['start']),
+            'imports': imports
+        }
+
+    def write_report(self, path: Optional[str] = None) -> str:
+        """
+        Writes the report as JSON, plus the same timings as folded
+        stacks next to it (.folded), which flamegraph.pl and speedscope
+        read. Returns the path of the JSON report.
+        """
+        path = path or DEFAULT_REPORT_PATH
+        folded_path = os.path.splitext(path)[0] + ".folded"
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=4)
+            with open(folded_path, 'w', encoding='utf-8') as f:
+                for stack, seconds in self._folded.items():
+                    f.write(f"{stack} {int(seconds * 1e6)}\n")
+        except OSError as e:
+            print(f"Error saving to {path}: {e}")
+        return path
+
+    def print_summary(self, top: int = 10):
+        """Prints the phases and the slowest imports."""
+        report = self.report()
+        print(f"\nStartup took {report['total_seconds']:.2f}s")
+        for phase in report['phases']:
+            indent = "  " * (phase['depth'] + 1)
+            print(f"{indent}{phase['name']}: {phase['seconds']:.2f}s")
+        print("Slowest imports (cumulative):")
+        for entry in report['imports'][:top]:
+            print(
+                f"  {entry['cumulative_us'] / 1e6:6.2f}s  {entry['module']}"
+            )
+
+
+profiler = StartupProfiler()
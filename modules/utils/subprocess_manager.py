@@ -1,11 +1,59 @@
 """sd.cpp-webui - subprocess management module"""
 
+import os
 import re
+import asyncio
 import subprocess
 
 from modules.utils.log_parser import LogParser
 
 
+READ_CHUNK_SIZE = 64 * 1024
+FRAME_END_REGEX = re.compile(rb'[\r\n]|it/s|s/it')
+ANSI_ESCAPE_REGEX = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+
+def split_frames(buffer: bytearray) -> list:
+    """
+    Removes every complete frame from the start of the buffer and
+    returns them as a list of bytes.
+
+    A frame ends at a '\r' or '\n', or right after an 'it/s'/'s/it'
+    progress suffix as long as the frame is longer than the suffix itself.
+    Incomplete data is left in the buffer for the next read.
+    """
+    frames = []
+    frame_start = 0
+    search_pos = 0
+
+    while True:
+        match = FRAME_END_REGEX.search(buffer, search_pos)
+        if not match:
+            break
+
+        frame_end = match.end()
+        if match.end() - match.start() > 1 and frame_end - frame_start <= 4:
+            # A bare progress suffix is not a frame on its own
+            search_pos = match.start() + 1
+            continue
+
+        frames.append(bytes(buffer[frame_start:frame_end]))
+        frame_start = search_pos = frame_end
+
+    del buffer[:frame_start]
+    return frames
+
+
+class _RunState:
+    """Parsing state carried across the output frames of one run."""
+
+    def __init__(self):
+        self.phase = "Initializing"
+        self.final_stats = {}
+        self.last_was_progress = False
+        self.last_processed_content = ""
+
+
 class SubprocessManager:
     """
     Class to manage subprocess execution and control.
@@ -22,34 +70,51 @@ class SubprocessManager:
     def _stream_output(self):
         """
         Generates raw strings from the subprocess stdout,
-        breaking at line endings or progress updates."""
+        breaking at line endings or progress updates.
+
+        Reads whatever the pipe has available in large chunks
+        instead of one byte at a time.
+        """
+        fd = self.process.stdout.fileno()
         buffer = bytearray()
-        for byte in iter(lambda: self.process.stdout.read(1), b''):
-            buffer.extend(byte)
-
-            is_line_end = byte in (b'\r', b'\n')
-            is_progress_end = (
-                    len(buffer) > 4 and
-                    byte in (b's', b't') and
-                    (buffer.endswith(b'it/s') or buffer.endswith(b's/it'))
-            )
+        for chunk in iter(lambda: os.read(fd, READ_CHUNK_SIZE), b''):
+            buffer.extend(chunk)
 
-            if is_line_end or is_progress_end:
-                yield buffer.decode('utf-8', errors='replace')
-                buffer.clear()
+            for frame in split_frames(buffer):
+                yield frame.decode('utf-8', errors='replace')
 
         if buffer:
             yield buffer.decode('utf-8', errors='replace')
 
+    def _handle_frame(self, raw_line, state):
+        """
+        Parses one raw output frame, updating the run state.
+        Returns the update dict for the UI, or None.
+        """
+        clean_line = ANSI_ESCAPE_REGEX.sub('', raw_line)
+
+        if (
+            clean_line == state.last_processed_content or
+            not clean_line.strip()
+        ):
+            return None
+
+        new_phase = self.parser.determine_phase(clean_line)
+        if new_phase:
+            state.phase = new_phase
+
+        update_data, state.last_was_progress = self.parser.process_line(
+            raw_line, clean_line, state.phase,
+            state.final_stats, state.last_was_progress
+        )
+        state.last_processed_content = clean_line
+        return update_data
+
     def run_subprocess(self, command, env=None):
         """
         Runs a subprocess and yields UI updates.
         """
-        phase = "Initializing"
-        final_stats = {}
-        last_was_progress = False
-        last_processed_content = ""
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+        state = _RunState()
 
         try:
             with subprocess.Popen(
@@ -58,38 +123,77 @@ class SubprocessManager:
             ) as self.process:
 
                 for raw_line in self._stream_output():
-                    clean_line = ansi_escape.sub('', raw_line)
-
-                    if (
-                        clean_line == last_processed_content or
-                        not clean_line.strip()
-                    ):
-                        continue
-
-                    new_phase = self.parser.determine_phase(clean_line)
-                    if new_phase:
-                        phase = new_phase
-
-                    update_data, last_was_progress = self.parser.process_line(
-                        raw_line, clean_line, phase,
-                        final_stats, last_was_progress
-                    )
-                    last_processed_content = clean_line
+                    update_data = self._handle_frame(raw_line, state)
 
                     if update_data:
                         yield update_data
                         if "final_stats" in update_data:
-                            final_stats.clear()
+                            state.final_stats.clear()
+
+        finally:
+            if state.last_was_progress:
+                print("\n")
+            if self.process and self.process.returncode != 0:
+                print("Subprocess terminated.")
+            self.process = None
+
+        if state.final_stats:
+            yield {"final_stats": state.final_stats}
+
+    async def _stream_output_async(self):
+        """
+        Async counterpart of _stream_output for processes started
+        with asyncio.create_subprocess_exec.
+        """
+        stdout = self.process.stdout
+        buffer = bytearray()
+        while chunk := await stdout.read(READ_CHUNK_SIZE):
+            buffer.extend(chunk)
+
+            for frame in split_frames(buffer):
+                yield frame.decode('utf-8', errors='replace')
+
+        if buffer:
+            yield buffer.decode('utf-8', errors='replace')
+
+    async def run_subprocess_async(self, command, env=None):
+        """
+        Runs a subprocess on the running asyncio event loop and
+        yields the same UI updates as run_subprocess.
+
+        Each concurrent run needs its own SubprocessManager, since
+        the running process is tracked on the instance for kill_subprocess.
+        """
+        state = _RunState()
+
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *map(str, command), stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT, env=env
+            )
+
+            async for raw_line in self._stream_output_async():
+                update_data = self._handle_frame(raw_line, state)
+
+                if update_data:
+                    yield update_data
+                    if "final_stats" in update_data:
+                        state.final_stats.clear()
+
+            await self.process.wait()
 
         finally:
-            if last_was_progress:
+            if state.last_was_progress:
                 print("\n")
+            if self.process and self.process.returncode is None:
+                self.process.terminate()
+                await self.process.wait()
             if self.process and self.process.returncode != 0:
                 print("Subprocess terminated.")
             self.process = None
 
-        if final_stats:
-            yield {"final_stats": final_stats}
+        if state.final_stats:
+            yield {"final_stats": state.final_stats}
 
     def kill_subprocess(self):
         """
@@ -0,0 +1,189 @@
+"""sd.cpp-webui - utils - thumbnail cache module"""
+
+import os
+import shutil
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, features
+
+DEFAULT_CACHE_DIR = os.path.join('user_data', 'thumbnails')
+THUMBNAIL_SIZE = 384
+VIDEO_EXTENSIONS = ('.avi', '.mp4', '.webm')
+
+# Evict old thumbnails every this many new ones
+EVICT_INTERVAL = 64
+
+
+class ThumbnailCache:
+    """
+    Downscaled gallery previews, generated on a thread pool the first
+    time they're needed. Videos get a poster frame if ffmpeg is available.
+
+    Thumbnails are named after the source path, mtime and size, so an
+    edited or replaced file gets a new one. When the cache grows past its
+    size limit the least recently used thumbnails are deleted.
+    """
+
+    def __init__(
+        self, cache_dir: str = None, max_mb: int = 512,
+        size: int = THUMBNAIL_SIZE, max_workers: int = None
+    ):
+        self.cache_dir = os.getenv(
+            'SD_WEBUI_THUMBNAIL_DIR', cache_dir or DEFAULT_CACHE_DIR
+        )
+        self.max_bytes = max(int(max_mb), 1) * 1024 * 1024
+        self.size = size
+        self.extension = '.webp' if features.check('webp') else '.jpg'
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or min(4, os.cpu_count() or 1),
+            thread_name_prefix="thumbnail"
+        )
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _thumbnail_path(self, path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{self.size}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        # ffmpeg builds don't always have a WebP encoder
+        extension = (
+            '.jpg' if path.lower().endswith(VIDEO_EXTENSIONS)
+            else self.extension
+        )
+        return os.path.join(self.cache_dir, digest[:2], digest + extension)
+
+    def _render(self, path: str, thumb_path: str) -> bool:
+        """Writes the thumbnail of an image or video."""
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        root, extension = os.path.splitext(thumb_path)
+        tmp_path = f"{root}.{threading.get_ident()}.tmp{extension}"
+
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            if shutil.which("ffmpeg") is None:
+                return False
+            cmd = [
+                'ffmpeg', '-y', '-loglevel', 'error', '-i', path,
+                '-frames:v', '1', '-vf',
+                f"scale={self.size}:{self.size}:force_original_aspect_ratio=decrease",
+                tmp_path
+            ]
+            result = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                check=False
+            )
+            if result.returncode != 0 or not os.path.isfile(tmp_path):
+                return False
+        else:
+            with Image.open(path) as img:
+                img.draft('RGB', (self.size, self.size))
+                img.thumbnail((self.size, self.size))
+                if extension == '.jpg' and img.mode != 'RGB':
+                    img = img.convert('RGB')
+                elif img.mode not in ('RGB', 'RGBA'):
+                    img = img.convert('RGBA')
+                img.save(
+                    tmp_path, 'WEBP' if extension == '.webp' else 'JPEG',
+                    quality=80
+                )
+
+        os.replace(tmp_path, thumb_path)
+        return True
+
+    def _create(self, path: str, thumb_path: str) -> Optional[str]:
+        try:
+            if not self._render(path, thumb_path):
+                return None
+        except Exception as e:
+            print(f"Failed to create a thumbnail for {path}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(thumb_path, None)
+
+        with self._lock:
+            self._created += 1
+            evict = self._created % EVICT_INTERVAL == 0
+        if evict:
+            self.evict()
+        return thumb_path
+
+    def _submit(self, path: str) -> Tuple[Optional[str], Optional[Future]]:
+        """
+        Queues the thumbnail of a file if it isn't cached yet.
+        Returns the thumbnail path, None if the file is gone, and the
+        future creating it, None if it's already cached.
+        """
+        thumb_path = self._thumbnail_path(path)
+        if thumb_path is None:
+            return None, None
+
+        with self._lock:
+            future = self._pending.get(thumb_path)
+            if future is not None:
+                return thumb_path, future
+            try:
+                # Also keeps track of use for the eviction order
+                os.utime(thumb_path)
+                return thumb_path, None
+            except OSError:
+                pass
+            future = self._pool.submit(self._create, path, thumb_path)
+            self._pending[thumb_path] = future
+            return thumb_path, future
+
+    def get_many(self, paths: List[str], timeout: float = 30) -> List[str]:
+        """
+        Returns the thumbnails of the given files in the same order.
+        Files without a thumbnail are returned as they are.
+        """
+        submitted = [self._submit(path) for path in paths]
+        wait([f for _, f in submitted if f is not None], timeout=timeout)
+
+        thumbs = []
+        for path, (thumb_path, future) in zip(paths, submitted):
+            if future is not None:
+                thumb_path = future.result() if future.done() else None
+            thumbs.append(thumb_path or path)
+        return thumbs
+
+    def prefetch(self, paths: List[str]):
+        """Creates the thumbnails of the given files in the background."""
+        for path in paths:
+            self._submit(path)
+
+    def evict(self):
+        """Deletes the least recently used thumbnails over the size limit."""
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        # Trim to 90% so eviction doesn't run again right away
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
@@ -1,6 +1,7 @@
 """sd.cpp-webui - UI interactivity and events module"""
 
 import os
+import asyncio
 
 import gradio as gr
 
@@ -10,7 +11,16 @@ from modules.shared_instance import (
 )
 
 
-_polling_configs = []
+# Status watchers of the generation tabs, with their outputs
+_status_watchers = []
+# The live status watcher of each browser session and tab
+_session_watchers = {}
+
+# Shortest time between two status updates sent to a browser tab
+STATUS_MIN_INTERVAL = 0.1
+# Longest wait before a watcher checks in with its browser tab, so the
+# watchers of closed tabs end
+STATUS_KEEPALIVE = 5
 
 
 def get_ordered_inputs(inputs_map):
@@ -20,6 +30,39 @@ def get_ordered_inputs(inputs_map):
     return ordered_keys, ordered_components
 
 
+def get_job_priority(params):
+    """
+    Sends single image jobs through the interactive lane, so quick
+    previews don't wait behind large batch runs.
+    """
+    try:
+        batch_count = int(params.get('in_batch_count') or 1)
+    except (ValueError, TypeError):
+        batch_count = 1
+    return "batch" if batch_count > 1 else "interactive"
+
+
+def skip_unchanged(delivered, updates):
+    """
+    Replaces the values a session has already received with gr.skip(),
+    so unchanged fields (like a long list of output images) aren't
+    serialized again. Updates the delivered values in place.
+
+    A Gallery can't be appended to, so a changed image list is sent
+    whole. The CLI runners change it once, at the end of the job; the
+    server runners once per finished response, which is once per image
+    for a split batch.
+    """
+    deltas = {}
+    for key, value in updates.items():
+        if key in delivered and delivered[key] == value:
+            deltas[key] = gr.skip()
+        else:
+            delivered[key] = value
+            deltas[key] = value
+    return deltas
+
+
 def bind_generation_pipeline(
     api_func, ordered_keys, ordered_components, outputs_map
 ):
@@ -27,14 +70,18 @@ def bind_generation_pipeline(
     Connects the UI components to the generation queue.
     """
     tab_id = api_func.__name__
+    queue_manager.register_job_func(api_func)
 
     def submit_job(*args):
         params = dict(zip(ordered_keys, args))
 
-        current_state = queue_manager.get_status()
+        current_state = queue_manager.get_status(owner=tab_id)
         already_running = current_state.get("is_running", False)
 
-        queue_manager.add_job(api_func, params, owner=tab_id)
+        queue_manager.add_job(
+            api_func, params, owner=tab_id,
+            priority=get_job_priority(params)
+        )
 
         if already_running:
             return (
@@ -47,65 +94,87 @@ def bind_generation_pipeline(
             gr.update(visible=True, value="Added to queue..."),
         )
 
-    def poll_status():
-        state = queue_manager.get_status()
-        q_len = queue_manager.get_queue_size()
-        just_finished = queue_manager.consume_finished()
-
-        owner = state.get("owner")
-        is_running = state.get("is_running")
-        imgs = state.get("images", None)
-
-        if just_finished and q_len == 0 and not is_running:
-            timer_update = gr.update(active=False)
-        elif q_len > 0 or is_running:
-            timer_update = gr.update(active=True)
-        else:
-            timer_update = gr.skip()
-
-        if not just_finished and ((owner != tab_id and not is_running) or (not is_running and q_len == 0)):
-            return (
-                gr.skip(),
-                gr.skip(),
-                gr.skip(),
-                gr.skip(),
-                gr.skip(),
-                timer_update,
-                gr.skip()
-            )
-
-        prog = state.get("progress", 0)
-        stat = state.get("status", "")
-        cmd = state.get("command", "")
-        stats = state.get("stats", "")
-
-        if just_finished and q_len == 0 and not is_running:
-            prog_update = gr.update(visible=False, value=0)
-            stat_update = gr.update(visible=False, value="")
-        else:
-            prog_update = prog
-            stat_update = stat
-
-        if q_len > 0:
-            queue_display = gr.update(
-                visible=True,
-                value=f"⏳ Jobs in queue: {q_len}"
-            )
-        else:
-            queue_display = gr.update(visible=False, value="")
-
-        if imgs is None:
-            imgs = gr.update(value=None)
-
-        return (
-            cmd,
-            prog_update,
-            stat_update,
-            stats,
-            imgs,
-            timer_update,
-            queue_display
-        )
+    async def watch_status(request: gr.Request = None):
+        """
+        Streams the tab's job state to the UI. It only wakes up when the
+        queue publishes a change and stops once the tab has no jobs left.
+        A session runs one watcher per tab, the one already streaming
+        picks up the jobs submitted after it started.
+        """
+        key = (getattr(request, 'session_hash', None), tab_id)
+        if key in _session_watchers:
+            yield tuple(gr.skip() for _ in range(6))
+            return
+
+        token = object()
+        _session_watchers[key] = token
+        version = queue_manager.get_version()
+        delivered = {}
+
+        try:
+            while True:
+                state = queue_manager.get_status(owner=tab_id)
+                q_len = queue_manager.get_queue_size()
+                has_jobs = (
+                    state.get("is_running") or
+                    queue_manager.get_queue_size(owner=tab_id) > 0
+                )
+
+                cmd = state.get("command", "")
+                stats = state.get("stats", "")
+                imgs = state.get("images", None)
+
+                if imgs is None:
+                    imgs = gr.update(value=None)
+
+                if q_len > 0:
+                    queue_display = gr.update(
+                        visible=True,
+                        value=f"⏳ Jobs in queue: {q_len}"
+                    )
+                else:
+                    queue_display = gr.update(visible=False, value="")
+
+                if has_jobs:
+                    prog = state.get("progress", 0)
+                    stat = state.get("status", "")
+                else:
+                    queue_manager.consume_finished(owner=tab_id)
+                    prog = gr.update(visible=False, value=0)
+                    stat = gr.update(visible=False, value="")
+                    # Let a job submitted from now on start a new watcher
+                    del _session_watchers[key]
+
+                yield tuple(skip_unchanged(delivered, {
+                    'command': cmd,
+                    'progress': prog,
+                    'status': stat,
+                    'stats': stats,
+                    'images': imgs,
+                    'queue': queue_display
+                }).values())
+
+                if not has_jobs:
+                    return
+
+                # Let bursts of progress lines coalesce into one update
+                await asyncio.sleep(STATUS_MIN_INTERVAL)
+                version = await queue_manager.wait_for_update_async(
+                    version, timeout=STATUS_KEEPALIVE
+                )
+        finally:
+            if _session_watchers.get(key) is token:
+                del _session_watchers[key]
+
+    status_outputs = [
+        outputs_map['command'],
+        outputs_map['progress_slider'],
+        outputs_map['progress_textbox'],
+        outputs_map['stats'],
+        outputs_map['img_final'],
+        outputs_map['queue_tracker']
+    ]
+    _status_watchers.append((watch_status, status_outputs))
 
     outputs_map['gen_btn'].click(
         fn=submit_job,
@@ -115,24 +184,36 @@ def bind_generation_pipeline(
             outputs_map['progress_textbox'],
         ]
     ).then(
-        fn=lambda: gr.update(active=True),
+        fn=watch_status,
         inputs=[],
-        outputs=[outputs_map['timer']]
+        outputs=status_outputs,
+        show_progress="hidden",
+        concurrency_limit=None
     )
 
-    outputs_map['timer'].tick(
-        poll_status,
-        inputs=[],
-        outputs=[
-            outputs_map['command'],
-            outputs_map['progress_slider'],
-            outputs_map['progress_textbox'],
-            outputs_map['stats'],
-            outputs_map['img_final'],
-            outputs_map['timer'],
-            outputs_map['queue_tracker']
-        ]
-    )
+    if 'kill_btn' in outputs_map:
+        outputs_map['kill_btn'].click(
+            fn=lambda: queue_manager.kill_job(owner=tab_id),
+            inputs=[],
+            outputs=[]
+        )
+
+
+def bind_status_reattach(blocks: gr.Blocks):
+    """
+    Starts every tab's status watcher when a page loads, so a reloaded
+    page picks up the jobs that are still running and their results.
+    Must be bound on the Blocks that's launched, nested Blocks don't
+    get load events.
+    """
+    for watch_status, outputs in _status_watchers:
+        blocks.load(
+            fn=watch_status,
+            inputs=[],
+            outputs=outputs,
+            show_progress="hidden",
+            concurrency_limit=None
+        )
 
 
 def apply_lora(
@@ -7,45 +7,25 @@ import json
 import argparse
 import warnings
 
+from modules.utils.startup_profiler import profiler
+
+# Started before anything else is imported, to time the imports too
+if '--profile-startup' in sys.argv:
+    profiler.start()
+
 import gradio as gr
 
-from modules.interfaces.cli.txt2img_tab import (
-    txt2img_block, txt2img_params
-)
-from modules.interfaces.server.txt2img_tab import (
-    txt2img_server_block, txt2img_server_params
-)
-from modules.interfaces.cli.img2img_tab import (
-    img2img_block, img2img_params, img_inp_img2img
-)
-from modules.interfaces.server.img2img_tab import (
-    img2img_server_block, img2img_server_params,
-    img_inp_img2img_server
-)
-from modules.interfaces.cli.imgedit_tab import (
-    imgedit_block, width_imgedit, height_imgedit,
-    ref_img_imgedit
-)
-from modules.interfaces.server.imgedit_tab import (
-    imgedit_server_block, width_imgedit_server,
-    height_imgedit_server, ref_img_imgedit_server
-)
-from modules.interfaces.cli.any2video_tab import (
-    any2video_block, any2video_params
-)
-from modules.interfaces.cli.upscale_tab import (
-    upscale_block, img_inp_upscale
-)
 from modules.interfaces.common.gallery_tab import (
     gallery_block, cpy_2_txt2img_btn, cpy_2_img2img_btn, cpy_2_imgedit_btn,
     cpy_2_any2video_btn, cpy_2_upscale_btn, info_params, path_info,
     gallery, gallery_manager, def_page, txt2img_ctrl, page_num_select
 )
-from modules.interfaces.cli.convert_tab import convert_block
 from modules.interfaces.common.options_tab import (
     options_block, restart_btn
 )
 from modules.config import ConfigManager
+import modules.utils.queue as queue_manager
+from modules.utils.ui_events import bind_status_reattach
 from modules.ui.constants import FIELDS, SAMPLERS, SCHEDULERS
 
 
@@ -196,15 +176,84 @@ def build_launch_args(
     return launch_args
 
 
-def render_server_ui():
+def load_server_tabs() -> dict:
+    """
+    Imports the tabs of the server mode. Importing a tab module builds
+    it, so only the active mode's tabs are imported, and before the main
+    Blocks, which then only renders them.
+    """
+    from modules.interfaces.server.txt2img_tab import (
+        txt2img_server_block, txt2img_server_params
+    )
+    from modules.interfaces.server.img2img_tab import (
+        img2img_server_block, img2img_server_params,
+        img_inp_img2img_server
+    )
+    from modules.interfaces.server.imgedit_tab import (
+        imgedit_server_block, width_imgedit_server,
+        height_imgedit_server, ref_img_imgedit_server
+    )
+
+    return {
+        'txt2img_block': txt2img_server_block,
+        'img2img_block': img2img_server_block,
+        'imgedit_block': imgedit_server_block,
+        'txt2img_params': txt2img_server_params,
+        'img2img_params': img2img_server_params,
+        'img2img_input': img_inp_img2img_server,
+        'imgedit_width': width_imgedit_server,
+        'imgedit_height': height_imgedit_server,
+        'imgedit_ref': ref_img_imgedit_server
+    }
+
+
+def load_cli_tabs() -> dict:
+    """Imports the tabs of the CLI mode, see load_server_tabs()."""
+    from modules.interfaces.cli.txt2img_tab import (
+        txt2img_block, txt2img_params
+    )
+    from modules.interfaces.cli.img2img_tab import (
+        img2img_block, img2img_params, img_inp_img2img
+    )
+    from modules.interfaces.cli.imgedit_tab import (
+        imgedit_block, width_imgedit, height_imgedit,
+        ref_img_imgedit
+    )
+    from modules.interfaces.cli.any2video_tab import (
+        any2video_block, any2video_params
+    )
+    from modules.interfaces.cli.upscale_tab import (
+        upscale_block, img_inp_upscale
+    )
+    from modules.interfaces.cli.convert_tab import convert_block
+
+    return {
+        'txt2img_block': txt2img_block,
+        'img2img_block': img2img_block,
+        'imgedit_block': imgedit_block,
+        'any2video_block': any2video_block,
+        'upscale_block': upscale_block,
+        'convert_block': convert_block,
+        'txt2img_params': txt2img_params,
+        'img2img_params': img2img_params,
+        'img2img_input': img_inp_img2img,
+        'imgedit_width': width_imgedit,
+        'imgedit_height': height_imgedit,
+        'imgedit_ref': ref_img_imgedit,
+        'any2video_params': any2video_params,
+        'upscale_input': img_inp_upscale
+    }
+
+
+def render_server_ui(ui: dict):
     gr.Markdown("# <center>sd.cpp-webui - server</center>")
     with gr.Tabs() as tabs:
         with gr.TabItem("txt2img", id="txt2img"):
-            txt2img_server_block.render()
+            ui['txt2img_block'].render()
         with gr.TabItem("img2img", id="img2img"):
-            img2img_server_block.render()
+            ui['img2img_block'].render()
         with gr.TabItem("imgedit", id="imgedit"):
-            imgedit_server_block.render()
+            ui['imgedit_block'].render()
         with gr.TabItem("Gallery", id="gallery") as gallery_tab:
             cpy_2_any2video_btn.visible = False
             cpy_2_upscale_btn.visible = False
@@ -215,23 +264,23 @@ def render_server_ui():
     return tabs, gallery_tab
 
 
-def render_cli_ui():
+def render_cli_ui(ui: dict):
     gr.Markdown("# <center>sd.cpp-webui - cli</center>")
     with gr.Tabs() as tabs:
         with gr.TabItem("txt2img", id="txt2img"):
-            txt2img_block.render()
+            ui['txt2img_block'].render()
         with gr.TabItem("img2img", id="img2img"):
-            img2img_block.render()
+            ui['img2img_block'].render()
         with gr.TabItem("imgedit", id="imgedit"):
-            imgedit_block.render()
+            ui['imgedit_block'].render()
         with gr.TabItem("any2video", id="any2video"):
-            any2video_block.render()
+            ui['any2video_block'].render()
         with gr.TabItem("Gallery", id="gallery") as gallery_tab:
             gallery_block.render()
         with gr.TabItem("Upscaler", id="upscale"):
-            upscale_block.render()
+            ui['upscale_block'].render()
         with gr.TabItem("Checkpoint Converter", id="convert"):
-            convert_block.render()
+            ui['convert_block'].render()
         with gr.TabItem("Options", id="options"):
             options_block.render()
 
@@ -249,7 +298,7 @@ def restart_server():
     os.execv(python, [python] + new_args)
 
 
-def bind_ui_events(server: bool, tabs, gallery_tab, gallery_loaded_state):
+def bind_ui_events(tabs, gallery_tab, gallery_loaded_state, ui: dict):
     common_inputs = [info_params[f] for f in FIELDS]
 
     gallery_tab.select(
@@ -260,12 +309,12 @@ def bind_ui_events(server: bool, tabs, gallery_tab, gallery_loaded_state):
         ]
     )
 
-    t2i_params = txt2img_server_params if server else txt2img_params
-    i2i_params = img2img_server_params if server else img2img_params
-    i2i_inp = img_inp_img2img_server if server else img_inp_img2img
-    ie_width = width_imgedit_server if server else width_imgedit
-    ie_height = height_imgedit_server if server else height_imgedit
-    ie_ref = ref_img_imgedit_server if server else ref_img_imgedit
+    t2i_params = ui['txt2img_params']
+    i2i_params = ui['img2img_params']
+    i2i_inp = ui['img2img_input']
+    ie_width = ui['imgedit_width']
+    ie_height = ui['imgedit_height']
+    ie_ref = ui['imgedit_ref']
 
     # Copy data from gallery image to txt2img.
     cpy_2_txt2img_btn.click(
@@ -285,17 +334,19 @@ def bind_ui_events(server: bool, tabs, gallery_tab, gallery_loaded_state):
         inputs=[info_params['width'], info_params['height'], path_info],
         outputs=[tabs, ie_width, ie_height, ie_ref]
     )
-    if not server:
+    if 'any2video_params' in ui:
         # Copy data from gallery image to any2video.
+        any2video_params = ui['any2video_params']
         cpy_2_any2video_btn.click(
             create_copy_fn("any2video", FIELDS),
             inputs=common_inputs + [path_info],
             outputs=[tabs] + [any2video_params[f] for f in FIELDS]
         )
+    if 'upscale_input' in ui:
         cpy_2_upscale_btn.click(
             create_copy_fn("upscale"),
             inputs=[path_info],
-            outputs=[tabs, img_inp_upscale]
+            outputs=[tabs, ui['upscale_input']]
         )
 
     restart_btn.click(
@@ -305,10 +356,33 @@ def bind_ui_events(server: bool, tabs, gallery_tab, gallery_loaded_state):
     )
 
 
+def build_ui(server: bool = False) -> gr.Blocks:
+    """Builds the interface of the given mode without launching it."""
+    with profiler.phase("load tabs"):
+        ui = load_server_tabs() if server else load_cli_tabs()
+
+    with profiler.phase("build Blocks"), gr.Blocks(
+        title="sd.cpp-webui"
+    ) as sdcpp:
+
+        gallery_loaded_state = gr.State(value=False)
+
+        if server:
+            tabs, gallery_tab = render_server_ui(ui)
+        else:
+            tabs, gallery_tab = render_cli_ui(ui)
+
+        bind_ui_events(tabs, gallery_tab, gallery_loaded_state, ui)
+        bind_status_reattach(sdcpp)
+
+    return sdcpp
+
+
 def sdcpp_launch(
     server: bool = False, listen: bool = False,
     autostart: bool = False, darkmode: bool = False,
-    credentials: bool = False, insecure_dir: bool = False
+    credentials: bool = False, insecure_dir: bool = False,
+    profile_startup: bool = False
 ):
     """Logic for launching sdcpp based on arguments"""
     launch_args = build_launch_args(listen, autostart, credentials)
@@ -319,18 +393,17 @@ def sdcpp_launch(
             config.data, os.path.abspath(os.getcwd())
         )
 
-    with gr.Blocks(
-        title="sd.cpp-webui"
-    ) as sdcpp:
-
-        gallery_loaded_state = gr.State(value=False)
+    sdcpp = build_ui(server)
 
-        if server:
-            tabs, gallery_tab = render_server_ui()
-        else:
-            tabs, gallery_tab = render_cli_ui()
+    # Every tab has registered its job function by now
+    with profiler.phase("restore queued jobs"):
+        queue_manager.restore_jobs()
 
-        bind_ui_events(server, tabs, gallery_tab, gallery_loaded_state)
+    if profile_startup:
+        profiler.stop()
+        profiler.print_summary()
+        report_path = profiler.write_report()
+        print(f"Startup profile saved to {report_path}\n")
 
     # Pass the arguments to sdcpp.launch with argument unpacking
     sdcpp.launch(
@@ -381,11 +454,16 @@ def main():
         action='store_true',
         help='Allows the usage of external or linked directories based on config.json'
     )
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help='Time the startup phases and imports, and save a report'
+    )
     args = parser.parse_args()
 
     sdcpp_launch(
         args.server, args.listen, args.autostart, args.darkmode,
-        args.credentials, args.allow_insecure_dir
+        args.credentials, args.allow_insecure_dir, args.profile_startup
     )
 
 
@@ -26,11 +26,15 @@ def app_root(tmp_path_factory):
     # Export environment variables for the application to use
     os.environ['SD_WEBUI_CONFIG_PATH'] = str(config_path)
     os.environ['SD_WEBUI_PROMPTS_PATH'] = str(prompts_path)
+    os.environ['SD_WEBUI_OUTPUT_INDEX_PATH'] = str(tmp_path / "output_index.json")
+    os.environ['SD_WEBUI_MODEL_CATALOG_PATH'] = str(tmp_path / "model_catalog.json")
 
     yield tmp_path
 
     del os.environ['SD_WEBUI_CONFIG_PATH']
     del os.environ['SD_WEBUI_PROMPTS_PATH']
+    del os.environ['SD_WEBUI_OUTPUT_INDEX_PATH']
+    del os.environ['SD_WEBUI_MODEL_CATALOG_PATH']
 
 
 @pytest.fixture(autouse=True)
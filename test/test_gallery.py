@@ -13,3 +13,32 @@ def test_get_next_media_seq_conflict(app_root):
 
     filename = get_next_media(subctrl=1)
     assert "2.png" == filename
+
+
+def test_get_next_media_skips_suffixed_names(app_root):
+    from modules.gallery import get_next_media
+
+    number = int(get_next_media(subctrl=1).split(".")[0])
+    # Saved behind the index's back, under the name it would hand out
+    (app_root / "img2img" / f"{number + 1}_20_steps.png").touch()
+
+    assert get_next_media(subctrl=1, name_suffix="20_steps") == (
+        f"{number + 2}.png"
+    )
+
+
+def test_get_next_media_fresh_index_does_not_list(app_root, monkeypatch):
+    import os
+    from modules.gallery import get_next_media
+
+    number = int(get_next_media(subctrl=1).split(".")[0])
+
+    def no_listing(*args, **kwargs):
+        raise AssertionError("the output folder was listed")
+
+    monkeypatch.setattr(os, "listdir", no_listing)
+    monkeypatch.setattr(os, "scandir", no_listing)
+
+    assert get_next_media(subctrl=1, name_suffix="20_steps") == (
+        f"{number + 1}.png"
+    )
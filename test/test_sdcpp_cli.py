@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+
+import pytest
+
+import modules.utils.queue as queue_manager
+
+
+SD_LOG = os.path.join(
+    os.path.dirname(__file__), "utils", "sdcpp_txt2img_log.txt"
+)
+# Replays a recorded sd.cpp log, then waits to be killed if asked to
+SD_SCRIPT = r"""
+import sys, time
+with open(sys.argv[1], "rb") as log:
+    sys.stdout.buffer.write(log.read())
+sys.stdout.flush()
+if "--hang" in sys.argv:
+    time.sleep(30)
+"""
+
+
+@pytest.fixture
+def cli_queue(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(queue_manager, "_workers", [])
+    monkeypatch.setattr(queue_manager, "_pending_jobs", [])
+    monkeypatch.setattr(queue_manager, "_journal", None)
+    monkeypatch.setattr(queue_manager, "_job_funcs", {})
+    monkeypatch.setattr(queue_manager, "_finished", {})
+
+    from modules.core.cli import sdcpp_cli
+
+    def build_command(self, extra=()):
+        self.command = [sys.executable, "-c", SD_SCRIPT, SD_LOG, *extra]
+
+    monkeypatch.setattr(sdcpp_cli.Txt2ImgRunner, "build_command", build_command)
+    queue_manager.start_workers()
+    return sdcpp_cli
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Condition not met in time")
+        time.sleep(0.01)
+
+
+def test_txt2img_runs_on_the_worker_event_loop(cli_queue):
+    seen = []
+    store_result = queue_manager.Worker._store_result
+
+    def record(worker, result):
+        seen.append(result)
+        store_result(worker, result)
+
+    queue_manager._workers[0]._store_result = (
+        lambda result: record(queue_manager._workers[0], result)
+    )
+    queue_manager.add_job(cli_queue.txt2img, {}, owner="txt2img")
+
+    wait_for(lambda: queue_manager.consume_finished(owner="txt2img"))
+    assert seen[0][2]["value"] == "Initializing..."
+    assert any(result[1]["value"] == 100 for result in seen[1:-1])
+    assert seen[-1][3]["value"].startswith("Tensor Load:")
+    assert queue_manager._workers[0].subprocess_manager.process is None
+
+
+def test_cancel_kills_the_cli_process(cli_queue, monkeypatch):
+    build_command = cli_queue.Txt2ImgRunner.build_command
+    monkeypatch.setattr(
+        cli_queue.Txt2ImgRunner, "build_command",
+        lambda self: build_command(self, ["--hang"])
+    )
+    worker = queue_manager._workers[0]
+    job_id = queue_manager.add_job(cli_queue.txt2img, {}, owner="txt2img")
+    wait_for(lambda: worker.subprocess_manager.process is not None)
+    process = worker.subprocess_manager.process
+
+    start = time.monotonic()
+    assert queue_manager.cancel(job_id)
+    wait_for(lambda: not queue_manager.get_status()["is_running"])
+
+    assert time.monotonic() - start < 10
+    assert process.returncode is not None
@@ -0,0 +1,205 @@
+import io
+import json
+import time
+import base64
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+
+def png_b64(color: str) -> str:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+@pytest.fixture
+def server():
+    requests = []
+    # The images every response returns, tests can add more
+    images = [png_b64("red")]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            requests.append(json.loads(self.rfile.read(length)))
+            body = json.dumps({"images": images}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1], requests, images
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_batch_images_are_streamed_one_by_one(server, tmp_path):
+    from modules.core.server.sdcpp_server import Txt2ImgApiRunner
+
+    port, requests, _ = server
+    runner = Txt2ImgApiRunner({
+        'in_ip': "127.0.0.1", 'in_port': port,
+        'in_pprompt': "a cat", 'in_batch_count': 3, 'in_seed': 42
+    })
+    runner.url = "/sdapi/v1/txt2img"
+    runner.output_path = str(tmp_path / "cat.png")
+
+    async def collect():
+        return [update async for update in runner.run_async()]
+
+    galleries = [
+        update[4] for update in asyncio.run(collect())
+        if isinstance(update[4], list)
+    ]
+
+    assert [r["batch_size"] for r in requests] == [1, 1, 1]
+    assert [r["seed"] for r in requests] == [42, 43, 44]
+    assert [len(images) for images in galleries[:3]] == [1, 2, 3]
+    assert galleries[-1] == [
+        str(tmp_path / "cat.png"),
+        str(tmp_path / "cat_2.png"),
+        str(tmp_path / "cat_3.png"),
+    ]
+
+
+def test_saves_run_alongside_the_next_request(server, tmp_path):
+    from modules.core.server.sdcpp_server import Txt2ImgApiRunner
+
+    port, requests, _ = server
+    runner = Txt2ImgApiRunner({
+        'in_ip': "127.0.0.1", 'in_port': port,
+        'in_pprompt': "a cat", 'in_batch_count': 2, 'in_seed': 42
+    })
+    runner.url = "/sdapi/v1/txt2img"
+    runner.output_path = str(tmp_path / "cat.png")
+
+    save_image = runner._save_image
+    overlapped = []
+
+    def slow_save(index, b64_data, seed):
+        if index == 0:
+            # Holds the first save until the second request is sent
+            deadline = time.monotonic() + 5
+            while len(requests) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            overlapped.append(len(requests) == 2)
+        return save_image(index, b64_data, seed)
+
+    runner._save_image = slow_save
+
+    async def collect():
+        return [update async for update in runner.run_async()]
+
+    updates = asyncio.run(collect())
+
+    assert overlapped == [True]
+    assert updates[-1][4] == [
+        str(tmp_path / "cat.png"), str(tmp_path / "cat_2.png")
+    ]
+
+
+def test_split_batch_images_keep_their_own_seed(server, tmp_path):
+    from modules.core.server.sdcpp_server import Txt2ImgApiRunner
+    from modules.shared_instance import server_state
+
+    port, requests, _ = server
+    runner = Txt2ImgApiRunner({
+        'in_ip': "127.0.0.1", 'in_port': port,
+        'in_pprompt': "a cat", 'in_batch_count': 3, 'in_seed': 42
+    })
+    runner.url = "/sdapi/v1/txt2img"
+    runner.output_path = str(tmp_path / "cat.png")
+
+    save_image = runner._save_image
+
+    def late_save(index, b64_data, seed):
+        # Another server logs its seed before this save runs
+        server_state.seed = 999
+        return save_image(index, b64_data, seed)
+
+    runner._save_image = late_save
+
+    async def collect():
+        return [update async for update in runner.run_async()]
+
+    asyncio.run(collect())
+
+    seeds = []
+    for path in runner.outputs:
+        with Image.open(path) as image:
+            seeds.append(image.text["parameters"].split("Seed: ")[1])
+    assert [seed.split(",")[0] for seed in seeds] == ["42", "43", "44"]
+
+
+def test_input_files_are_sent_as_they_are(tmp_path):
+    from modules.core.server.sdcpp_server import encode_input_image
+
+    jpg = tmp_path / "input.jpg"
+    Image.new("RGB", (8, 8), "blue").save(jpg, format="JPEG")
+    bmp = tmp_path / "input.bmp"
+    Image.new("RGB", (8, 8), "blue").save(bmp, format="BMP")
+
+    assert encode_input_image(str(jpg)) == (jpg.read_bytes(), "image/jpeg")
+
+    data, mime_type = encode_input_image(str(bmp))
+    assert mime_type == "image/png" and data.startswith(b"\x89PNG")
+
+
+def test_response_images_are_saved_in_parallel(
+    server, tmp_path, monkeypatch
+):
+    from modules.core.server import sdcpp_server
+
+    monkeypatch.setattr(sdcpp_server, "_save_pool", ThreadPoolExecutor(4))
+    port, requests, images = server
+    images.extend(png_b64(color) for color in ("green", "blue", "white"))
+    runner = sdcpp_server.Txt2ImgApiRunner({
+        'in_ip': "127.0.0.1", 'in_port': port, 'in_pprompt': "a cat"
+    })
+    runner.url = "/sdapi/v1/txt2img"
+    runner.output_path = str(tmp_path / "cat.png")
+
+    save_image = runner._save_image
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def slow_save(index, b64_data, seed):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.2)
+        with lock:
+            active[0] -= 1
+        return save_image(index, b64_data, seed)
+
+    runner._save_image = slow_save
+
+    async def collect():
+        return [update async for update in runner.run_async()]
+
+    updates = asyncio.run(collect())
+
+    assert len(requests) == 1
+    assert peak[0] == 4
+    # The image list goes out once the whole response is saved
+    galleries = [u[4] for u in updates if isinstance(u[4], list) and u[4]]
+    assert all(len(gallery) == 4 for gallery in galleries)
+    assert updates[-1][4] == [
+        str(tmp_path / name)
+        for name in ("cat.png", "cat_2.png", "cat_3.png", "cat_4.png")
+    ]
+    with Image.open(runner.outputs[3]) as image:
+        assert image.text["parameters"].startswith("a cat")
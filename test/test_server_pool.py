@@ -0,0 +1,90 @@
+import socket
+
+from modules.core.server.pool import ServerPool
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_same_configuration_reuses_its_server():
+    pool = ServerPool(max_slots=2)
+    port = free_port()
+
+    slot, is_new = pool.acquire("flux", "127.0.0.1", port)
+    assert is_new and slot.port == port
+
+    again, is_new = pool.acquire("flux", "127.0.0.1", port)
+    assert again is slot and not is_new
+
+
+def test_new_configuration_gets_the_next_port():
+    pool = ServerPool(max_slots=2)
+    port = free_port()
+
+    first, _ = pool.acquire("flux", "127.0.0.1", port)
+    second, is_new = pool.acquire("sdxl", "127.0.0.1", port)
+
+    assert is_new
+    assert second.port > first.port
+    assert [s.key for s in pool.slots()] == ["sdxl", "flux"]
+
+
+def test_port_used_by_another_program_is_skipped():
+    pool = ServerPool()
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+
+        slot, _ = pool.acquire("flux", "127.0.0.1", port)
+
+    assert slot.port != port
+
+
+def test_full_pool_evicts_least_recently_used():
+    pool = ServerPool(max_slots=2)
+    port = free_port()
+    pool.acquire("flux", "127.0.0.1", port)
+    pool.acquire("sdxl", "127.0.0.1", port)
+
+    # flux was used last, so sdxl makes room
+    pool.route("flux")
+    pool.acquire("sd3", "127.0.0.1", port)
+
+    assert sorted(s.key for s in pool.slots()) == ["flux", "sd3"]
+
+
+def test_route_falls_back_to_latest_server():
+    pool = ServerPool(max_slots=2)
+    assert pool.route("flux") is None
+
+    port = free_port()
+    flux, _ = pool.acquire("flux", "127.0.0.1", port)
+    sdxl, _ = pool.acquire("sdxl", "127.0.0.1", port)
+
+    assert pool.route("flux") is flux
+    assert pool.route("unknown") is flux
+    assert pool.route("sdxl") is sdxl
+
+    pool.release(sdxl)
+    pool.stop_all()
+    assert not pool.running
+
+
+def test_route_prefers_the_requested_device():
+    pool = ServerPool(max_slots=2)
+    port = free_port()
+    gpu0, _ = pool.acquire("flux", "127.0.0.1", port)
+    gpu1, is_new = pool.acquire(
+        "flux", "127.0.0.1", port, {"CUDA_VISIBLE_DEVICES": "1"}
+    )
+    assert is_new and gpu1 is not gpu0
+
+    assert pool.route("flux", {"CUDA_VISIBLE_DEVICES": "1"}) is gpu1
+    assert pool.route("flux", {}) is gpu0
+    # Same models on a device with no server of its own
+    assert pool.route("flux", {"CUDA_VISIBLE_DEVICES": "2"}) is gpu0
+    pool.stop_all()
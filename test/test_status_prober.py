@@ -0,0 +1,79 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.utils.http_client import HttpClients
+from modules.core.server.status_prober import (
+    StatusProber, CHECKING, LOADING
+)
+
+
+@pytest.fixture
+def server():
+    paths = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            paths.append(self.path)
+            if self.path == "/v1/models":
+                status, body = 200, {"data": [{"id": "flux1-dev"}]}
+            else:
+                status, body = 404, {}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1], paths
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_endpoint_that_answered_is_asked_first(server):
+    port, paths = server
+    prober = StatusProber(HttpClients().get, lambda: [])
+
+    assert prober.probe("127.0.0.1", port) == "flux1-dev"
+    assert len(paths) == 3
+
+    paths.clear()
+    assert prober.probe("127.0.0.1", port) == "flux1-dev"
+    assert paths == ["/v1/models"]
+
+
+def test_background_polling_asks_each_server(server):
+    port, paths = server
+    addresses = []
+    prober = StatusProber(
+        HttpClients().get, lambda: list(addresses), interval=0.05
+    )
+
+    prober.start()
+    time.sleep(0.2)
+    assert prober.model_name() == CHECKING
+    assert not paths
+
+    # The first server is the one the pool used last
+    addresses.extend([("127.0.0.1", str(port)), ("127.0.0.1", "1")])
+    deadline = time.monotonic() + 5
+    while prober.model_name() == CHECKING and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert prober.model_name() == "flux1-dev"
+    while (
+        prober.model_name(("127.0.0.1", "1")) == CHECKING and
+        time.monotonic() < deadline
+    ):
+        time.sleep(0.02)
+    assert prober.model_name(("127.0.0.1", "1")) == LOADING
@@ -0,0 +1,88 @@
+import os
+import time
+
+import modules.utils.gallery_index as gallery_index
+from modules.utils.gallery_index import GalleryIndex
+
+
+def make_files(folder, names):
+    """Creates files with increasing ctimes, and a settled folder mtime."""
+    for name in names:
+        (folder / name).write_bytes(b"x")
+        time.sleep(0.01)
+    settle(folder)
+
+
+def settle(folder):
+    past = time.time() - 60
+    os.utime(folder, (past, past))
+
+
+def count_scans(monkeypatch):
+    calls = []
+    real_scandir = os.scandir
+
+    def scandir(path):
+        calls.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(gallery_index.os, "scandir", scandir)
+    return calls
+
+
+def test_sorted_files_are_cached_until_folder_changes(tmp_path, monkeypatch):
+    make_files(tmp_path, ["b.png", "a.jpg", "c.txt", "C.webp"])
+    scans = count_scans(monkeypatch)
+    index = GalleryIndex()
+
+    by_name = index.sorted_files(str(tmp_path), "Name (A-Z)")
+    assert [os.path.basename(p) for p in by_name] == ["a.jpg", "b.png", "C.webp"]
+    by_date = index.sorted_files(str(tmp_path), "Date (Oldest First)")
+    assert [os.path.basename(p) for p in by_date] == ["b.png", "a.jpg", "C.webp"]
+    index.sorted_files(str(tmp_path), "Date (Newest First)")
+    assert len(scans) == 1
+
+    make_files(tmp_path, ["d.png"])
+    newest = index.sorted_files(str(tmp_path), "Date (Newest First)")
+    assert os.path.basename(newest[0]) == "d.png"
+    assert len(scans) == 2
+
+
+def test_recent_folder_changes_are_rechecked(tmp_path, monkeypatch):
+    (tmp_path / "1.png").write_bytes(b"x")
+    scans = count_scans(monkeypatch)
+    index = GalleryIndex()
+
+    index.sorted_files(str(tmp_path), "Name (A-Z)")
+    index.sorted_files(str(tmp_path), "Name (A-Z)")
+    assert len(scans) == 2
+
+
+def test_get_info_is_cached_per_file_version(tmp_path):
+    make_files(tmp_path, ["1.png"])
+    path = str(tmp_path / "1.png")
+    index = GalleryIndex()
+    index.sorted_files(str(tmp_path), "Name (A-Z)")
+    reads = []
+
+    def reader(p):
+        reads.append(p)
+        return {"raw_text": f"read {len(reads)}"}
+
+    assert index.get_info(path, reader) == {"raw_text": "read 1"}
+    assert index.get_info(path, reader) == {"raw_text": "read 1"}
+
+    (tmp_path / "1.png").write_bytes(b"changed")
+    assert index.get_info(path, reader) == {"raw_text": "read 2"}
+
+
+def test_remove_drops_file(tmp_path):
+    make_files(tmp_path, ["1.png", "2.png"])
+    index = GalleryIndex()
+    assert len(index.sorted_files(str(tmp_path), "Name (A-Z)")) == 2
+
+    os.remove(tmp_path / "1.png")
+    index.remove(str(tmp_path / "1.png"))
+    assert index.sorted_files(str(tmp_path), "Name (A-Z)") == [
+        str(tmp_path / "2.png")
+    ]
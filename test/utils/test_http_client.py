@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.utils.http_client import HttpClients
+
+
+@pytest.fixture
+def server():
+    connections = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            connections.add(self.client_address)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1], connections
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_client_is_shared_and_keeps_connections_alive(server):
+    port, connections = server
+    clients = HttpClients()
+
+    client = clients.get("127.0.0.1", port)
+    assert clients.get("127.0.0.1", float(port)) is client
+    assert str(client.base_url) == f"http://127.0.0.1:{port}"
+
+    for _ in range(5):
+        assert client.get("/sdapi/v1/loras").text == "ok"
+    assert len(connections) == 1
+
+    clients.close()
+    assert client.is_closed
+    assert clients.get("127.0.0.1", port) is not client
+
+
+def test_async_client_per_loop(server):
+    port, _ = server
+    clients = HttpClients()
+
+    async def fetch():
+        client = clients.get_async("127.0.0.1", port)
+        assert clients.get_async("127.0.0.1", port) is client
+        response = await client.get("/v1/models")
+        await client.aclose()
+        return client, response.text
+
+    first, text = asyncio.run(fetch())
+    second, _ = asyncio.run(fetch())
+    assert text == "ok"
+    assert first is not second
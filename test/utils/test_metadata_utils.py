@@ -0,0 +1,163 @@
+import sys
+import zlib
+import random
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image, PngImagePlugin
+
+
+@pytest.fixture
+def metadata_utils(monkeypatch):
+    """Imports metadata_utils without building the shared instances."""
+    monkeypatch.setitem(
+        sys.modules, "modules.shared_instance",
+        SimpleNamespace(server_state=SimpleNamespace(seed=42))
+    )
+    return importlib.import_module("modules.utils.metadata_utils")
+
+
+def save_png(path, pnginfo, size=(64, 64)):
+    Image.new("RGB", size, "green").save(path, pnginfo=pnginfo)
+    return str(path)
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + data).to_bytes(4, "big")
+    return len(data).to_bytes(4, "big") + chunk_type + data + crc
+
+
+def test_reads_every_text_chunk_type(metadata_utils, tmp_path):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", "a cat\nSteps: 20, Seed: 42")
+    info.add_text("prompt", '{"3": {"inputs": {"seed": 1}}}', zip=True)
+    info.add_itxt("workflow", "{\"nodes\": []}", zip=True)
+    info.add_itxt("comment", "zürich ☃", lang="de", tkey="Kommentar")
+    path = save_png(tmp_path / "all.png", info)
+
+    chunks = metadata_utils.read_png_text_chunks(path)
+
+    assert chunks == {
+        "parameters": ("tEXt", "a cat\nSteps: 20, Seed: 42"),
+        "prompt": ("zTXt", '{"3": {"inputs": {"seed": 1}}}'),
+        "workflow": ("iTXt", "{\"nodes\": []}"),
+        "comment": ("iTXt", "zürich ☃"),
+    }
+    assert metadata_utils.parse_png_metadata(path) == (
+        "PNG: tEXt\nparameters: a cat\nSteps: 20, Seed: 42"
+    )
+
+
+def test_compressed_parameters_are_parsed(metadata_utils, tmp_path):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", "a dog\nSteps: 30, Seed: 7", zip=True)
+    path = save_png(tmp_path / "z.png", info)
+
+    raw_text = metadata_utils.parse_png_metadata(path)
+    params = metadata_utils.extract_params_from_text(raw_text)
+
+    assert raw_text.startswith("PNG: zTXt\nparameters: a dog")
+    assert params["steps"] == 30 and params["seed"] == 7
+
+
+def test_chunks_larger_than_the_read_buffer(metadata_utils, tmp_path):
+    rng = random.Random(0)
+    noise = bytes(rng.getrandbits(8) for _ in range(200_000))
+    workflow = "x" * 150_000
+    info = PngImagePlugin.PngInfo()
+    info.add(b"tIME", noise)
+    info.add_text("workflow", workflow)
+    info.add_text("parameters", "big")
+    path = save_png(tmp_path / "big.png", info)
+
+    chunks = metadata_utils.read_png_text_chunks(path)
+
+    assert chunks["workflow"] == ("tEXt", workflow)
+    assert chunks["parameters"] == ("tEXt", "big")
+
+
+def test_stops_at_first_idat(metadata_utils, tmp_path):
+    path = tmp_path / "late.png"
+    save_png(path, None)
+    data = path.read_bytes()
+    iend = data.rindex(b"IEND") - 4
+    path.write_bytes(
+        data[:iend] + png_chunk(b"tEXt", b"late\x00after pixels") + data[iend:]
+    )
+
+    assert metadata_utils.read_png_text_chunks(str(path)) == {}
+    assert metadata_utils.parse_png_metadata(str(path)) is None
+
+
+def test_truncated_and_invalid_files(metadata_utils, tmp_path):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", "p" * 1000)
+    path = tmp_path / "cut.png"
+    save_png(path, info)
+    path.write_bytes(path.read_bytes()[:500])
+
+    assert metadata_utils.read_png_text_chunks(str(path)) == {}
+
+    not_png = tmp_path / "fake.png"
+    not_png.write_bytes(b"GIF89a")
+    assert metadata_utils.parse_png_metadata(str(not_png)) is None
+
+
+def test_extract_media_metadata(metadata_utils, tmp_path):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", "a fox\nSteps: 12, CFG scale: 3.5, Seed: 9")
+    png = save_png(tmp_path / "1.png", info, size=(640, 480))
+    jpg = tmp_path / "2.jpg"
+    Image.new("RGB", (320, 200)).save(jpg)
+
+    png_info = metadata_utils.extract_media_metadata(png)
+    assert (png_info["width"], png_info["height"]) == (640, 480)
+    assert png_info["params"]["pprompt"] == "a fox"
+    assert png_info["params"]["steps"] == 12
+
+    jpg_info = metadata_utils.extract_media_metadata(str(jpg))
+    assert (jpg_info["width"], jpg_info["height"]) == (320, 200)
+
+
+def test_extract_metadata_batch_keeps_order(metadata_utils, tmp_path):
+    paths = []
+    for i in range(50):
+        info = PngImagePlugin.PngInfo()
+        info.add_text("parameters", f"image {i}\nSteps: {i + 1}")
+        paths.append(save_png(tmp_path / f"{i}.png", info, size=(8, 8 + i)))
+    paths.append(str(tmp_path / "missing.png"))
+
+    results = list(
+        metadata_utils.extract_metadata_batch(iter(paths), max_workers=3)
+    )
+
+    assert [r["params"].get("steps") for r in results] == (
+        list(range(1, 51)) + [None]
+    )
+    assert [r["height"] for r in results[:50]] == [8 + i for i in range(50)]
+    assert results[-1]["raw_text"] is None
+
+
+def test_metadata_added_to_png_bytes_without_decoding(metadata_utils, tmp_path):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", "old prompt")
+    info.add_text("Software", "sd.cpp")
+    source = save_png(tmp_path / "server.png", info)
+    with open(source, "rb") as file:
+        png_bytes = file.read()
+
+    target = str(tmp_path / "out.png")
+    metadata_utils.save_png_bytes_with_metadata(
+        png_bytes, target, "a 猫\nSteps: 20"
+    )
+
+    chunks = metadata_utils.read_png_text_chunks(target)
+    assert chunks["parameters"] == ("iTXt", "a 猫\nSteps: 20")
+    assert chunks["Software"] == ("tEXt", "sd.cpp")
+    with Image.open(target) as image, Image.open(source) as original:
+        image.load()
+        assert image.tobytes() == original.tobytes()
+
+    with pytest.raises(ValueError):
+        metadata_utils.save_png_bytes_with_metadata(b"GIF89a", target, "")
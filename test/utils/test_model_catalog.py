@@ -0,0 +1,137 @@
+import json
+import os
+import struct
+
+import modules.utils.model_catalog as model_catalog
+from modules.utils.model_catalog import (
+    ModelCatalog, describe_model, read_gguf_header, read_safetensors_header
+)
+
+
+def gguf_string(text):
+    data = text.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+
+def write_gguf(path, tensors, metadata=None):
+    """Writes a GGUF header, tensors given as name: (ggml type, dims)."""
+    metadata = metadata or {}
+    out = b"GGUF" + struct.pack("<IQQ", 3, len(tensors), len(metadata) + 1)
+    for key, value in metadata.items():
+        out += gguf_string(key) + struct.pack("<I", 8) + gguf_string(value)
+    # A string array, like a tokenizer vocabulary
+    out += gguf_string("tokenizer.tokens") + struct.pack("<IIQ", 9, 8, 2)
+    out += gguf_string("a") + gguf_string("b")
+    for name, (ggml_type, dims) in tensors.items():
+        out += gguf_string(name) + struct.pack("<I", len(dims))
+        out += struct.pack(f"<{len(dims)}Q", *dims)
+        out += struct.pack("<IQ", ggml_type, 0)
+    path.write_bytes(out + b"\0" * 32)
+    return str(path)
+
+
+def write_safetensors(path, tensors):
+    header = {"__metadata__": {"format": "pt"}}
+    for name, (dtype, shape) in tensors.items():
+        header[name] = {"dtype": dtype, "shape": shape, "data_offsets": [0, 0]}
+    data = json.dumps(header).encode("utf-8")
+    path.write_bytes(struct.pack("<Q", len(data)) + data)
+    return str(path)
+
+
+def test_read_gguf_header(tmp_path):
+    path = write_gguf(tmp_path / "flux.gguf", {
+        "model.diffusion_model.double_blocks.0.img_attn.qkv.weight": (8, [64, 192]),
+        "model.diffusion_model.double_blocks.0.img_attn.norm.scale": (0, [64]),
+    })
+
+    info = read_gguf_header(path)
+
+    assert info["format"] == "gguf"
+    assert info["architecture"] == "flux"
+    assert info["quant"] == "q8_0"
+    assert info["params"] == 64 * 192 + 64
+    assert info["tensors"] == 2
+
+
+def test_gguf_architecture_from_metadata(tmp_path):
+    path = write_gguf(
+        tmp_path / "llm.gguf", {"blk.0.attn_q.weight": (12, [8, 8])},
+        {"general.architecture": "qwen3"}
+    )
+    info = read_gguf_header(path)
+    assert info["architecture"] == "qwen3"
+    assert info["quant"] == "q4_K"
+
+
+def test_read_safetensors_header(tmp_path):
+    path = write_safetensors(tmp_path / "sdxl.safetensors", {
+        "conditioner.embedders.1.model.ln_final.weight": ("F16", [1280]),
+        "model.diffusion_model.input_blocks.0.0.weight": ("F16", [320, 4, 3, 3]),
+        "first_stage_model.decoder.conv_in.bias": ("F32", [512]),
+    })
+
+    info = read_safetensors_header(path)
+
+    assert info["format"] == "safetensors"
+    assert info["architecture"] == "sdxl"
+    assert info["quant"] == "f16"
+    assert info["params"] == 1280 + 320 * 4 * 9 + 512
+
+
+def test_catalog_caches_until_file_changes(tmp_path, monkeypatch):
+    path = write_safetensors(
+        tmp_path / "vae.safetensors", {"decoder.conv_in.weight": ("F32", [8])}
+    )
+    catalog_path = str(tmp_path / "catalog.json")
+    monkeypatch.delenv("SD_WEBUI_MODEL_CATALOG_PATH", raising=False)
+    reads = []
+    real_read = model_catalog.read_model_header
+
+    def read_model_header(p):
+        reads.append(p)
+        return real_read(p)
+
+    monkeypatch.setattr(model_catalog, "read_model_header", read_model_header)
+
+    info = ModelCatalog(catalog_path).get(path)
+    assert info["architecture"] == "vae"
+    assert info["size"] == os.path.getsize(path)
+
+    # A new catalog picks the entry up from disk
+    catalog = ModelCatalog(catalog_path)
+    assert catalog.get(path)["params"] == 8
+    assert len(reads) == 1
+
+    write_safetensors(
+        tmp_path / "vae.safetensors", {"decoder.conv_in.weight": ("F32", [16])}
+    )
+    os.utime(path, ns=(0, 10**9))
+    assert catalog.get(path)["params"] == 16
+    assert len(reads) == 2
+
+    assert catalog.get(str(tmp_path / "missing.gguf")) is None
+
+
+def test_catalog_hash_and_broken_files(tmp_path, monkeypatch):
+    monkeypatch.delenv("SD_WEBUI_MODEL_CATALOG_PATH", raising=False)
+    broken = tmp_path / "broken.gguf"
+    broken.write_bytes(b"GGUF\x03")
+    catalog = ModelCatalog(str(tmp_path / "catalog.json"))
+
+    info = catalog.get(str(broken))
+    assert info["format"] == "gguf"
+    assert info["architecture"] is None
+    assert info["hash"] is None
+
+    digest = catalog.get_hash(str(broken))
+    assert len(digest) == 64
+    assert catalog.get(str(broken))["hash"] == digest
+
+
+def test_describe_model():
+    text = describe_model({
+        "format": "gguf", "architecture": "flux", "quant": "q8_0",
+        "params": 11_900_000_000, "size": 12 * 1024 ** 3
+    })
+    assert text == "GGUF · flux · q8_0 · 11.9B params · 12.0 GB"
@@ -0,0 +1,80 @@
+import os
+import time
+
+import modules.utils.model_listing as model_listing
+from modules.utils.model_listing import ModelListCache
+
+EXTENSIONS = (".gguf", ".safetensors")
+
+
+def settle(*folders):
+    past = time.time() - 60
+    for folder in folders:
+        os.utime(folder, (past, past))
+
+
+def count_walks(monkeypatch):
+    calls = []
+    real_walk = os.walk
+
+    def walk(path):
+        calls.append(path)
+        return real_walk(path)
+
+    monkeypatch.setattr(model_listing.os, "walk", walk)
+    return calls
+
+
+def test_listing_is_cached_until_a_folder_changes(tmp_path, monkeypatch):
+    sub = tmp_path / "sdxl"
+    sub.mkdir()
+    (tmp_path / "b.gguf").write_bytes(b"x")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+    (sub / "a.safetensors").write_bytes(b"x")
+    settle(sub, tmp_path)
+    monkeypatch.setattr(model_listing, "FRESH_SECONDS", 0)
+    walks = count_walks(monkeypatch)
+    cache = ModelListCache(EXTENSIONS)
+
+    assert cache.get(str(tmp_path)) == ["b.gguf", "sdxl/a.safetensors"]
+    assert cache.get(str(tmp_path)) == ["b.gguf", "sdxl/a.safetensors"]
+    assert len(walks) == 1
+
+    # A change in a subfolder is noticed too
+    (sub / "c.gguf").write_bytes(b"x")
+    settle(sub)
+    assert cache.get(str(tmp_path)) == [
+        "b.gguf", "sdxl/a.safetensors", "sdxl/c.gguf"
+    ]
+    assert len(walks) == 2
+
+    cache.invalidate(str(tmp_path))
+    cache.get(str(tmp_path))
+    assert len(walks) == 3
+
+
+def test_recent_listing_is_shared(tmp_path, monkeypatch):
+    (tmp_path / "a.gguf").write_bytes(b"x")
+    walks = count_walks(monkeypatch)
+    cache = ModelListCache(EXTENSIONS)
+
+    # The folder just changed, but calls in quick succession share a walk
+    for _ in range(4):
+        assert cache.get(str(tmp_path)) == ["a.gguf"]
+    assert len(walks) == 1
+
+
+def test_recently_changed_folder_is_walked_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_listing, "FRESH_SECONDS", 0)
+    walks = count_walks(monkeypatch)
+    cache = ModelListCache(EXTENSIONS)
+
+    cache.get(str(tmp_path))
+    (tmp_path / "a.gguf").write_bytes(b"x")
+    assert cache.get(str(tmp_path)) == ["a.gguf"]
+    assert len(walks) == 2
+
+
+def test_missing_folder(tmp_path):
+    cache = ModelListCache(EXTENSIONS)
+    assert cache.get(str(tmp_path / "missing")) is None
@@ -0,0 +1,92 @@
+import os
+import threading
+
+from modules.utils.output_index import OutputIndex
+
+
+def make_scan(calls: list, directory):
+    def scan():
+        calls.append(directory)
+        numbers = [int(os.path.splitext(f)[0]) for f in os.listdir(directory)]
+        return max(numbers) + 1 if numbers else 1
+    return scan
+
+
+def make_taken(directory):
+    return lambda number: (directory / f"{number}.png").exists()
+
+
+def test_only_scans_on_first_use(tmp_path):
+    outputs = tmp_path / "txt2img"
+    outputs.mkdir()
+    (outputs / "41.png").touch()
+    calls = []
+    index = OutputIndex(str(tmp_path / "index.json"))
+
+    numbers = [
+        index.reserve(
+            "txt2img_dir", [str(outputs)],
+            make_scan(calls, outputs), make_taken(outputs)
+        )
+        for _ in range(3)
+    ]
+
+    assert numbers == [42, 43, 44]
+    assert len(calls) == 1
+
+    # A restart picks up where the last run stopped without scanning
+    index = OutputIndex(str(tmp_path / "index.json"))
+    assert index.reserve(
+        "txt2img_dir", [str(outputs)],
+        make_scan(calls, outputs), make_taken(outputs)
+    ) == 45
+    assert len(calls) == 1
+
+
+def test_rescans_when_stale(tmp_path):
+    outputs = tmp_path / "txt2img"
+    outputs.mkdir()
+    other = tmp_path / "other"
+    other.mkdir()
+    calls = []
+    index = OutputIndex(str(tmp_path / "index.json"))
+
+    def reserve(directory):
+        return index.reserve(
+            "txt2img_dir", [str(directory)],
+            make_scan(calls, directory), make_taken(directory)
+        )
+
+    assert reserve(outputs) == 1
+
+    # Files copied in from elsewhere take the next number
+    (outputs / "2.png").touch()
+    (outputs / "7.png").touch()
+    assert reserve(outputs) == 8
+    assert len(calls) == 2
+
+    # A different output folder gets its own numbering
+    assert reserve(other) == 1
+    assert len(calls) == 3
+
+
+def test_concurrent_reservations_are_unique(tmp_path):
+    outputs = tmp_path / "txt2img"
+    outputs.mkdir()
+    index = OutputIndex(str(tmp_path / "index.json"))
+    numbers = []
+
+    def worker():
+        for _ in range(50):
+            numbers.append(index.reserve(
+                "txt2img_dir", [str(outputs)],
+                make_scan([], outputs), make_taken(outputs)
+            ))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(numbers) == list(range(1, 201))
@@ -0,0 +1,441 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+import modules.utils.queue as queue_manager
+from modules.utils.queue_journal import QueueJournal
+
+
+@pytest.fixture(autouse=True)
+def clean_queue(monkeypatch):
+    """Gives every test its own worker list and pending jobs."""
+    monkeypatch.setattr(queue_manager, "_workers", [])
+    monkeypatch.setattr(queue_manager, "_pending_jobs", [])
+    monkeypatch.setattr(queue_manager, "_journal", None)
+    monkeypatch.setattr(queue_manager, "_job_funcs", {})
+    monkeypatch.setattr(queue_manager, "_unresolved_events", [])
+    monkeypatch.setattr(queue_manager, "_finished", {})
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Condition not met in time")
+        time.sleep(0.01)
+
+
+def make_job(release: threading.Event, seen: list):
+    """A job function that records its params and waits to be released."""
+    def txt2img(params):
+        seen.append(params)
+        yield ("cmd", 0, "Running", "", None)
+        release.wait(5)
+        yield ("cmd", 100, "Done", "stats", ["out.png"])
+    return txt2img
+
+
+def test_default_worker_runs_jobs_in_order():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    queue_manager.add_job(job, {"n": 1}, owner="txt2img")
+    queue_manager.add_job(job, {"n": 2}, owner="txt2img")
+
+    wait_for(lambda: len(seen) == 1)
+    assert queue_manager.get_queue_size() == 1
+    assert queue_manager.get_status(owner="txt2img")["is_running"]
+
+    release.set()
+    wait_for(lambda: len(seen) == 2)
+    wait_for(lambda: not queue_manager.get_status(owner="txt2img")["is_running"])
+
+    assert [p["n"] for p in seen] == [1, 2]
+    assert queue_manager.get_status(owner="txt2img")["images"] == ["out.png"]
+    assert queue_manager.consume_finished(owner="txt2img")
+    assert not queue_manager.consume_finished(owner="txt2img")
+
+
+def test_jobs_go_to_first_free_compatible_worker():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers([
+        {"name": "cuda0", "env": {"CUDA_VISIBLE_DEVICES": "0"}},
+        {"name": "cuda1", "env": {"CUDA_VISIBLE_DEVICES": "1"},
+         "backend_table": [["primary", "cuda0"]]},
+    ])
+    queue_manager.add_job(job, {"n": 1}, owner="a")
+    queue_manager.add_job(job, {"n": 2}, owner="b")
+
+    wait_for(lambda: len(seen) == 2)
+    by_n = {p["n"]: p for p in seen}
+
+    assert by_n[1]["device_env"] == {"CUDA_VISIBLE_DEVICES": "0"}
+    assert "in_backend_table" not in by_n[1]
+    assert by_n[2]["device_env"] == {"CUDA_VISIBLE_DEVICES": "1"}
+    assert by_n[2]["in_backend_table"] == [["primary", "cuda0"]]
+
+    workers = queue_manager.get_worker_status()
+    assert [(w["worker"], w["owner"]) for w in workers] == [
+        ("cuda0", "a"), ("cuda1", "b")
+    ]
+    release.set()
+
+
+def test_incompatible_jobs_wait_for_their_worker():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers([
+        {"name": "gpu", "jobs": ["txt2img"]},
+        {"name": "cpu", "jobs": ["upscale"]},
+    ])
+    queue_manager.add_job(job, {"n": 1}, owner="a")
+    queue_manager.add_job(job, {"n": 2}, owner="b")
+
+    wait_for(lambda: len(seen) == 1)
+    time.sleep(0.05)
+    assert len(seen) == 1
+    assert queue_manager.get_queue_size() == 1
+    assert queue_manager.get_status(owner="a")["is_running"]
+    assert not queue_manager.get_status(owner="b")["is_running"]
+
+    release.set()
+    wait_for(lambda: len(seen) == 2)
+
+
+def test_interactive_lane_runs_before_batch_lane():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    queue_manager.add_job(job, {"n": "running"}, priority="batch")
+    wait_for(lambda: len(seen) == 1)
+
+    queue_manager.add_job(job, {"n": "batch"}, priority="batch")
+    queue_manager.add_job(job, {"n": "normal"})
+    queue_manager.add_job(job, {"n": "preview"}, priority="interactive")
+
+    assert [j["priority"] for j in queue_manager.list_jobs()] == [
+        "batch", "interactive", "normal", "batch"
+    ]
+
+    release.set()
+    wait_for(lambda: len(seen) == 4)
+    assert [p["n"] for p in seen] == ["running", "preview", "normal", "batch"]
+
+
+def test_cancel_and_bump_pending_jobs():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    running_id = queue_manager.add_job(job, {"n": 0})
+    wait_for(lambda: len(seen) == 1)
+
+    first_id = queue_manager.add_job(job, {"n": 1}, priority="batch")
+    second_id = queue_manager.add_job(job, {"n": 2}, priority="batch")
+    third_id = queue_manager.add_job(job, {"n": 3}, priority="batch")
+
+    assert queue_manager.cancel(second_id)
+    assert not queue_manager.cancel(second_id)
+    assert queue_manager.bump(third_id)
+    assert not queue_manager.bump(running_id)
+
+    jobs = queue_manager.list_jobs()
+    assert [(j["id"], j["status"]) for j in jobs] == [
+        (running_id, "running"), (third_id, "pending"), (first_id, "pending")
+    ]
+
+    release.set()
+    wait_for(lambda: len(seen) == 3)
+    assert [p["n"] for p in seen] == [0, 3, 1]
+
+
+def test_add_job_rejects_unknown_priority():
+    queue_manager.start_workers()
+    with pytest.raises(ValueError):
+        queue_manager.add_job(lambda params: iter(()), {}, priority="urgent")
+
+
+def test_journal_replays_unfinished_jobs(tmp_path):
+    journal = QueueJournal(str(tmp_path / "journal.jsonl"))
+    queue_manager.enable_journal(journal)
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    done_id = queue_manager.add_job(job, {"n": 0})
+    wait_for(lambda: len(seen) == 1)
+    release.set()
+    wait_for(lambda: not queue_manager.get_status()["is_running"])
+
+    release.clear()
+    running_id = queue_manager.add_job(job, {"n": 1}, owner="txt2img")
+    wait_for(lambda: len(seen) == 2)
+    pending_id = queue_manager.add_job(job, {"n": 2}, priority="batch")
+    cancelled_id = queue_manager.add_job(job, {"n": 3})
+    queue_manager.cancel(cancelled_id)
+
+    # The app "crashes" here with one job running and one pending
+    entries = {e["id"]: e for e in journal.replay()}
+    assert set(entries) == {running_id, pending_id}
+    assert entries[running_id]["interrupted"]
+    assert entries[running_id]["owner"] == "txt2img"
+    assert not entries[pending_id]["interrupted"]
+    assert entries[pending_id]["priority"] == "batch"
+    assert done_id not in entries
+    release.set()
+
+
+def test_restore_jobs_requeues_and_compacts(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text(
+        '{"event": "add", "id": 1, "func": "txt2img", "params": {"n": 1}, '
+        '"owner": "txt2img", "device": null, "priority": "normal", '
+        '"attempts": 0}\n'
+        '{"event": "start", "id": 1}\n'
+        '{"event": "add", "id": 2, "func": "txt2img", "params": {"n": 2}, '
+        '"owner": null, "device": null, "priority": "batch", '
+        '"attempts": 1}\n'
+        '{"event": "start", "id": 2}\n'
+        '{"event": "add", "id": 3, "func": "txt2img", "params": {"n": 3}, '
+        '"owner": null, "device": null, "priority": "batch", '
+        '"attempts": 0}\n'
+        '{"event": "add", "id": 4, "func": "gone", "params": {}, '
+        '"owner": null, "device": null, "priority": "normal", '
+        '"attempts": 0}\n'
+        '{"event": "add", "id": 5, "fu',
+        encoding="utf-8"
+    )
+    journal = QueueJournal(str(path))
+    queue_manager.enable_journal(journal)
+    release = threading.Event()
+    seen = []
+    queue_manager.register_job_func(make_job(release, seen))
+
+    # Job 2 was interrupted twice, job 4 has no function and 5 is torn
+    assert queue_manager.restore_jobs() == 2
+
+    jobs = queue_manager.list_jobs()
+    assert [(j["owner"], j["interrupted"]) for j in jobs] == [
+        ("txt2img", True), (None, False)
+    ]
+
+    # The journal now holds the restored jobs, and keeps job 4 for a
+    # run that has its function
+    entries = journal.replay()
+    assert [e["params"] for e in entries] == [{"n": 1}, {"n": 3}, {}]
+    assert [e["attempts"] for e in entries] == [1, 0, 0]
+    assert entries[2]["func"] == "gone"
+
+    queue_manager.start_workers()
+    release.set()
+    wait_for(lambda: len(seen) == 2)
+    wait_for(lambda: [e["func"] for e in journal.replay()] == ["gone"])
+    assert [p["n"] for p in seen] == [1, 3]
+
+
+def test_wait_for_update_wakes_on_state_changes():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    version = queue_manager.get_version()
+
+    # Nothing happens, so the wait times out on the same version
+    assert queue_manager.wait_for_update(version, timeout=0.05) == version
+
+    woke_up = []
+    waiter = threading.Thread(
+        target=lambda: woke_up.append(queue_manager.wait_for_update(version))
+    )
+    waiter.start()
+    queue_manager.add_job(job, {"n": 1})
+    waiter.join(5)
+
+    assert woke_up and woke_up[0] > version
+
+    version = queue_manager.get_version()
+    release.set()
+    assert queue_manager.wait_for_update(version, timeout=5) > version
+    wait_for(lambda: not queue_manager.get_status()["is_running"])
+
+
+def test_async_wait_for_update_wakes_on_state_changes():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+    queue_manager.start_workers()
+
+    async def wait_for_job():
+        version = queue_manager.get_version()
+        assert await queue_manager.wait_for_update_async(
+            version, timeout=0.05
+        ) == version
+
+        waiting = asyncio.ensure_future(
+            queue_manager.wait_for_update_async(version, timeout=5)
+        )
+        await asyncio.sleep(0.05)
+        queue_manager.add_job(job, {"n": 1})
+        return version, await waiting
+
+    version, new_version = asyncio.run(wait_for_job())
+
+    assert new_version > version
+    assert not queue_manager._async_waiters
+    release.set()
+    wait_for(lambda: not queue_manager.get_status()["is_running"])
+
+
+def test_bump_is_published_and_journaled(tmp_path):
+    journal = QueueJournal(str(tmp_path / "journal.jsonl"))
+    queue_manager.enable_journal(journal)
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    queue_manager.add_job(job, {"n": 0})
+    wait_for(lambda: len(seen) == 1)
+    queue_manager.add_job(job, {"n": 1})
+    bumped_id = queue_manager.add_job(job, {"n": 2}, priority="batch")
+
+    version = queue_manager.get_version()
+    assert queue_manager.bump(bumped_id)
+    assert queue_manager.get_version() > version
+
+    entries = [e for e in journal.replay() if e["params"]["n"] > 0]
+    assert [e["id"] for e in entries][0] == bumped_id
+    assert entries[0]["priority"] == "interactive"
+    release.set()
+
+
+def test_add_job_rejects_jobs_no_worker_accepts():
+    queue_manager.start_workers([{"name": "gpu"}])
+    with pytest.raises(ValueError):
+        queue_manager.add_job(
+            lambda params: iter(()), {}, device="cuda1"
+        )
+    assert queue_manager.get_queue_size() == 0
+
+
+def test_cancel_interrupts_running_async_job():
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    async def txt2img_api(params):
+        yield ("cmd", 0, "Sending", "", None)
+        started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield ("cmd", 100, "Done", "", ["out.png"])
+
+    queue_manager.start_workers()
+    job_id = queue_manager.add_job(txt2img_api, {}, owner="txt2img")
+    assert started.wait(5)
+
+    assert queue_manager.cancel(job_id)
+    assert cancelled.wait(5)
+    wait_for(lambda: not queue_manager.get_status()["is_running"])
+    assert queue_manager.get_status(owner="txt2img")["images"] is None
+
+
+def test_interrupting_a_finished_job_spares_the_next_one():
+    releases = {1: threading.Event(), 2: threading.Event()}
+    started = []
+    cancelled = threading.Event()
+
+    async def txt2img_api(params):
+        started.append(params["n"])
+        yield ("cmd", 0, "Running", "", None)
+        try:
+            while not releases[params["n"]].is_set():
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield ("cmd", 100, "Done", "", [f"{params['n']}.png"])
+
+    queue_manager.start_workers()
+    first_id = queue_manager.add_job(txt2img_api, {"n": 1})
+    queue_manager.add_job(txt2img_api, {"n": 2})
+    wait_for(lambda: started == [1])
+
+    # cancel() found the worker, then the job ended before the interrupt
+    worker = queue_manager._workers[0]
+    releases[1].set()
+    wait_for(lambda: started == [1, 2])
+
+    assert not worker.interrupt(first_id)
+    assert not queue_manager.cancel(first_id)
+
+    releases[2].set()
+    wait_for(lambda: not queue_manager.get_status()["is_running"])
+    assert not cancelled.is_set()
+    assert queue_manager.get_status()["images"] == ["2.png"]
+
+
+def test_journal_is_compacted_during_the_session(tmp_path, monkeypatch):
+    monkeypatch.setattr("modules.utils.queue_journal.COMPACT_EVENTS", 10)
+    path = tmp_path / "journal.jsonl"
+    path.write_text(
+        '{"event": "add", "id": 1, "func": "img2img_api", "params": {}, '
+        '"owner": null, "device": null, "priority": "normal", '
+        '"attempts": 0}\n',
+        encoding="utf-8"
+    )
+    journal = QueueJournal(str(path))
+    queue_manager.enable_journal(journal)
+    release = threading.Event()
+    release.set()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    queue_manager.restore_jobs()
+    for n in range(20):
+        queue_manager.add_job(job, {"n": n})
+    wait_for(lambda: len(seen) == 20)
+    wait_for(lambda: not queue_manager.get_status()["is_running"])
+
+    # 60 events were written, compaction kept the file well below that
+    assert len(path.read_text().splitlines()) < 30
+    assert [e["func"] for e in journal.replay()] == ["img2img_api"]
+
+
+def test_finished_state_survives_the_next_owner_job():
+    release = threading.Event()
+    seen = []
+    job = make_job(release, seen)
+
+    queue_manager.start_workers()
+    queue_manager.add_job(job, {"n": 1}, owner="txt2img")
+    wait_for(lambda: len(seen) == 1)
+    queue_manager.add_job(job, {"n": 2}, owner="img2img")
+
+    # txt2img finishes and img2img takes over the same worker at once
+    release.set()
+    wait_for(lambda: len(seen) == 2)
+
+    state = queue_manager.get_status(owner="txt2img")
+    assert not state["is_running"]
+    assert state["command"] == "cmd"
+    assert state["images"] == ["out.png"]
+    assert queue_manager.consume_finished(owner="txt2img")
+    assert not queue_manager.consume_finished(owner="txt2img")
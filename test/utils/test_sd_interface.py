@@ -1,4 +1,6 @@
 import os
+import json
+import time
 import pytest
 from modules.utils.sd_interface import SDOptionsCache
 
@@ -75,3 +77,81 @@ def test_options_cache(app_cwd):
 def test_options_parse(option, expected) -> None:
     sd_options = SDOptionsCache()
     assert sd_options.get_opt(option) == expected
+
+
+def count_help_runs(sd_interface_module):
+    return sum(
+        1 for call in sd_interface_module.subprocess.run.call_args_list
+        if "--help" in call.args[0]
+    )
+
+
+def wait_for_hash(cache_file, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if json.loads(cache_file.read_text()).get("sd_hash"):
+            return
+        time.sleep(0.01)
+    raise AssertionError("the binary was never hashed")
+
+
+def test_options_cache_validated_without_hashing(app_cwd, mocker):
+    import modules.utils.sd_interface as sd_interface
+
+    binary = app_cwd / "bin" / "sd"
+    binary.parent.mkdir()
+    binary.write_bytes(b"v1")
+    sd_interface.shutil.which.return_value = str(binary)
+    hash_file = mocker.spy(SDOptionsCache, "_hash_file")
+
+    first = SDOptionsCache()
+    cache_file = app_cwd / first._CACHE_FILE
+    wait_for_hash(cache_file)
+    assert count_help_runs(sd_interface) == 1
+
+    hash_file.reset_mock()
+    SDOptionsCache()
+    assert count_help_runs(sd_interface) == 1
+    # Only this script is hashed, not the binary
+    assert [c.args[1] for c in hash_file.call_args_list] == [
+        first.SCRIPT_PATH
+    ]
+
+    # Touched but unchanged: hashed once, then trusted again
+    os.utime(binary, ns=(0, 10**9))
+    SDOptionsCache()
+    assert count_help_runs(sd_interface) == 1
+
+    # A different binary runs --help again
+    binary.write_bytes(b"version 2")
+    SDOptionsCache()
+    assert count_help_runs(sd_interface) == 2
+
+
+def test_exe_probe_reused_while_binary_unchanged(app_cwd, monkeypatch):
+    import modules.utils.sd_interface as sd_interface
+
+    binary = app_cwd / "bin" / "sd-cli"
+    binary.parent.mkdir()
+    binary.write_bytes(b"v1")
+    sd_interface.shutil.which.return_value = str(binary)
+    run = sd_interface.subprocess.run
+    monkeypatch.setattr(sd_interface, "_probe_cache", None)
+
+    def version_runs():
+        return sum(1 for c in run.call_args_list if "--version" in c.args[0])
+
+    assert sd_interface.exe_name("cli") == "sd-cli"
+    assert sd_interface.exe_name("cli") == "sd-cli"
+    assert version_runs() == 1
+
+    # Reused after a restart too
+    monkeypatch.setattr(sd_interface, "_probe_cache", None)
+    assert sd_interface.exe_name("cli") == "sd-cli"
+    assert version_runs() == 1
+    probes = json.loads((app_cwd / sd_interface.PROBE_CACHE_FILE).read_text())
+    assert probes["sd-cli"]["path"] == str(binary)
+
+    binary.write_bytes(b"version 2")
+    assert sd_interface.exe_name("cli") == "sd-cli"
+    assert version_runs() == 2
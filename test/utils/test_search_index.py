@@ -0,0 +1,103 @@
+import os
+import time
+
+import pytest
+
+from modules.utils.search_index import SearchIndex, parse_query
+
+METADATA = {
+    "1.png": {"pprompt": "a red fox in the snow", "nprompt": "blurry",
+              "seed": 42, "steps": 20, "cfg": 7.0, "sampler": "euler_a",
+              "scheduler": "karras", "model": "sdxl_base.safetensors"},
+    "2.png": {"pprompt": "a red car, night city", "nprompt": "",
+              "seed": 7, "steps": 30, "cfg": 4.5, "sampler": "dpm++2m",
+              "scheduler": "", "model": "flux1-dev-q8_0.gguf"},
+    "3.png": {"pprompt": "portrait of a fox", "nprompt": "lowres, blurry",
+              "seed": 18446744073709551615, "steps": 8, "cfg": 1.0,
+              "sampler": "euler", "scheduler": "", "model": "flux1-schnell.gguf"},
+}
+
+
+def reader(paths):
+    for path in paths:
+        reader.calls.append(path)
+        yield {"params": METADATA[os.path.basename(path)],
+               "width": 1024, "height": 1024}
+
+
+def settle(folder):
+    past = time.time() - 60
+    os.utime(folder, (past, past))
+
+
+@pytest.fixture
+def index(tmp_path):
+    reader.calls = []
+    outputs = tmp_path / "txt2img"
+    outputs.mkdir()
+    for name in METADATA:
+        (outputs / name).write_bytes(b"png")
+    (outputs / "notes.txt").write_text("skip me")
+    settle(outputs)
+
+    search_index = SearchIndex(str(tmp_path / "search.db"))
+    assert search_index.sync([str(outputs)], reader) == 3
+    yield search_index
+    search_index.close()
+
+
+def names(paths):
+    return sorted(os.path.basename(p) for p in paths)
+
+
+def test_parse_query():
+    parsed = parse_query('red "night city" neg:blurry steps:20-30 cfg:-5 seed:42 model:flux')
+    assert parsed["pprompt"] == ["red", "night city"]
+    assert parsed["nprompt"] == ["blurry"]
+    assert parsed["filters"] == {
+        "steps": (20.0, 30.0), "cfg": (None, 5.0),
+        "seed": "42", "model": "flux"
+    }
+    assert parse_query("steps:20")["filters"]["steps"] == (20.0, 20.0)
+    assert parse_query("steps:lots")["pprompt"] == ["steps:lots"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("fox", ["1.png", "3.png"]),
+    ('"red car"', ["2.png"]),
+    ("red neg:blurry", ["1.png"]),
+    ("seed:42", ["1.png"]),
+    ("seed:18446744073709551615", ["3.png"]),
+    ("steps:10-25", ["1.png"]),
+    ("steps:20-", ["1.png", "2.png"]),
+    ("cfg:-5", ["2.png", "3.png"]),
+    ("sampler:euler", ["1.png", "3.png"]),
+    ("model:flux fox", ["3.png"]),
+    ("", ["1.png", "2.png", "3.png"]),
+])
+def test_search(index, query, expected):
+    assert names(index.search(query)) == expected
+
+
+def test_sort_orders(index):
+    assert [os.path.basename(p) for p in index.search("", "Name (Z-A)")] == [
+        "3.png", "2.png", "1.png"
+    ]
+
+
+def test_sync_is_incremental(index, tmp_path):
+    outputs = tmp_path / "txt2img"
+    assert index.sync([str(outputs)], reader) == 0
+    assert len(reader.calls) == 3
+
+    os.remove(outputs / "2.png")
+    (outputs / "4.png").write_bytes(b"png")
+    METADATA["4.png"] = {"pprompt": "a blue fox"}
+    try:
+        settle(outputs)
+        assert index.sync([str(outputs)], reader) == 2
+        assert reader.calls[3:] == [str(outputs / "4.png")]
+        assert names(index.search("fox")) == ["1.png", "3.png", "4.png"]
+        assert names(index.search("car")) == []
+    finally:
+        del METADATA["4.png"]
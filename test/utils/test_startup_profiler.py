@@ -0,0 +1,48 @@
+import builtins
+import json
+import sys
+
+from modules.utils.startup_profiler import StartupProfiler
+
+
+def test_phases_and_imports_nest(tmp_path, monkeypatch):
+    (tmp_path / "profiled_outer.py").write_text("import profiled_inner\n")
+    (tmp_path / "profiled_inner.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ("profiled_outer", "profiled_inner"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    real_import = builtins.__import__
+
+    profiler = StartupProfiler()
+    profiler.start()
+    try:
+        with profiler.phase("build"):
+            with profiler.phase("tabs"):
+                import profiled_outer  # noqa: F401
+    finally:
+        profiler.stop()
+
+    assert builtins.__import__ is real_import
+    report = profiler.report()
+    assert [(p['name'], p['depth']) for p in report['phases']] == [
+        ("build", 0), ("tabs", 1)
+    ]
+    imports = {i['module']: i for i in report['imports']}
+    assert imports['profiled_outer']['cumulative_us'] >= (
+        imports['profiled_inner']['cumulative_us']
+    )
+
+    report_path = profiler.write_report(str(tmp_path / "profile.json"))
+    assert json.loads(open(report_path).read())['total_seconds'] > 0
+    folded = (tmp_path / "profile.folded").read_text().splitlines()
+    assert any(
+        line.startswith("build;tabs;profiled_outer;profiled_inner ")
+        for line in folded
+    )
+
+
+def test_phase_is_a_no_op_when_stopped():
+    profiler = StartupProfiler()
+    with profiler.phase("idle"):
+        pass
+    assert profiler.report()['phases'] == []
@@ -0,0 +1,139 @@
+import os
+import sys
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from modules.utils.subprocess_manager import SubprocessManager, split_frames
+
+SD_LOG = "sdcpp_txt2img_log.txt"
+
+
+def reference_frames(data: bytes) -> list:
+    """Byte-at-a-time splitter the chunked reader has to match."""
+    frames = []
+    buffer = bytearray()
+    for value in data:
+        byte = bytes([value])
+        buffer.extend(byte)
+
+        is_line_end = byte in (b'\r', b'\n')
+        is_progress_end = (
+            len(buffer) > 4 and
+            byte in (b's', b't') and
+            (buffer.endswith(b'it/s') or buffer.endswith(b's/it'))
+        )
+
+        if is_line_end or is_progress_end:
+            frames.append(buffer.decode('utf-8', errors='replace'))
+            buffer.clear()
+
+    if buffer:
+        frames.append(buffer.decode('utf-8', errors='replace'))
+    return frames
+
+
+def replay(data: bytes, write_size: int) -> list:
+    """Feeds the recorded log through a pipe and collects the frames."""
+    read_fd, write_fd = os.pipe()
+
+    def writer():
+        with os.fdopen(write_fd, 'wb', buffering=0) as pipe:
+            for i in range(0, len(data), write_size):
+                pipe.write(data[i:i + write_size])
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+
+    manager = SubprocessManager()
+    with os.fdopen(read_fd, 'rb', buffering=0) as stdout:
+        manager.process = SimpleNamespace(stdout=stdout)
+        frames = list(manager._stream_output())
+
+    thread.join()
+    return frames
+
+
+@pytest.fixture
+def sd_log(request) -> bytes:
+    return (request.path.parent / SD_LOG).read_bytes()
+
+
+@pytest.fixture
+def server_state(monkeypatch):
+    """Stands in for the shared instance the log parser writes the seed to."""
+    state = SimpleNamespace(seed="")
+    monkeypatch.setitem(
+        sys.modules, "modules.shared_instance",
+        SimpleNamespace(server_state=state)
+    )
+    return state
+
+
+def log_command(request) -> list:
+    """A child process that prints the recorded sd.cpp log."""
+    log_path = str(request.path.parent / SD_LOG)
+    return [
+        sys.executable, "-c",
+        "import sys; sys.stdout.buffer.write(open(sys.argv[1], 'rb').read())",
+        log_path
+    ]
+
+
+@pytest.mark.parametrize("write_size", [1, 3, 7, 64, 4096, 1 << 20])
+def test_stream_output_matches_bytewise_reader(sd_log, write_size):
+    assert replay(sd_log, write_size) == reference_frames(sd_log)
+
+
+def test_split_frames_keeps_incomplete_data():
+    buffer = bytearray(b"5/20 - 1.10it/s\r  |==>  | 6/20 - 1.1")
+    assert split_frames(buffer) == [b"5/20 - 1.10it/s", b"\r"]
+    assert buffer == bytearray(b"  |==>  | 6/20 - 1.1")
+
+
+def test_split_frames_ignores_bare_progress_suffix():
+    buffer = bytearray(b"it/sit/s/it")
+    assert split_frames(buffer) == [b"it/sit/s"]
+    assert buffer == bytearray(b"/it")
+
+
+def test_stream_output_large_log(sd_log):
+    data = sd_log * 200
+    assert replay(data, 64 * 1024) == reference_frames(data)
+
+
+def test_run_subprocess_async_matches_sync(request, server_state):
+    command = log_command(request)
+
+    sync_updates = list(SubprocessManager().run_subprocess(command))
+
+    async def collect():
+        manager = SubprocessManager()
+        return [
+            update async for update in manager.run_subprocess_async(command)
+        ]
+
+    async_updates = asyncio.run(collect())
+
+    assert async_updates == sync_updates
+    assert async_updates[-1]["final_stats"]["total_time"] == "18.47s"
+    assert server_state.seed == 42
+
+
+def test_run_subprocess_async_concurrent(request, server_state):
+    command = log_command(request)
+
+    async def collect():
+        manager = SubprocessManager()
+        return [
+            update async for update in manager.run_subprocess_async(command)
+        ]
+
+    async def run_many():
+        return await asyncio.gather(*(collect() for _ in range(4)))
+
+    results = asyncio.run(run_many())
+
+    assert all(updates == results[0] for updates in results)
@@ -0,0 +1,69 @@
+import os
+import time
+
+from PIL import Image
+
+from modules.utils.thumbnail_cache import ThumbnailCache
+
+
+def make_image(path, size=(1024, 768), color="red"):
+    Image.new("RGB", size, color).save(path)
+    return str(path)
+
+
+def test_thumbnails_are_created_once(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "cache"), size=128)
+    images = [make_image(tmp_path / f"{i}.png") for i in range(3)]
+
+    thumbs = cache.get_many(images)
+
+    assert all(t.startswith(str(tmp_path / "cache")) for t in thumbs)
+    with Image.open(thumbs[0]) as thumb:
+        assert thumb.size == (128, 96)
+
+    mtimes = [os.stat(t).st_mtime_ns for t in thumbs]
+    assert cache.get_many(images) == thumbs
+    assert cache._pending == {}
+    assert [os.stat(t).st_mtime_ns for t in thumbs] >= mtimes
+
+
+def test_changed_files_get_new_thumbnails(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "cache"), size=64)
+    image = make_image(tmp_path / "1.png")
+    first = cache.get_many([image])[0]
+
+    time.sleep(0.01)
+    make_image(tmp_path / "1.png", size=(512, 512), color="blue")
+    second = cache.get_many([image])[0]
+
+    assert first != second
+    with Image.open(second) as thumb:
+        assert thumb.size == (64, 64)
+
+
+def test_unreadable_files_fall_back_to_original(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "cache"))
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not a png")
+    missing = str(tmp_path / "missing.png")
+
+    assert cache.get_many([str(broken), missing]) == [str(broken), missing]
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "cache"), size=256)
+    images = [
+        make_image(tmp_path / f"{i}.png", color=(i * 40, 0, 0))
+        for i in range(4)
+    ]
+    thumbs = cache.get_many(images)
+    for age, thumb in enumerate(reversed(thumbs)):
+        past = time.time() - 100 - age
+        os.utime(thumb, (past, past))
+
+    sizes = [os.path.getsize(t) for t in thumbs]
+    # Eviction trims down to 90% of the limit
+    cache.max_bytes = sum(sizes[2:]) / 0.9 + 1
+    cache.evict()
+
+    assert [os.path.exists(t) for t in thumbs] == [False, False, True, True]
@@ -0,0 +1,104 @@
+import sys
+import asyncio
+import importlib
+import threading
+from types import SimpleNamespace
+
+import gradio as gr
+import pytest
+
+
+@pytest.fixture
+def ui_events(monkeypatch):
+    """Imports ui_events without building the shared instances."""
+    monkeypatch.setitem(
+        sys.modules, "modules.shared_instance",
+        SimpleNamespace(sd_options=None, model_state=None)
+    )
+    return importlib.import_module("modules.utils.ui_events")
+
+
+def test_skip_unchanged_only_sends_deltas(ui_events):
+    delivered = {}
+    images = [f"outputs/txt2img/{i}.png" for i in range(64)]
+
+    first = ui_events.skip_unchanged(
+        delivered, {"status": "Running", "images": images}
+    )
+    assert first == {"status": "Running", "images": images}
+
+    second = ui_events.skip_unchanged(
+        delivered, {"status": "Running", "images": list(images)}
+    )
+    assert second == {"status": gr.skip(), "images": gr.skip()}
+
+    third = ui_events.skip_unchanged(
+        delivered, {"status": "Done", "images": images + ["64.png"]}
+    )
+    assert third["status"] == "Done"
+    assert len(third["images"]) == 65
+
+
+def test_get_job_priority(ui_events):
+    assert ui_events.get_job_priority({"in_batch_count": 1}) == "interactive"
+    assert ui_events.get_job_priority({"in_batch_count": "4"}) == "batch"
+    assert ui_events.get_job_priority({}) == "interactive"
+
+
+def test_one_status_watcher_per_session_and_tab(ui_events, monkeypatch):
+    queue_manager = ui_events.queue_manager
+    monkeypatch.setattr(queue_manager, "_workers", [])
+    monkeypatch.setattr(queue_manager, "_pending_jobs", [])
+    monkeypatch.setattr(queue_manager, "_journal", None)
+    monkeypatch.setattr(queue_manager, "_job_funcs", {})
+    monkeypatch.setattr(queue_manager, "_finished", {})
+    monkeypatch.setattr(ui_events, "_status_watchers", [])
+    monkeypatch.setattr(ui_events, "_session_watchers", {})
+
+    release = threading.Event()
+
+    def txt2img_api(params):
+        yield ("cmd", 0, "Running", "", None)
+        release.wait(5)
+        yield ("cmd", 100, "Done", "stats", ["out.png"])
+
+    with gr.Blocks():
+        outputs_map = {
+            name: gr.Textbox() for name in (
+                'command', 'progress_slider', 'progress_textbox', 'stats',
+                'img_final', 'queue_tracker'
+            )
+        }
+        outputs_map['gen_btn'] = gr.Button()
+        ui_events.bind_generation_pipeline(
+            txt2img_api, [], [], outputs_map
+        )
+    watch_status = ui_events._status_watchers[0][0]
+
+    queue_manager.start_workers()
+    queue_manager.add_job(txt2img_api, {}, owner="txt2img_api")
+
+    async def watch():
+        first = watch_status(SimpleNamespace(session_hash="a"))
+        await anext(first)
+
+        # Another watcher of the same session and tab ends right away
+        second = [
+            update async for update in
+            watch_status(SimpleNamespace(session_hash="a"))
+        ]
+        other_session = watch_status(SimpleNamespace(session_hash="b"))
+        await anext(other_session)
+        watchers = len(ui_events._session_watchers)
+
+        release.set()
+        last = [update async for update in first]
+        await other_session.aclose()
+        return second, watchers, last
+
+    second, watchers, last = asyncio.run(watch())
+
+    assert second == [tuple(gr.skip() for _ in range(6))]
+    assert watchers == 2
+    assert last[-1][4] == ["out.png"]
+    assert not ui_events._session_watchers